@@ -13,7 +13,7 @@ os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'issc.settings')
 django.setup()
 
 from main.models import FacesEmbeddings, AccountRegistration
-import json
+import numpy as np
 
 print("=" * 80)
 print("🔍 FACE EMBEDDINGS DATABASE DIAGNOSTIC")
@@ -58,48 +58,23 @@ for idx, emb in enumerate(embeddings, 1):
     # Check each embedding type
     print("\n🎭 Embeddings:")
     
+    # Embeddings are stored as packed float32 bytes and read back as numpy arrays
     for emb_type in ['front_embedding', 'left_embedding', 'right_embedding']:
         try:
             emb_data = getattr(emb, emb_type)
-            
-            # Analyze the data type and content
-            data_type = type(emb_data).__name__
             print(f"\n   {emb_type}:")
-            print(f"      Type: {data_type}")
-            
-            if isinstance(emb_data, str):
-                # Try to parse as JSON
-                try:
-                    parsed = json.loads(emb_data)
-                    if isinstance(parsed, list):
-                        print(f"      Status: ✅ Valid JSON list")
-                        print(f"      Length: {len(parsed)} values")
-                        if len(parsed) > 0:
-                            print(f"      First 3 values: {parsed[:3]}")
-                            print(f"      Last 3 values: {parsed[-3:]}")
-                    else:
-                        print(f"      Status: ⚠️ JSON but not a list")
-                except json.JSONDecodeError:
-                    print(f"      Status: ❌ Invalid JSON")
-                    print(f"      Content preview: {str(emb_data)[:100]}")
-            
-            elif isinstance(emb_data, list):
-                print(f"      Status: ✅ Python list")
-                print(f"      Length: {len(emb_data)} values")
-                if len(emb_data) > 0:
-                    print(f"      First 3 values: {emb_data[:3]}")
-                    print(f"      Last 3 values: {emb_data[-3:]}")
-            
-            elif isinstance(emb_data, dict):
-                if len(emb_data) == 0:
-                    print(f"      Status: ⚠️ Empty dict (no data captured)")
-                else:
-                    print(f"      Status: ⚠️ Dict with {len(emb_data)} keys")
-                    print(f"      Keys: {list(emb_data.keys())}")
             
+            if emb_data is None:
+                print(f"      Status: ⚠️ Empty (no data captured)")
+            elif isinstance(emb_data, np.ndarray):
+                print(f"      Status: {'✅ Valid' if np.isfinite(emb_data).all() else '❌ Contains NaN/inf'} float32 vector")
+                print(f"      Length: {emb_data.shape[0]} values")
+                print(f"      Norm: {np.linalg.norm(emb_data):.4f}")
+                if emb_data.shape[0] > 0:
+                    print(f"      First 3 values: {emb_data[:3].tolist()}")
+                    print(f"      Last 3 values: {emb_data[-3:].tolist()}")
             else:
-                print(f"      Status: ⚠️ Unexpected type")
-                print(f"      Content: {emb_data}")
+                print(f"      Status: ⚠️ Unexpected type {type(emb_data).__name__}")
         
         except Exception as e:
             print(f"   ❌ Error checking {emb_type}: {e}")
@@ -111,8 +86,8 @@ print("\n" + "=" * 80)
 print("✅ DIAGNOSTIC COMPLETE")
 print("=" * 80)
 print("\n💡 WHAT TO LOOK FOR:")
-print("   - Each embedding should be a list with 512 values (FaceNet embedding size)")
-print("   - If you see empty dicts {}, that angle wasn't captured during enrollment")
+print("   - Each embedding should be a vector with 512 values (FaceNet embedding size)")
+print("   - If you see Empty, that angle wasn't captured during enrollment")
 print("   - All values should be floating point numbers")
 print("   - If front_embedding is valid, face recognition should work")
 print("=" * 80)
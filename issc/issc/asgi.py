@@ -3,6 +3,11 @@ ASGI config for issc project.
 
 It exposes the ASGI callable as a module-level variable named ``application``.
 
+Serve with an ASGI server (e.g. ``gunicorn -k uvicorn.workers.UvicornWorker
+issc.asgi:application``) when many viewers watch the live feeds: the video feed
+endpoints then stream from async generators, so every open feed is a coroutine
+instead of a worker thread held for the whole session.
+
 For more information on this file, see
 https://docs.djangoproject.com/en/5.1/howto/deployment/asgi/
 """
@@ -13,4 +18,10 @@ from django.core.asgi import get_asgi_application
 
 os.environ.setdefault("DJANGO_SETTINGS_MODULE", "issc.settings")
 
-application = get_asgi_application()
+django_application = get_asgi_application()
+
+# Imported after setup: app modules need the configured settings
+from main.computer_vision.mjpeg import cancel_on_disconnect  # noqa: E402
+
+# End video feeds whose viewer went away (Django 4.2 does not notice on its own)
+application = cancel_on_disconnect(django_application)
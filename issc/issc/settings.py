@@ -170,6 +170,122 @@ RECORDING_URL = '/recordings/'
 RECORDING_ROOT = BASE_DIR / 'recordings'
 
 
+# Face gallery search
+# Approximate nearest-neighbour (IVF) search for very large galleries. Below
+# FACE_ANN_MIN_GALLERY_SIZE enrolled people the search stays exact brute force.
+# FACE_ANN_NPROBE trades recall for latency; FACE_ANN_RERANK_K candidates are
+# re-scored exactly against all of their poses.
+FACE_ANN_ENABLED = os.getenv('FACE_ANN_ENABLED', 'False').lower() == 'true'
+FACE_ANN_MIN_GALLERY_SIZE = int(os.getenv('FACE_ANN_MIN_GALLERY_SIZE', '5000'))
+FACE_ANN_NPROBE = int(os.getenv('FACE_ANN_NPROBE', '8'))
+FACE_ANN_RERANK_K = int(os.getenv('FACE_ANN_RERANK_K', '10'))
+
+# Rows fetched per round trip when streaming enrolled faces into the caches
+FACE_EMBEDDING_CHUNK_SIZE = int(os.getenv('FACE_EMBEDDING_CHUNK_SIZE', '500'))
+
+# Memory-mapped face gallery snapshot shared by all worker processes (empty to disable)
+FACE_GALLERY_SNAPSHOT_DIR = os.getenv('FACE_GALLERY_SNAPSHOT_DIR', str(BASE_DIR / 'cache' / 'face_gallery'))
+# Enrollment changes are collected for this many seconds, then published as one
+# snapshot write from a background thread (never in the request thread)
+FACE_GALLERY_PUBLISH_DELAY = float(os.getenv('FACE_GALLERY_PUBLISH_DELAY', '1.0'))
+
+# Live feed face tracking: a tracked face is re-embedded only when its track is
+# new, its last decision was within FACE_TRACK_MIN_CONFIDENCE (cosine distance)
+# of the threshold, or FACE_TRACK_REFRESH_INTERVAL seconds have passed.
+FACE_TRACK_IOU_THRESHOLD = float(os.getenv('FACE_TRACK_IOU_THRESHOLD', '0.3'))
+FACE_TRACK_MAX_MISSED = int(os.getenv('FACE_TRACK_MAX_MISSED', '5'))
+FACE_TRACK_REFRESH_INTERVAL = float(os.getenv('FACE_TRACK_REFRESH_INTERVAL', '3.0'))
+FACE_TRACK_MIN_CONFIDENCE = float(os.getenv('FACE_TRACK_MIN_CONFIDENCE', '0.05'))
+
+# Shared face inference pool for the live feed: worker processes that each load
+# DeepFace once (0 = run detection inline in every camera thread) and the
+# number of queued frames kept per camera before the oldest is dropped.
+FACE_INFERENCE_WORKERS = int(os.getenv('FACE_INFERENCE_WORKERS', '2'))
+FACE_INFERENCE_MAX_PENDING = int(os.getenv('FACE_INFERENCE_MAX_PENDING', '2'))
+# A free worker takes up to FACE_INFERENCE_BATCH_SIZE queued frames (from any
+# camera), waiting at most FACE_INFERENCE_BATCH_WINDOW_MS for more, and embeds all
+# of their faces in one Facenet forward pass.
+FACE_INFERENCE_BATCH_SIZE = int(os.getenv('FACE_INFERENCE_BATCH_SIZE', '8'))
+FACE_INFERENCE_BATCH_WINDOW_MS = float(os.getenv('FACE_INFERENCE_BATCH_WINDOW_MS', '20'))
+
+# Runtime for Facenet embeddings: 'deepface' (Keras/TensorFlow), 'onnxruntime'
+# or 'opencv' (cv2.dnn). The ONNX backends run FACE_EMBEDDING_MODEL_PATH, exported
+# with `python manage.py export_facenet_onnx`; their vectors match DeepFace's.
+FACE_EMBEDDING_BACKEND = os.getenv('FACE_EMBEDDING_BACKEND', 'deepface')
+FACE_EMBEDDING_MODEL_PATH = os.getenv('FACE_EMBEDDING_MODEL_PATH', str(BASE_DIR / 'models' / 'facenet.onnx'))
+
+# Face detector for recognition and enrollment: 'yunet' (OpenCV YuNet, boxes +
+# landmarks), 'ssd' (OpenCV res10 SSD-ResNet), 'haar', or a DeepFace detector
+# backend ('mtcnn', the reference). Native detectors run on the frame downscaled
+# to FACE_DETECTOR_INPUT_WIDTH pixels. Models are from the OpenCV model zoo:
+#   yunet: face_detection_yunet_2023mar.onnx
+#   ssd:   res10_300x300_ssd_iter_140000.caffemodel + deploy.prototxt (CONFIG_PATH)
+# Compare them on your cameras with `python manage.py benchmark_detectors`.
+FACE_DETECTOR_BACKEND = os.getenv('FACE_DETECTOR_BACKEND', 'mtcnn')
+FACE_DETECTOR_INPUT_WIDTH = int(os.getenv('FACE_DETECTOR_INPUT_WIDTH', '320'))
+FACE_DETECTOR_SCORE_THRESHOLD = float(os.getenv('FACE_DETECTOR_SCORE_THRESHOLD', '0.8'))
+FACE_DETECTOR_MODEL_PATH = os.getenv('FACE_DETECTOR_MODEL_PATH', str(BASE_DIR / 'models' / 'face_detection_yunet_2023mar.onnx'))
+FACE_DETECTOR_CONFIG_PATH = os.getenv('FACE_DETECTOR_CONFIG_PATH', str(BASE_DIR / 'models' / 'deploy.prototxt'))
+
+# Motion gate: the face detector only runs on frames where at least
+# MOTION_GATE_THRESHOLD of the (MOTION_GATE_WIDTH px wide, grayscale) frame
+# changed by more than MOTION_GATE_PIXEL_DELTA gray levels, plus
+# MOTION_GATE_HOLD seconds after motion and every MOTION_GATE_KEEPALIVE seconds
+# on a still scene. Set MOTION_GATE_THRESHOLD=0 to detect on every frame.
+MOTION_GATE_THRESHOLD = float(os.getenv('MOTION_GATE_THRESHOLD', '0.005'))
+MOTION_GATE_WIDTH = int(os.getenv('MOTION_GATE_WIDTH', '160'))
+MOTION_GATE_PIXEL_DELTA = int(os.getenv('MOTION_GATE_PIXEL_DELTA', '25'))
+MOTION_GATE_HOLD = float(os.getenv('MOTION_GATE_HOLD', '2.0'))
+MOTION_GATE_KEEPALIVE = float(os.getenv('MOTION_GATE_KEEPALIVE', '5.0'))
+
+# Frame bus: each physical camera is read by one thread that keeps its latest
+# FRAME_BUS_CAPACITY frames in a ring buffer shared by every live feed manager,
+# recognition worker and viewer (nobody takes a frame away from anyone else).
+FRAME_BUS_CAPACITY = int(os.getenv('FRAME_BUS_CAPACITY', '4'))
+
+# Video feeds accept ?fps=, ?width= and ?quality= per viewer. With adaptation on,
+# a viewer whose connection cannot keep up (slow socket writes) gets lower quality,
+# then smaller frames, then fewer frames per second, and back up once it recovers.
+# Viewers can opt out with ?adaptive=0.
+VIDEO_FEED_ADAPTIVE = os.getenv('VIDEO_FEED_ADAPTIVE', 'True').lower() == 'true'
+
+# Load the face gallery and warm MTCNN/Facenet in the background at server start.
+# /healthz/ready returns 503 until warm-up finishes (and 200 "lazy" when disabled).
+FACE_WARMUP_ON_START = os.getenv('FACE_WARMUP_ON_START', 'False').lower() == 'true'
+FACE_WARMUP_TIMEOUT = float(os.getenv('FACE_WARMUP_TIMEOUT', '300'))
+
+# Computer vision logging ('main.cv' logger)
+# Per-face events are aggregated into one per-camera rate summary every
+# CV_LOG_SUMMARY_INTERVAL seconds; repeated warnings are let through at most
+# once per CV_LOG_RATE_LIMIT_INTERVAL seconds.
+CV_LOG_LEVEL = os.getenv('CV_LOG_LEVEL', 'INFO').upper()
+CV_LOG_SUMMARY_INTERVAL = float(os.getenv('CV_LOG_SUMMARY_INTERVAL', '30'))
+CV_LOG_RATE_LIMIT_INTERVAL = float(os.getenv('CV_LOG_RATE_LIMIT_INTERVAL', '10'))
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'formatters': {
+        'cv': {
+            'format': '%(asctime)s %(levelname)s %(name)s %(message)s',
+        },
+    },
+    'handlers': {
+        'cv_console': {
+            'class': 'logging.StreamHandler',
+            'formatter': 'cv',
+        },
+    },
+    'loggers': {
+        'main.cv': {
+            'handlers': ['cv_console'],
+            'level': CV_LOG_LEVEL,
+            'propagate': False,
+        },
+    },
+}
+
+
 # Default primary key field type
 # https://docs.djangoproject.com/en/5.1/ref/settings/#default-auto-field
 
@@ -2,3 +2,6 @@ from .settings import *
 
 # Avoid importing heavy live-feed URL modules during tests.
 ROOT_URLCONF = 'main.tests_urls'
+
+# Tests opt in to on-disk face gallery snapshots with override_settings.
+FACE_GALLERY_SNAPSHOT_DIR = ''
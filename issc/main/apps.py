@@ -7,6 +7,9 @@ class MainConfig(AppConfig):
     name = 'main'
     
     def ready(self):
+        # Incremental face cache updates on enrollment / status changes
+        from . import signals  # noqa: F401
+
         if os.environ.get('ISSC_DISABLE_GPU_INIT') == '1' or 'test' in sys.argv:
             print("Skipping GPU support initialization for tests/disabled mode.")
             return
@@ -24,4 +27,20 @@ class MainConfig(AppConfig):
             
         except Exception as e:
             print(f"GPU initialization error: {e}")
-            print("Continuing with CPU processing...")
\ No newline at end of file
+            print("Continuing with CPU processing...")
+
+        # Optional: load the gallery and warm the recognition models before traffic
+        from django.conf import settings
+        if getattr(settings, 'FACE_WARMUP_ON_START', False) and self._serving():
+            from .computer_vision.model_warmup import start_warmup_thread
+            print("Warming up face recognition models in the background...")
+            start_warmup_thread()
+
+    @staticmethod
+    def _serving():
+        """False for management commands other than runserver (and for its autoreload parent)"""
+        if os.path.basename(sys.argv[0]) != 'manage.py':
+            return True  # WSGI/ASGI server
+        if len(sys.argv) < 2 or sys.argv[1] != 'runserver':
+            return False
+        return os.environ.get('RUN_MAIN') == 'true' or '--noreload' in sys.argv
\ No newline at end of file
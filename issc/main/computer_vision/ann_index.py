@@ -0,0 +1,171 @@
+"""
+ISSC Approximate Nearest-Neighbour Index
+Inverted-file (IVF-flat) index over unit-normalized face embeddings, pure NumPy.
+
+Embeddings are clustered with spherical k-means into `nlist` inverted lists.
+A query only scans the `nprobe` lists whose centroids are closest to it, so the
+cost grows with nprobe / nlist of the gallery instead of the whole gallery.
+nprobe is the recall/latency knob: nprobe == nlist is an exact search.
+"""
+import math
+import threading
+
+import numpy as np
+
+
+class IVFIndex:
+    """IVF-flat index keyed by id_number; each key may own several vectors (poses)"""
+
+    def __init__(self, dim, nlist=None, nprobe=8, kmeans_iterations=10, seed=0):
+        """
+        Args:
+            dim: Embedding dimension
+            nlist: Number of inverted lists (default: sqrt of the training rows)
+            nprobe: Lists scanned per query - higher = better recall, slower
+            kmeans_iterations: Lloyd iterations used when training centroids
+            seed: RNG seed so rebuilds are deterministic
+        """
+        self.dim = dim
+        self.nlist = nlist
+        self.nprobe = nprobe
+        self.kmeans_iterations = kmeans_iterations
+        self.seed = seed
+        self.centroids = None      # (L, D) float32 unit rows
+        self._lists = []           # per list: {key: (n, D) float32 vectors}
+        self._key_lists = {}       # {key: set of list numbers holding its vectors}
+        self._packed = {}          # {list_no: (row_keys, matrix)} rebuilt lazily after edits
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._key_lists)
+
+    def __contains__(self, key):
+        return key in self._key_lists
+
+    @property
+    def is_trained(self):
+        return self.centroids is not None
+
+    def _train(self, vectors):
+        """Spherical k-means: centroids are unit vectors, assignment by inner product"""
+        rows = vectors.shape[0]
+        nlist = self.nlist or max(1, int(math.sqrt(rows)))
+        nlist = min(nlist, rows)
+        rng = np.random.default_rng(self.seed)
+
+        centroids = vectors[rng.choice(rows, size=nlist, replace=False)].copy()
+        for _ in range(self.kmeans_iterations):
+            assignment = np.argmax(vectors @ centroids.T, axis=1)
+            sums = np.zeros_like(centroids)
+            np.add.at(sums, assignment, vectors)
+            norms = np.linalg.norm(sums, axis=1)
+
+            # Re-seed empty clusters from random rows so every list stays usable
+            empty = norms == 0
+            if empty.any():
+                sums[empty] = vectors[rng.choice(rows, size=int(empty.sum()))]
+                norms[empty] = 1.0
+            centroids = (sums / norms[:, None]).astype(np.float32)
+
+        return np.ascontiguousarray(centroids)
+
+    def build(self, items):
+        """
+        Train centroids and fill the lists from scratch
+
+        Args:
+            items: Iterable of (key, vectors) with vectors a (n, D) array of unit rows
+        """
+        items = [(key, np.asarray(vectors, dtype=np.float32).reshape(-1, self.dim)) for key, vectors in items]
+        with self._lock:
+            self.centroids = None
+            self._lists = []
+            self._key_lists = {}
+            self._packed = {}
+            if not items:
+                return
+
+            self.centroids = self._train(np.vstack([vectors for _, vectors in items]))
+            self._lists = [{} for _ in range(len(self.centroids))]
+            for key, vectors in items:
+                self._add_locked(key, vectors)
+
+    def _add_locked(self, key, vectors):
+        assignment = np.argmax(vectors @ self.centroids.T, axis=1)
+        lists = set()
+        for list_no in np.unique(assignment):
+            list_no = int(list_no)
+            self._lists[list_no][key] = vectors[assignment == list_no]
+            self._packed.pop(list_no, None)
+            lists.add(list_no)
+        self._key_lists[key] = lists
+
+    def add(self, key, vectors):
+        """Insert or replace the vectors of one key (no retraining)"""
+        vectors = np.asarray(vectors, dtype=np.float32).reshape(-1, self.dim)
+        with self._lock:
+            if self.centroids is None:
+                raise RuntimeError("IVFIndex.add() called before build()")
+            self._remove_locked(key)
+            if len(vectors):
+                self._add_locked(key, vectors)
+
+    def _remove_locked(self, key):
+        for list_no in self._key_lists.pop(key, ()):
+            self._lists[list_no].pop(key, None)
+            self._packed.pop(list_no, None)
+
+    def remove(self, key):
+        """Delete every vector of one key"""
+        with self._lock:
+            self._remove_locked(key)
+
+    def _packed_list(self, list_no):
+        """Return (row_keys, matrix) for one list, packing it on first use after an edit"""
+        packed = self._packed.get(list_no)
+        if packed is None:
+            entries = self._lists[list_no]
+            if entries:
+                row_keys = np.concatenate([np.full(len(v), k, dtype=object) for k, v in entries.items()])
+                matrix = np.ascontiguousarray(np.vstack(list(entries.values())), dtype=np.float32)
+            else:
+                row_keys = np.empty(0, dtype=object)
+                matrix = np.empty((0, self.dim), dtype=np.float32)
+            packed = (row_keys, matrix)
+            self._packed[list_no] = packed
+        return packed
+
+    def search(self, probe, k, nprobe=None, accept=None):
+        """
+        Approximate top-k keys for one unit-normalized probe
+
+        Args:
+            probe: (D,) unit vector
+            k: Number of distinct keys to return
+            nprobe: Override of the lists scanned for this query
+            accept: Optional callable(key) -> bool; rejected keys are skipped
+                while ranking, so they never take one of the k places
+
+        Returns:
+            list: Up to k keys, best first (ranked by their best scanned vector)
+        """
+        with self._lock:
+            if self.centroids is None:
+                return []
+            nprobe = min(nprobe or self.nprobe, len(self.centroids))
+            coarse = self.centroids @ probe
+            probed = np.argpartition(-coarse, nprobe - 1)[:nprobe] if nprobe < len(coarse) else range(len(coarse))
+            packed = [self._packed_list(int(list_no)) for list_no in probed]
+
+        row_keys = np.concatenate([keys for keys, _ in packed])
+        if len(row_keys) == 0:
+            return []
+        scores = np.concatenate([matrix @ probe for _, matrix in packed])
+
+        best = []
+        for key in row_keys[np.argsort(-scores)]:
+            if key not in best and (accept is None or accept(key)):
+                best.append(key)
+                if len(best) == k:
+                    break
+        return best
@@ -0,0 +1,155 @@
+"""
+ISSC Camera Regions of Interest
+Per-camera polygons that limit face detection to the part of the frame that
+matters (e.g. the doorway a gate camera watches).
+
+Polygons are stored in SystemConfig as normalized [x, y] points (0-1, source
+frame orientation, not mirrored), so they survive resolution changes. The
+detector runs on the polygon's bounding rectangle with everything outside the
+polygon blacked out; with fewer pixels to cover, the detector sees faces at a
+higher effective resolution. Boxes are mapped back to full-frame coordinates
+with shift_detections().
+"""
+import threading
+import time
+
+import cv2
+import numpy as np
+
+MAX_POINTS = 32
+
+
+def normalize_polygon(points):
+    """
+    Validate a polygon from the API
+
+    Args:
+        points: Sequence of [x, y] pairs in 0-1 (None or empty = no region)
+
+    Returns:
+        list or None: [[x, y], ...] rounded to 4 decimals
+
+    Raises:
+        ValueError: Not a polygon of 3 to MAX_POINTS points inside the frame
+    """
+    if not points:
+        return None
+    try:
+        polygon = [[round(float(x), 4), round(float(y), 4)] for x, y in points]
+    except (TypeError, ValueError):
+        raise ValueError("Polygon must be a list of [x, y] points")
+    if not 3 <= len(polygon) <= MAX_POINTS:
+        raise ValueError(f"Polygon needs 3 to {MAX_POINTS} points")
+    if any(not (0.0 <= value <= 1.0) for point in polygon for value in point):
+        raise ValueError("Polygon points must be normalized to 0-1")
+    return polygon
+
+
+class RegionOfInterest:
+    """A camera's detection polygon, resolved to pixels per frame size"""
+
+    def __init__(self, polygon):
+        """
+        Args:
+            polygon: [[x, y], ...] normalized points (see normalize_polygon)
+        """
+        self.polygon = np.asarray(polygon, dtype=np.float32)
+        self._geometry = {}  # (height, width) -> (x, y, w, h, mask)
+
+    def geometry(self, shape):
+        """Bounding rectangle (x, y, w, h) in pixels and the polygon mask inside it"""
+        key = tuple(shape[:2])
+        geometry = self._geometry.get(key)
+        if geometry is None:
+            height, width = key
+            points = np.round(self.polygon * (width - 1, height - 1)).astype(np.int32)
+            x, y, w, h = cv2.boundingRect(points)
+            mask = np.zeros((h, w), dtype=np.uint8)
+            cv2.fillPoly(mask, [points - (x, y)], 255)
+            geometry = self._geometry[key] = (x, y, w, h, mask)
+        return geometry
+
+    def crop(self, frame):
+        """
+        Args:
+            frame: Full frame (any channel order)
+
+        Returns:
+            tuple: (crop with pixels outside the polygon zeroed, (x, y) origin of
+            the crop in the frame)
+        """
+        x, y, w, h, mask = self.geometry(frame.shape)
+        crop = frame[y:y + h, x:x + w]
+        return cv2.bitwise_and(crop, crop, mask=mask), (x, y)
+
+    def contains(self, x, y, shape):
+        """Whether pixel (x, y) of a frame of this shape lies inside the polygon"""
+        left, top, w, h, mask = self.geometry(shape)
+        x, y = int(x) - left, int(y) - top
+        return 0 <= x < w and 0 <= y < h and bool(mask[y, x])
+
+
+def shift_detections(detections, origin):
+    """
+    Map detect_and_embed() results from crop to frame coordinates (in place)
+
+    Returns:
+        list: The same detections
+    """
+    dx, dy = origin
+    if not dx and not dy:
+        return detections
+    for detection in detections:
+        area = detection['facial_area']
+        area['x'] += dx
+        area['y'] += dy
+        for key in ('left_eye', 'right_eye'):
+            if area.get(key) is not None:
+                area[key] = (area[key][0] + dx, area[key][1] + dy)
+    return detections
+
+
+class CameraROIs:
+    """RegionOfInterest per camera key, read from SystemConfig and re-read every reload_interval seconds"""
+
+    def __init__(self, reload_interval=10.0, clock=time.monotonic):
+        self.reload_interval = reload_interval
+        self._clock = clock
+        self._regions = {}  # camera key -> (RegionOfInterest or None, loaded at)
+        self._lock = threading.Lock()
+
+    def get(self, camera_key):
+        """The camera's RegionOfInterest, or None when it has no region"""
+        now = self._clock()
+        with self._lock:
+            cached = self._regions.get(camera_key)
+        if cached is not None and now - cached[1] < self.reload_interval:
+            return cached[0]
+
+        from ..models import SystemConfig
+        try:
+            polygon = SystemConfig.get_camera_roi(camera_key)
+        except Exception:
+            # Keep the last known region if the database is unavailable
+            return cached[0] if cached is not None else None
+        region = RegionOfInterest(polygon) if polygon else None
+        with self._lock:
+            self._regions[camera_key] = (region, now)
+        return region
+
+    def set(self, camera_key, polygon, user=None):
+        """
+        Save a camera's region (None removes it)
+
+        Raises:
+            ValueError: Invalid polygon (see normalize_polygon)
+        """
+        from ..models import SystemConfig
+        polygon = normalize_polygon(polygon)
+        SystemConfig.set_camera_roi(camera_key, polygon, user)
+        with self._lock:
+            self._regions[camera_key] = (RegionOfInterest(polygon) if polygon else None, self._clock())
+        return polygon
+
+
+camera_rois = CameraROIs()
@@ -0,0 +1,151 @@
+"""
+ISSC CV Logging
+Leveled, rate-limited logging for the recognition hot path.
+
+Per-face events are never written one by one. Recognition loops record them
+in per-camera counters and a single summary line per camera is logged every
+CV_LOG_SUMMARY_INTERVAL seconds:
+
+    camera 3: 12.4 faces/s, 9.8 matches/s, 2.6 unknown/s, 0.8 embeddings/s
+
+Summaries carry the same numbers as structured `extra` fields (camera_id,
+faces_per_s, matches_per_s, unknown_per_s, embeddings_per_s, window_s) for
+log shippers.
+
+Repeated warnings (a failing camera, a bad embedding) go through
+log_limited(), which lets one message per key through per interval and
+reports how many were suppressed in between.
+"""
+import logging
+import threading
+import time
+
+from django.conf import settings
+
+logger = logging.getLogger('main.cv')
+
+COUNTER_NAMES = ('faces', 'matches', 'unknown', 'embeddings')
+
+
+class RateLimiter:
+    """Allows one event per key per interval, counting the suppressed ones"""
+
+    def __init__(self, interval, clock=time.monotonic):
+        self.interval = interval
+        self.clock = clock
+        self._lock = threading.Lock()
+        self._last = {}
+        self._suppressed = {}
+
+    def allow(self, key):
+        """
+        Args:
+            key: Hashable event identity (e.g. ('embed_error', camera_id))
+
+        Returns:
+            int or None: Events suppressed since the last allowed one, or None
+            when this event should be dropped
+        """
+        now = self.clock()
+        with self._lock:
+            last = self._last.get(key)
+            if last is not None and now - last < self.interval:
+                self._suppressed[key] = self._suppressed.get(key, 0) + 1
+                return None
+            self._last[key] = now
+            return self._suppressed.pop(key, 0)
+
+
+_rate_limiter = RateLimiter(getattr(settings, 'CV_LOG_RATE_LIMIT_INTERVAL', 10))
+
+
+def log_limited(level, key, msg, *args, log=None, limiter=None, **kwargs):
+    """
+    Log at most once per key per rate-limit interval
+
+    Args:
+        level: logging level (logging.WARNING, ...)
+        key: Hashable identity of the repeated event
+        msg, *args, **kwargs: As for Logger.log()
+        log: Logger to use (defaults to the 'main.cv' logger)
+        limiter: RateLimiter to use (defaults to CV_LOG_RATE_LIMIT_INTERVAL)
+
+    Returns:
+        bool: True if the message was written
+    """
+    log = log or logger
+    if not log.isEnabledFor(level):
+        return False
+
+    suppressed = (limiter or _rate_limiter).allow(key)
+    if suppressed is None:
+        return False
+    if suppressed:
+        msg = f"{msg} (suppressed {suppressed} similar)"
+    log.log(level, msg, *args, **kwargs)
+    return True
+
+
+class CameraCounters:
+    """Thread-safe per-camera event counters with interval summaries"""
+
+    def __init__(self, interval, log=None, clock=time.monotonic):
+        """
+        Args:
+            interval: Seconds between summaries per camera
+            log: Logger for summaries (defaults to the 'main.cv' logger)
+            clock: Monotonic time source
+        """
+        self.interval = interval
+        self.log = log or logger
+        self.clock = clock
+        self._lock = threading.Lock()
+        self._windows = {}  # camera_id -> [window_start, {name: count}]
+        self._rates = {}    # camera_id -> rates of the last completed window
+
+    def record(self, camera_id, faces=0, matches=0, unknown=0, embeddings=0):
+        """Count recognition events (embeddings = Facenet runs); logs a summary when the camera's window closes"""
+        now = self.clock()
+        with self._lock:
+            window = self._windows.get(camera_id)
+            if window is None:
+                window = self._windows[camera_id] = [now, dict.fromkeys(COUNTER_NAMES, 0)]
+            counts = window[1]
+            counts['faces'] += faces
+            counts['matches'] += matches
+            counts['unknown'] += unknown
+            counts['embeddings'] += embeddings
+
+            elapsed = now - window[0]
+            if elapsed < self.interval:
+                return
+            rates = {f'{name}_per_s': counts[name] / elapsed for name in COUNTER_NAMES}
+            rates['window_s'] = elapsed
+            self._rates[camera_id] = rates
+            self._windows[camera_id] = [now, dict.fromkeys(COUNTER_NAMES, 0)]
+
+        self.log.info(
+            "camera %s: %.1f faces/s, %.1f matches/s, %.1f unknown/s, %.1f embeddings/s",
+            camera_id, rates['faces_per_s'], rates['matches_per_s'], rates['unknown_per_s'],
+            rates['embeddings_per_s'],
+            extra={'camera_id': camera_id, **rates},
+        )
+
+    def rates(self, camera_id):
+        """Rates of the camera's last completed window (empty dict before the first)"""
+        with self._lock:
+            return dict(self._rates.get(camera_id, {}))
+
+    def snapshot(self):
+        """Last completed window rates of every camera, keyed by camera id"""
+        with self._lock:
+            return {camera_id: dict(rates) for camera_id, rates in self._rates.items()}
+
+    def forget(self, camera_id):
+        """Drop a stopped camera's counters"""
+        with self._lock:
+            self._windows.pop(camera_id, None)
+            self._rates.pop(camera_id, None)
+
+
+cv_stats = CameraCounters(getattr(settings, 'CV_LOG_SUMMARY_INTERVAL', 30))
@@ -0,0 +1,193 @@
+"""
+ISSC Embedding Backends
+Interchangeable runtimes for the Facenet embedding model.
+
+    deepface      DeepFace's Keras model (TensorFlow) - the reference
+    onnxruntime   Exported Facenet ONNX graph on ONNX Runtime
+    opencv        The same ONNX graph on cv2.dnn (no extra dependency)
+
+All backends share the preprocessing of DeepFace.represent(detector_backend=
+'skip') and return L2-normalized rows, so embeddings from any backend can be
+matched against galleries enrolled with any other. The ONNX graph is exported
+from the DeepFace model with `manage.py export_facenet_onnx`.
+
+No Django imports: backends are built inside inference worker processes.
+"""
+import cv2
+import numpy as np
+
+EMBEDDING_BACKENDS = {}
+
+
+def register_backend(cls):
+    """Make an EmbeddingBackend class selectable by name"""
+    EMBEDDING_BACKENDS[cls.name] = cls
+    return cls
+
+
+def prepare_face(face, target_size):
+    """
+    Face crop -> model input, as DeepFace.represent(detector_backend='skip') does it
+
+    Args:
+        face: RGB face crop from DeepFace.extract_faces (float [0, 1] or uint8)
+        target_size: (height, width) of the model input
+
+    Returns:
+        numpy.ndarray: (height, width, 3) float32 in [0, 1]
+    """
+    # DeepFace returns normalized float array [0,1], convert to uint8 [0,255]
+    if face.dtype == np.float32 or face.dtype == np.float64:
+        face = (face * 255).astype(np.uint8)
+
+    # represent() treats arrays as BGR images and flips them to the model's order
+    img = face[:, :, ::-1]
+
+    # Letterbox: keep the aspect ratio and pad to the target size
+    factor = min(target_size[0] / img.shape[0], target_size[1] / img.shape[1])
+    img = cv2.resize(img, (int(img.shape[1] * factor), int(img.shape[0] * factor)))
+    diff_0 = target_size[0] - img.shape[0]
+    diff_1 = target_size[1] - img.shape[1]
+    img = np.pad(img, ((diff_0 // 2, diff_0 - diff_0 // 2), (diff_1 // 2, diff_1 - diff_1 // 2), (0, 0)), 'constant')
+    if img.shape[0:2] != tuple(target_size):
+        img = cv2.resize(img, (target_size[1], target_size[0]))
+
+    img = img.astype(np.float32)
+    if img.max() > 1:
+        img /= 255.0
+    return img
+
+
+class EmbeddingBackend:
+    """Runs the embedding model on a batch of prepared faces"""
+    name = None
+    input_size = (160, 160)
+
+    def __init__(self, model_name='Facenet', model_path=None):
+        """
+        Args:
+            model_name: DeepFace model the weights come from
+            model_path: Exported model file (ONNX backends)
+        """
+        self.model_name = model_name
+        self.model_path = model_path
+
+    def load(self):
+        """Load the model now instead of on the first embed()"""
+        raise NotImplementedError
+
+    def forward(self, batch):
+        """(N, H, W, 3) float32 -> (N, D) raw embeddings"""
+        raise NotImplementedError
+
+    def embed(self, faces):
+        """
+        Embed several face crops with one forward pass
+
+        Args:
+            faces: List of face crops from DeepFace.extract_faces
+
+        Returns:
+            numpy.ndarray: (N, D) float32, L2-normalized rows (all-zero rows for
+            degenerate outputs)
+        """
+        self.load()
+        batch = np.stack([prepare_face(face, self.input_size) for face in faces])
+        embeddings = np.asarray(self.forward(batch), dtype=np.float32).reshape(len(faces), -1)
+
+        norms = np.linalg.norm(embeddings, axis=1, keepdims=True)
+        return np.divide(embeddings, norms, out=np.zeros_like(embeddings), where=norms > 0)
+
+
+@register_backend
+class DeepFaceBackend(EmbeddingBackend):
+    name = 'deepface'
+
+    def __init__(self, model_name='Facenet', model_path=None):
+        super().__init__(model_name, model_path)
+        self._model = None
+
+    def load(self):
+        if self._model is None:
+            from deepface import DeepFace
+            try:
+                client = DeepFace.build_model(task='facial_recognition', model_name=self.model_name)
+            except TypeError:
+                # DeepFace < 0.0.93 has no task argument
+                client = DeepFace.build_model(model_name=self.model_name)
+            # Newer DeepFace wraps the Keras model in a client object
+            self._model = getattr(client, 'model', client)
+            self.input_size = tuple(self._model.input_shape[1:3])
+        return self._model
+
+    def forward(self, batch):
+        return self._model.predict_on_batch(batch)
+
+
+def _to_graph_layout(batch, input_shape):
+    """NHWC batch -> the layout an exported graph declares (NCHW if its channel axis is 1)"""
+    if len(input_shape) == 4 and input_shape[1] == 3 and input_shape[3] != 3:
+        return np.ascontiguousarray(batch.transpose(0, 3, 1, 2))
+    return batch
+
+
+@register_backend
+class OnnxRuntimeBackend(EmbeddingBackend):
+    name = 'onnxruntime'
+
+    def __init__(self, model_name='Facenet', model_path=None):
+        super().__init__(model_name, model_path)
+        self._session = None
+
+    def load(self):
+        if self._session is None:
+            try:
+                import onnxruntime
+            except ImportError:
+                raise ImportError("onnxruntime is not installed; run `pip install onnxruntime` "
+                                  "or set FACE_EMBEDDING_BACKEND='opencv'")
+            self._session = onnxruntime.InferenceSession(str(self.model_path), providers=['CPUExecutionProvider'])
+            graph_input = self._session.get_inputs()[0]
+            self._input_name = graph_input.name
+            self._input_shape = graph_input.shape
+        return self._session
+
+    def forward(self, batch):
+        batch = _to_graph_layout(batch, self._input_shape)
+        return self._session.run(None, {self._input_name: batch})[0]
+
+
+@register_backend
+class OpenCVDnnBackend(EmbeddingBackend):
+    name = 'opencv'
+
+    def __init__(self, model_name='Facenet', model_path=None):
+        super().__init__(model_name, model_path)
+        self._net = None
+
+    def load(self):
+        if self._net is None:
+            self._net = cv2.dnn.readNetFromONNX(str(self.model_path))
+        return self._net
+
+    def forward(self, batch):
+        # Graphs exported from Keras take NHWC input, which cv2.dnn accepts as-is
+        self._net.setInput(batch)
+        return self._net.forward()
+
+
+def create_backend(name='deepface', model_name='Facenet', model_path=None):
+    """
+    Args:
+        name: Registered backend name (see EMBEDDING_BACKENDS)
+        model_name: DeepFace model the weights come from
+        model_path: Exported model file for the ONNX backends
+
+    Raises:
+        ValueError: Unknown backend name
+    """
+    try:
+        cls = EMBEDDING_BACKENDS[name]
+    except KeyError:
+        raise ValueError(f"Unknown embedding backend {name!r}; choose from {sorted(EMBEDDING_BACKENDS)}")
+    return cls(model_name=model_name, model_path=model_path)
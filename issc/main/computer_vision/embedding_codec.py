@@ -0,0 +1,59 @@
+"""
+ISSC Embedding Codec
+Compact binary storage format for face embeddings.
+
+A stored embedding is a 4-byte header followed by the raw vector:
+
+    uint16 version | uint16 dim | dim x float32   (all little-endian)
+
+The header keeps the float payload 4-byte aligned, so decoding is a zero-copy
+np.frombuffer view over the bytes returned by the database driver.
+"""
+import struct
+
+import numpy as np
+
+EMBEDDING_FORMAT_VERSION = 1
+EMBEDDING_DTYPE = np.dtype('<f4')
+_HEADER = struct.Struct('<HH')
+
+
+def pack_embedding(vector):
+    """
+    Encode a 1-D embedding as versioned little-endian float32 bytes
+
+    Args:
+        vector: Sequence of floats or numpy array
+
+    Returns:
+        bytes: header + packed floats
+    """
+    vector = np.asarray(vector, dtype=EMBEDDING_DTYPE).reshape(-1)
+    return _HEADER.pack(EMBEDDING_FORMAT_VERSION, vector.shape[0]) + vector.tobytes()
+
+
+def unpack_embedding(blob):
+    """
+    Decode bytes written by pack_embedding()
+
+    Args:
+        blob: bytes / memoryview from the database, or None
+
+    Returns:
+        numpy.ndarray: Read-only float32 view over the blob, or None if empty
+
+    Raises:
+        ValueError: Unknown version or truncated payload
+    """
+    if blob is None or len(blob) == 0:
+        return None
+    if len(blob) < _HEADER.size:
+        raise ValueError(f"Embedding blob too short ({len(blob)} bytes)")
+
+    version, dim = _HEADER.unpack_from(blob)
+    if version != EMBEDDING_FORMAT_VERSION:
+        raise ValueError(f"Unsupported embedding format version {version}")
+    if len(blob) != _HEADER.size + dim * EMBEDDING_DTYPE.itemsize:
+        raise ValueError(f"Embedding blob has {len(blob)} bytes, expected {_HEADER.size + dim * EMBEDDING_DTYPE.itemsize}")
+
+    return np.frombuffer(blob, dtype=EMBEDDING_DTYPE, count=dim, offset=_HEADER.size)
@@ -0,0 +1,216 @@
+"""
+ISSC Face Detectors
+Pluggable face detectors behind one interface.
+
+    yunet   OpenCV YuNet (cv2.FaceDetectorYN), boxes + 5 landmarks - fastest on CPU
+    ssd     OpenCV res10 SSD-ResNet (cv2.dnn Caffe model), boxes only
+    haar    OpenCV Haar cascade, boxes only (legacy paths; many false positives)
+    <any other name>  a DeepFace detector backend ('mtcnn', 'retinaface', ...)
+
+Native detectors run on a copy of the frame downscaled to input_width pixels
+and map boxes and landmarks back to the full frame. Model files come from the
+OpenCV model zoo (see settings.FACE_DETECTOR_MODEL_PATH).
+`manage.py benchmark_detectors` times them against each other.
+
+No Django imports: detectors are built inside inference worker processes.
+"""
+import math
+from collections import namedtuple
+
+import cv2
+import numpy as np
+
+# box: (x, y, w, h) in full-frame pixels; landmarks: dict of (x, y) or None
+FaceDetection = namedtuple('FaceDetection', 'box landmarks score')
+
+LANDMARK_NAMES = ('right_eye', 'left_eye', 'nose', 'mouth_right', 'mouth_left')
+
+DETECTORS = {}
+
+
+def register_detector(cls):
+    """Make a FaceDetector class selectable by name"""
+    DETECTORS[cls.name] = cls
+    return cls
+
+
+class FaceDetector:
+    """Detects faces in a BGR (or RGB) frame"""
+    name = None
+    provides_landmarks = False
+
+    def __init__(self, input_width=320, score_threshold=0.8, model_path=None, config_path=None):
+        """
+        Args:
+            input_width: Width the frame is downscaled to before detection (0 = full size)
+            score_threshold: Minimum detection confidence
+            model_path: Model weights file
+            config_path: Model definition file (SSD prototxt)
+        """
+        self.input_width = input_width
+        self.score_threshold = score_threshold
+        self.model_path = model_path
+        self.config_path = config_path
+
+    def detect(self, image, is_rgb=False):
+        """
+        Args:
+            image: Frame as uint8 BGR (or RGB with is_rgb=True)
+            is_rgb: Channel order of image
+
+        Returns:
+            list: FaceDetection per face, in full-frame coordinates
+        """
+        height, width = image.shape[:2]
+        scale = 1.0
+        if self.input_width and width > self.input_width:
+            scale = self.input_width / width
+            image = cv2.resize(image, (self.input_width, max(1, round(height * scale))), interpolation=cv2.INTER_AREA)
+        if is_rgb:
+            image = cv2.cvtColor(image, cv2.COLOR_RGB2BGR)
+
+        detections = []
+        for box, landmarks, score in self._detect(np.ascontiguousarray(image)):
+            x, y, w, h = (value / scale for value in box)
+            x, y = max(0, int(round(x))), max(0, int(round(y)))
+            w = min(int(round(w)), width - x)
+            h = min(int(round(h)), height - y)
+            if w <= 0 or h <= 0:
+                continue
+            if landmarks is not None:
+                landmarks = {key: (px / scale, py / scale) for key, (px, py) in landmarks.items()}
+            detections.append(FaceDetection((x, y, w, h), landmarks, float(score)))
+        return detections
+
+    def _detect(self, image):
+        """BGR image at detection size -> iterable of (box, landmarks, score)"""
+        raise NotImplementedError
+
+
+@register_detector
+class YuNetDetector(FaceDetector):
+    name = 'yunet'
+    provides_landmarks = True
+
+    def __init__(self, *args, nms_threshold=0.3, top_k=50, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.nms_threshold = nms_threshold
+        self.top_k = top_k
+        self._detector = None
+
+    def _detect(self, image):
+        height, width = image.shape[:2]
+        if self._detector is None:
+            self._detector = cv2.FaceDetectorYN.create(
+                str(self.model_path), '', (width, height), self.score_threshold, self.nms_threshold, self.top_k
+            )
+        self._detector.setInputSize((width, height))
+        _, faces = self._detector.detect(image)
+        if faces is None:
+            return []
+        # Row: x, y, w, h, 5 landmark (x, y) pairs, score
+        return [
+            (row[:4], {name: (row[4 + 2 * i], row[5 + 2 * i]) for i, name in enumerate(LANDMARK_NAMES)}, row[14])
+            for row in faces
+        ]
+
+
+@register_detector
+class SSDResNetDetector(FaceDetector):
+    name = 'ssd'
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._net = None
+
+    def _detect(self, image):
+        if self._net is None:
+            self._net = cv2.dnn.readNetFromCaffe(str(self.config_path), str(self.model_path))
+        height, width = image.shape[:2]
+        blob = cv2.dnn.blobFromImage(image, 1.0, (300, 300), (104.0, 177.0, 123.0))
+        self._net.setInput(blob)
+        output = self._net.forward()[0, 0]
+
+        results = []
+        for _, _, score, x1, y1, x2, y2 in output:
+            if score < self.score_threshold:
+                continue
+            x1, y1, x2, y2 = x1 * width, y1 * height, x2 * width, y2 * height
+            results.append(((x1, y1, x2 - x1, y2 - y1), None, score))
+        return results
+
+
+@register_detector
+class HaarDetector(FaceDetector):
+    name = 'haar'
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._cascade = None
+
+    def _detect(self, image):
+        if self._cascade is None:
+            path = self.model_path or cv2.data.haarcascades + 'haarcascade_frontalface_default.xml'
+            self._cascade = cv2.CascadeClassifier(str(path))
+        gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
+        boxes = self._cascade.detectMultiScale(gray, 1.3, 5, minSize=(30, 30))
+        return [(box, None, 1.0) for box in boxes]
+
+
+class DeepFaceDetector(FaceDetector):
+    """A DeepFace detector backend (full resolution, as the recognition paths used it)"""
+    provides_landmarks = True
+
+    def __init__(self, backend='mtcnn', *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.name = backend
+        self.input_width = 0
+
+    def _detect(self, image):
+        from deepface import DeepFace
+        face_objs = DeepFace.extract_faces(img_path=image, detector_backend=self.name, enforce_detection=False, align=False)
+        results = []
+        for face_obj in face_objs:
+            area = face_obj.get('facial_area', {})
+            if not area.get('w') or not area.get('h'):
+                continue
+            eyes = {key: area[key] for key in ('left_eye', 'right_eye') if area.get(key) is not None}
+            results.append(((area['x'], area['y'], area['w'], area['h']), eyes or None, face_obj.get('confidence', 1.0)))
+        return results
+
+
+def create_detector(name='mtcnn', **options):
+    """
+    Args:
+        name: Native detector (see DETECTORS) or a DeepFace detector backend
+        **options: FaceDetector options (input_width, score_threshold, model_path, config_path)
+    """
+    cls = DETECTORS.get(name)
+    if cls is None:
+        return DeepFaceDetector(name, **options)
+    return cls(**options)
+
+
+def align_face(image, detection):
+    """
+    Crop a detected face, rotated so the eyes are level
+
+    Args:
+        image: Full frame the detection refers to
+        detection: FaceDetection (landmarks optional)
+
+    Returns:
+        numpy.ndarray: Face crop (same channel order as image), or None if empty
+    """
+    x, y, w, h = detection.box
+    eyes = detection.landmarks and [detection.landmarks.get(key) for key in ('right_eye', 'left_eye')]
+    if eyes and all(eye is not None for eye in eyes):
+        # Order by image x so the angle does not depend on the eye naming convention
+        (ax, ay), (bx, by) = sorted(eyes)
+        angle = math.degrees(math.atan2(by - ay, bx - ax))
+        center = ((ax + bx) / 2.0, (ay + by) / 2.0)
+        rotation = cv2.getRotationMatrix2D(center, angle, 1.0)
+        image = cv2.warpAffine(image, rotation, (image.shape[1], image.shape[0]), flags=cv2.INTER_LINEAR)
+
+    crop = image[y:y + h, x:x + w]
+    return crop if crop.size else None
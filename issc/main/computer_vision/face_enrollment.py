@@ -9,6 +9,12 @@ import time
 import json
 from typing import Optional
 
+from django.conf import settings
+
+from .embedding_backends import create_backend
+from .inference_pool import native_detector_from_settings
+from .inference_worker import extract_native_faces
+
 class FaceEnrollment:
     def __init__(self, device='cpu', model_name='Facenet'):
         """
@@ -23,6 +29,17 @@ class FaceEnrollment:
         self.last_error_time = 0  # For throttling error messages
         self._deepface = None  # Lazy-loaded DeepFace module
         
+        # FACE_EMBEDDING_BACKEND='onnxruntime' / 'opencv' embeds without TensorFlow
+        backend = getattr(settings, 'FACE_EMBEDDING_BACKEND', 'deepface')
+        self.embedding_backend = None
+        if backend != 'deepface':
+            self.embedding_backend = create_backend(
+                backend, model_name=self.model_name, model_path=getattr(settings, 'FACE_EMBEDDING_MODEL_PATH', None)
+            )
+        
+        # FACE_DETECTOR_BACKEND='yunet' / 'ssd' / 'haar' detects without MTCNN
+        self.detector = native_detector_from_settings()
+        
         print(f"✅ FaceEnrollment initialized (DeepFace will load on first use)")
         
         # Note: face_recognition library doesn't need GPU initialization
@@ -78,13 +95,17 @@ class FaceEnrollment:
             else:
                 image_rgb = image
             
-            # Detect faces using DeepFace
-            face_objs = self.DeepFace.extract_faces(
-                img_path=image_rgb,
-                detector_backend='mtcnn',  # Use MTCNN for face detection
-                enforce_detection=False,  # Don't throw error if no face found
-                align=True  # Align faces
-            )
+            if self.detector is not None:
+                # Fast native detector, aligned on its landmarks
+                face_objs = extract_native_faces(self.detector, image_rgb)
+            else:
+                # Detect faces using DeepFace
+                face_objs = self.DeepFace.extract_faces(
+                    img_path=image_rgb,
+                    detector_backend=getattr(settings, 'FACE_DETECTOR_BACKEND', 'mtcnn'),
+                    enforce_detection=False,  # Don't throw error if no face found
+                    align=True  # Align faces
+                )
             
             cropped_faces = []
             annotated_image = image.copy()
@@ -144,6 +165,11 @@ class FaceEnrollment:
             else:
                 face_rgb = face_image
             
+            # Exported graph: same preprocessing and L2-normalized output as below
+            if self.embedding_backend is not None:
+                embedding = self.embedding_backend.embed([face_rgb])[0]
+                return embedding.astype(np.float64) if embedding.any() else None
+            
             # Get face representation (embedding) using DeepFace
             result = self.DeepFace.represent(
                 img_path=face_rgb,
@@ -0,0 +1,822 @@
+"""
+ISSC Face Gallery
+Shared in-memory store of enrolled face embeddings used by every recognition path.
+
+Each enrolled pose (front, left, right) is kept as its own L2-normalized row of
+one contiguous float32 matrix. Rows are grouped per person, so the best score of
+a person over all of their poses is a vectorized segment-max (np.maximum.reduceat)
+over a single matrix product - no averaging and no Python loop per person.
+"""
+import json
+import threading
+import time
+from contextlib import nullcontext
+
+import numpy as np
+
+from .ann_index import IVFIndex
+from .embedding_codec import unpack_embedding
+from .gallery_snapshot import published_generation, read_snapshot, snapshot_lock, write_snapshot
+
+EMBEDDING_DIM = 128  # Facenet / face-api.js descriptor length
+POSE_FIELDS = ('front_embedding', 'left_embedding', 'right_embedding')
+
+
+def pose_vector(value):
+    """
+    Convert a stored pose embedding into a float32 vector
+
+    Args:
+        value: EmbeddingField value (float32 array or None when not captured);
+               legacy JSON lists / strings are still accepted
+
+    Returns:
+        numpy.ndarray or None if the pose was not captured
+    """
+    if isinstance(value, (bytes, bytearray, memoryview)):
+        return unpack_embedding(value)
+    if isinstance(value, str):
+        try:
+            value = json.loads(value)
+        except ValueError:
+            return None
+    if not isinstance(value, (list, tuple, np.ndarray)) or len(value) == 0:
+        return None
+    return np.asarray(value, dtype=np.float32).reshape(-1)
+
+
+class GalleryState:
+    """Immutable snapshot of the gallery - replaced as a whole, never edited in place"""
+    __slots__ = ('matrix', 'row_person', 'person_starts', 'person_ids', 'person_index', 'person_info', 'person_allowed')
+
+    def __init__(self, matrix, row_person, person_starts, person_ids, person_info):
+        self.matrix = matrix                # (R, D) float32, one unit row per pose
+        self.row_person = row_person        # (R,) person slot of each row
+        self.person_starts = person_starts  # (P,) first row of each person's segment
+        self.person_ids = person_ids        # (P,) id_number of each person slot
+        self.person_index = {id_number: slot for slot, id_number in enumerate(person_ids)}
+        self.person_info = person_info      # {id_number: {'first_name': ..., 'status': ...}}
+        # (P,) account status is 'allowed' - restricted users stay enrolled but never match
+        self.person_allowed = np.array(
+            [person_info.get(id_number, {}).get('status', 'allowed') == 'allowed' for id_number in person_ids],
+            dtype=bool,
+        )
+
+    @classmethod
+    def empty(cls, dim):
+        return cls(
+            np.empty((0, dim), dtype=np.float32),
+            np.empty(0, dtype=np.int32),
+            np.empty(0, dtype=np.int64),
+            np.empty(0, dtype=object),
+            {},
+        )
+
+
+class FaceGallery:
+    """Thread-safe store of per-pose embeddings with batched per-person scoring"""
+
+    def __init__(self, dim=EMBEDDING_DIM, ann_enabled=False, ann_min_size=5000, ann_nprobe=8, ann_rerank_k=10):
+        """
+        Args:
+            dim: Embedding dimension
+            ann_enabled: Use the approximate IVF index for large galleries
+            ann_min_size: Below this many people search stays exact brute force
+            ann_nprobe: IVF lists scanned per query (recall/latency knob)
+            ann_rerank_k: Candidates re-scored exactly against all of their poses
+        """
+        self.dim = dim
+        self.state = GalleryState.empty(dim)
+        self.last_update = 0
+        self.high_water = None  # newest FacesEmbeddings.updated_at reflected in the gallery
+        self.generation = 0     # shared snapshot generation this process is attached to
+        self._write_lock = threading.Lock()
+
+        self.ann_enabled = ann_enabled
+        self.ann_min_size = ann_min_size
+        self.ann_rerank_k = ann_rerank_k
+        self.ann_index = IVFIndex(dim, nprobe=ann_nprobe) if ann_enabled else None
+
+    def __len__(self):
+        return len(self.state.person_ids)
+
+    def __contains__(self, id_number):
+        return id_number in self.state.person_index
+
+    @property
+    def row_count(self):
+        return self.state.matrix.shape[0]
+
+    def get_info(self, id_number):
+        """Return cached user info for an enrolled id_number"""
+        return self.state.person_info.get(id_number, {})
+
+    def person_rows(self, id_number):
+        """(n, D) unit pose rows of one enrolled person (None if not enrolled)"""
+        state = self.state
+        slot = state.person_index.get(id_number)
+        if slot is None:
+            return None
+        return state.matrix[state.person_starts[slot]:self._person_ends(state)[slot]]
+
+    def replace(self, entries):
+        """
+        Rebuild the whole gallery
+
+        Args:
+            entries: Iterable of (id_number, pose_vectors, info) where pose_vectors
+                     is a list of 1-D arrays (one per captured pose)
+
+        Returns:
+            int: Number of people loaded
+        """
+        rows = []
+        row_person = []
+        person_starts = []
+        person_ids = []
+        person_info = {}
+
+        for id_number, pose_vectors, info in entries:
+            poses = self._pose_rows(pose_vectors)
+            if poses is None:
+                continue
+
+            slot = len(person_ids)
+            person_starts.append(len(rows))
+            rows.extend(poses)
+            row_person.extend([slot] * len(poses))
+            person_ids.append(id_number)
+            person_info[id_number] = info
+
+        if rows:
+            matrix = np.ascontiguousarray(np.vstack(rows), dtype=np.float32)
+        else:
+            matrix = np.empty((0, self.dim), dtype=np.float32)
+
+        state = GalleryState(
+            matrix,
+            np.array(row_person, dtype=np.int32),
+            np.array(person_starts, dtype=np.int64),
+            np.array(person_ids, dtype=object),
+            person_info,
+        )
+
+        # Single reference swap - readers always see either the old or the new gallery
+        with self._write_lock:
+            self._rebuild_ann_index(state)
+            self.state = state
+            self.last_update = time.time()
+        return len(person_ids)
+
+    def _pose_rows(self, pose_vectors):
+        """Unit-normalized (n, D) rows of the usable poses, or None if there are none"""
+        poses = [v for v in pose_vectors if v is not None and v.shape == (self.dim,)]
+        if not poses:
+            return None
+        poses, valid = self.normalize_probes(poses)
+        if not valid.any():
+            return None
+        return poses[valid]
+
+    @staticmethod
+    def _state_from_segments(matrix, person_starts, person_ids, person_info):
+        lengths = np.diff(np.append(person_starts, matrix.shape[0]))
+        row_person = np.repeat(np.arange(len(person_ids), dtype=np.int32), lengths)
+        return GalleryState(matrix, row_person, person_starts, person_ids, person_info)
+
+    def install(self, matrix, person_starts, person_ids, person_info):
+        """
+        Adopt prebuilt gallery arrays as-is (e.g. a read-only memory-mapped snapshot)
+
+        Args:
+            matrix: (R, D) float32 unit rows grouped per person
+            person_starts: (P,) first row of each person
+            person_ids: (P,) id_number of each person
+            person_info: {id_number: info}
+        """
+        state = self._state_from_segments(matrix, person_starts, person_ids, person_info)
+        with self._write_lock:
+            self._rebuild_ann_index(state)
+            self.state = state
+            self.last_update = time.time()
+        return len(person_ids)
+
+    def apply_changes(self, upserts=(), removals=()):
+        """
+        Add, replace and drop people in one copy of the gallery
+
+        Untouched segments are copied over unchanged; changed people are
+        appended as new segments at the end. No other person is re-read.
+
+        Args:
+            upserts: Iterable of (id_number, pose_vectors, info)
+            removals: Iterable of id_numbers to drop
+
+        Returns:
+            tuple: (number upserted, number removed)
+        """
+        changed = {}
+        for id_number, pose_vectors, info in upserts:
+            changed[id_number] = (self._pose_rows(pose_vectors), info)
+        removals = set(removals) | {id_number for id_number, (poses, _) in changed.items() if poses is None}
+        changed = {id_number: entry for id_number, entry in changed.items() if entry[0] is not None}
+
+        with self._write_lock:
+            state = self.state
+            dropped = {id_number for id_number in removals | changed.keys() if id_number in state.person_index}
+            if not dropped and not changed:
+                return 0, 0
+
+            person_ends = self._person_ends(state)
+            keep = np.array([id_number not in dropped for id_number in state.person_ids], dtype=bool)
+            row_keep = np.repeat(keep, person_ends - state.person_starts)
+            lengths = (person_ends - state.person_starts)[keep]
+
+            matrix = np.concatenate([state.matrix[row_keep]] + [poses for poses, _ in changed.values()])
+            lengths = np.concatenate((lengths, [len(poses) for poses, _ in changed.values()])).astype(np.int64)
+            person_starts = np.cumsum(lengths) - lengths
+            person_ids = np.concatenate((state.person_ids[keep], np.array(list(changed), dtype=object)))
+            person_info = {id_number: info for id_number, info in state.person_info.items() if id_number not in dropped}
+            person_info.update({id_number: info for id_number, (_, info) in changed.items()})
+
+            new_state = self._state_from_segments(
+                np.ascontiguousarray(matrix, dtype=np.float32), person_starts, person_ids, person_info
+            )
+
+            if self.ann_index is not None:
+                if self.ann_index.is_trained:
+                    for id_number in removals:
+                        self.ann_index.remove(id_number)
+                    for id_number, (poses, _) in changed.items():
+                        self.ann_index.add(id_number, poses)
+                else:
+                    self._sync_ann_index(new_state)
+            self.state = new_state
+
+        return len(changed), len(dropped - changed.keys())
+
+    def upsert(self, id_number, pose_vectors, info):
+        """
+        Add or replace one person without reloading the rest of the gallery
+
+        Args:
+            id_number: Person to add or update
+            pose_vectors: List of 1-D arrays (one per captured pose)
+            info: User info dict (first_name, middle_name, last_name)
+
+        Returns:
+            bool: True if the person is in the gallery afterwards
+        """
+        upserted, _ = self.apply_changes(upserts=[(id_number, pose_vectors, info)])
+        return upserted == 1
+
+    def remove(self, id_number):
+        """
+        Drop one person from the gallery
+
+        Returns:
+            bool: True if the person was present
+        """
+        _, removed = self.apply_changes(removals=[id_number])
+        return removed == 1
+
+    def _sync_ann_index(self, state):
+        """Train the index once incremental inserts push the gallery past the ANN threshold"""
+        if len(state.person_ids) >= self.ann_min_size:
+            self._rebuild_ann_index(state)
+
+    def _rebuild_ann_index(self, state):
+        """Retrain the IVF index on a full reload (only once the gallery is big enough)"""
+        if self.ann_index is None:
+            return
+        if len(state.person_ids) < self.ann_min_size:
+            self.ann_index.build([])
+            return
+        self.ann_index.build(
+            (id_number, state.matrix[start:end])
+            for id_number, start, end in zip(state.person_ids, state.person_starts, self._person_ends(state))
+        )
+
+    @staticmethod
+    def _person_ends(state):
+        """One-past-the-last row of each person's segment"""
+        return np.append(state.person_starts[1:], state.matrix.shape[0])
+
+    def uses_ann(self, state=None):
+        """True when searches go through the approximate index instead of brute force"""
+        state = state or self.state
+        return (
+            self.ann_index is not None
+            and self.ann_index.is_trained
+            and len(state.person_ids) >= self.ann_min_size
+        )
+
+    def normalize_probes(self, embeddings):
+        """
+        Stack embeddings into one float32 matrix of unit rows
+
+        Args:
+            embeddings: (N, D) array or a list of 1-D vectors / float lists
+
+        Returns:
+            tuple: (probes, valid) where probes is (N, D) and valid flags rows
+                   that had the right shape and a non-zero norm
+        """
+        if isinstance(embeddings, np.ndarray) and embeddings.ndim == 2:
+            if embeddings.shape[1] != self.dim:
+                raise ValueError(f"Expected {self.dim}-dimensional embeddings, got {embeddings.shape[1]}")
+            probes = np.array(embeddings, dtype=np.float32)
+            valid = np.ones(len(probes), dtype=bool)
+        else:
+            probes = np.zeros((len(embeddings), self.dim), dtype=np.float32)
+            valid = np.zeros(len(embeddings), dtype=bool)
+            for i, embedding in enumerate(embeddings):
+                try:
+                    row = np.asarray(embedding, dtype=np.float32).reshape(-1)
+                except (TypeError, ValueError):
+                    continue
+                if row.shape[0] == self.dim:
+                    probes[i] = row
+                    valid[i] = True
+
+        norms = np.linalg.norm(probes, axis=1)
+        valid &= norms > 0
+        probes[valid] /= norms[valid, None]
+        return probes, valid
+
+    def person_scores(self, probes, state=None, allowed_only=False):
+        """
+        Per-person best cosine similarity over all stored poses
+
+        Args:
+            probes: (N, D) unit-normalized probe matrix
+            state: Optional GalleryState to score against (defaults to current)
+            allowed_only: Score restricted users as -inf
+
+        Returns:
+            numpy.ndarray: (N, P) similarities, column j belongs to state.person_ids[j]
+        """
+        state = state or self.state
+        if state.matrix.shape[0] == 0:
+            return np.empty((len(probes), 0), dtype=np.float32)
+
+        # One GEMM for every probe against every pose row, then segment-max per person
+        row_scores = probes @ state.matrix.T
+        scores = np.maximum.reduceat(row_scores, state.person_starts, axis=1)
+        if allowed_only:
+            scores[:, ~state.person_allowed] = -np.inf
+        return scores
+
+    def best_matches(self, embeddings, allowed_only=False):
+        """
+        Find the most similar enrolled person for each embedding
+
+        Args:
+            embeddings: (N, D) array or list of embedding vectors
+            allowed_only: Only consider users whose account status is 'allowed'
+
+        Returns:
+            list: [(id_number or None, similarity)] in input order; id_number is
+                  None (similarity 0.0) for invalid probes or an empty gallery
+        """
+        state = self.state
+        if len(embeddings) == 0:
+            return []
+        if len(state.person_ids) == 0:
+            return [(None, 0.0) for _ in range(len(embeddings))]
+
+        probes, valid = self.normalize_probes(embeddings)
+        if self.uses_ann(state):
+            return self._ann_best_matches(probes, valid, state, allowed_only)
+
+        scores = self.person_scores(probes, state, allowed_only)
+        best_slots = np.argmax(scores, axis=1)
+        best_scores = scores[np.arange(len(best_slots)), best_slots]
+        valid &= np.isfinite(best_scores)
+
+        return [
+            (state.person_ids[slot], float(score)) if is_valid else (None, 0.0)
+            for is_valid, slot, score in zip(valid, best_slots, best_scores)
+        ]
+
+    def _ann_best_matches(self, probes, valid, state, allowed_only=False):
+        """IVF candidate search followed by an exact re-rank over every pose of the top-k people"""
+        person_ends = self._person_ends(state)
+        results = []
+        accept = None
+        if allowed_only:
+            # Filter inside the search: restricted neighbours must not crowd an
+            # allowed match out of the top-k
+            def accept(id_number):
+                slot = state.person_index.get(id_number)
+                return slot is not None and bool(state.person_allowed[slot])
+
+        for probe, is_valid in zip(probes, valid):
+            if not is_valid:
+                results.append((None, 0.0))
+                continue
+
+            slots = [
+                state.person_index[id_number]
+                for id_number in self.ann_index.search(probe, self.ann_rerank_k, accept=accept)
+                if id_number in state.person_index
+            ]
+            if not slots:
+                # Nobody eligible in the probed lists: fall back to the exact search
+                scores = self.person_scores(probe[np.newaxis], state, allowed_only)[0]
+                best = int(np.argmax(scores))
+                results.append((state.person_ids[best], float(scores[best])) if np.isfinite(scores[best]) else (None, 0.0))
+                continue
+
+            # Exact re-rank: gather all pose rows of the candidates and segment-max them
+            starts = state.person_starts[slots]
+            lengths = person_ends[slots] - starts
+            rows = np.concatenate([np.arange(start, start + length) for start, length in zip(starts, lengths)])
+            segment_starts = np.concatenate(([0], np.cumsum(lengths)[:-1]))
+            candidate_scores = np.maximum.reduceat(state.matrix[rows] @ probe, segment_starts)
+
+            best = int(np.argmax(candidate_scores))
+            results.append((state.person_ids[slots[best]], float(candidate_scores[best])))
+
+        return results
+
+
+def gallery_from_settings():
+    """Build the shared gallery using the FACE_ANN_* settings"""
+    from django.conf import settings
+
+    return FaceGallery(
+        ann_enabled=getattr(settings, 'FACE_ANN_ENABLED', False),
+        ann_min_size=getattr(settings, 'FACE_ANN_MIN_GALLERY_SIZE', 5000),
+        ann_nprobe=getattr(settings, 'FACE_ANN_NPROBE', 8),
+        ann_rerank_k=getattr(settings, 'FACE_ANN_RERANK_K', 10),
+    )
+
+
+def stream_face_embedding_rows(id_numbers=None, allowed_only=False, chunk_size=None, updated_after=None):
+    """
+    Stream enrolled faces together with their account fields in one query
+
+    FacesEmbeddings is joined to AccountRegistration and read as plain dicts
+    in chunks, so a cold start is a single round trip per chunk instead of one
+    query per user. Only the newest row is yielded for each id_number.
+
+    Args:
+        id_numbers: Optional list restricting the load to these users
+        allowed_only: Skip users whose status is not 'allowed'
+        chunk_size: Rows fetched per round trip (default FACE_EMBEDDING_CHUNK_SIZE)
+        updated_after: Only rows changed after this datetime
+
+    Yields:
+        dict: id_number, status, first_name, middle_name, last_name and the
+              three pose embedding fields
+    """
+    from django.conf import settings
+    from ..models import FacesEmbeddings
+
+    rows = FacesEmbeddings.objects.all()
+    if allowed_only:
+        rows = rows.filter(id_number__status='allowed')
+    if id_numbers is not None:
+        rows = rows.filter(id_number__in=id_numbers)
+    if updated_after is not None:
+        rows = rows.filter(updated_at__gt=updated_after)
+
+    rows = rows.order_by('id_number_id', '-updated_at').values(
+        'id_number',
+        'id_number__status',
+        'id_number__first_name',
+        'id_number__middle_name',
+        'id_number__last_name',
+        *POSE_FIELDS,
+    )
+
+    chunk_size = chunk_size or getattr(settings, 'FACE_EMBEDDING_CHUNK_SIZE', 500)
+    previous_id = None
+    for row in rows.iterator(chunk_size=chunk_size):
+        if row['id_number'] == previous_id:
+            continue
+        previous_id = row['id_number']
+        yield {
+            'id_number': row['id_number'],
+            'status': row['id_number__status'],
+            'first_name': row['id_number__first_name'],
+            'middle_name': row['id_number__middle_name'] or '',
+            'last_name': row['id_number__last_name'],
+            **{field: row[field] for field in POSE_FIELDS},
+        }
+
+
+def load_gallery_entries(id_numbers=None, updated_after=None):
+    """
+    Read enrolled users' pose embeddings and account status from the database
+
+    Args:
+        id_numbers: Optional list restricting the load to these users
+        updated_after: Optional datetime - only embeddings changed since then
+
+    Yields:
+        tuple: (id_number, pose_vectors, info) for FaceGallery.replace()
+    """
+    for row in stream_face_embedding_rows(id_numbers, updated_after=updated_after):
+        id_number = row['id_number']
+        try:
+            pose_vectors = [pose_vector(row[field]) for field in POSE_FIELDS]
+            yield id_number, pose_vectors, {
+                'first_name': row['first_name'],
+                'middle_name': row['middle_name'],
+                'last_name': row['last_name'],
+                'status': row['status'],
+            }
+        except Exception as e:
+            print(f"Error loading embedding for user {id_number}: {e}")
+
+
+def embedding_high_water():
+    """Newest FacesEmbeddings.updated_at in the database (None when empty)"""
+    from django.db.models import Max
+    from ..models import FacesEmbeddings
+
+    return FacesEmbeddings.objects.aggregate(high_water=Max('updated_at'))['high_water']
+
+
+def _snapshot_dir():
+    from django.conf import settings
+
+    return getattr(settings, 'FACE_GALLERY_SNAPSHOT_DIR', None)
+
+
+def _publish_lock():
+    """
+    Cross-process lock for a read-apply-publish sequence
+
+    Held from following the published gallery until the changed one is
+    written, so concurrent workers never publish over each other's changes.
+    """
+    directory = _snapshot_dir()
+    return snapshot_lock(directory) if directory else nullcontext()
+
+
+def publish_gallery_snapshot():
+    """
+    Write the current gallery to the shared snapshot and bump its generation
+
+    Other worker processes pick it up on their next follow_published_gallery().
+    No-op when snapshots are disabled or nothing was loaded yet.
+    """
+    directory = _snapshot_dir()
+    if not directory or face_gallery.high_water is None:
+        return False
+    try:
+        face_gallery.generation = write_snapshot(directory, face_gallery.state, face_gallery.high_water)
+        return True
+    except Exception as e:
+        print(f"⚠️ Could not write face gallery snapshot: {e}")
+        return False
+
+
+def _attach_snapshot(snapshot):
+    face_gallery.install(snapshot.matrix, snapshot.person_starts, snapshot.person_ids, snapshot.person_info)
+    face_gallery.high_water = snapshot.high_water
+    face_gallery.generation = snapshot.generation
+
+
+def follow_published_gallery():
+    """
+    Re-attach to the shared snapshot if another process published a newer one
+
+    Cheap enough to call before every recognition: normally a single read of
+    the memory-mapped generation counter.
+
+    Returns:
+        bool: True if a newer gallery was attached
+    """
+    directory = _snapshot_dir()
+    if not directory or not face_gallery.last_update:
+        return False
+
+    generation = published_generation(directory)
+    if generation in (0, face_gallery.generation):
+        return False
+
+    snapshot = read_snapshot(directory, face_gallery.dim)
+    if snapshot is None or snapshot.generation == face_gallery.generation:
+        return False
+    _attach_snapshot(snapshot)
+    return True
+
+
+def reload_face_gallery():
+    """Reload the shared gallery from the database; returns number of people loaded"""
+    start_time = time.time()
+    # Held across the read and the publish so an older read never overwrites a newer snapshot
+    with _publish_lock():
+        # Read the high-water mark first so rows saved during the load are re-applied as deltas later
+        high_water = embedding_high_water()
+        loaded_count = face_gallery.replace(load_gallery_entries())
+        face_gallery.high_water = high_water
+        elapsed = time.time() - start_time
+        search_mode = 'IVF approximate' if face_gallery.uses_ann() else 'exact'
+        print(f"✅ Face gallery loaded {loaded_count} people ({face_gallery.row_count} pose rows, {search_mode} search) in {elapsed:.2f}s")
+        publish_gallery_snapshot()
+    return loaded_count
+
+
+def sync_face_gallery():
+    """
+    Bring the gallery up to date by applying only what changed since its high-water mark
+
+    Re-reads embeddings saved after the high-water mark plus users the gallery
+    does not have yet or whose account status changed, and drops people who
+    were unenrolled. Falls back to a full reload when nothing was loaded yet.
+
+    Returns:
+        int: Number of people in the gallery
+    """
+    if face_gallery.high_water is None:
+        return reload_face_gallery()
+
+    with _publish_lock():
+        follow_published_gallery()
+        return _sync_face_gallery()
+
+
+def _sync_face_gallery():
+    from ..models import FacesEmbeddings
+
+    high_water = embedding_high_water()
+    current = dict(FacesEmbeddings.objects.values_list('id_number', 'id_number__status'))
+    removals = [id_number for id_number in face_gallery.state.person_ids if id_number not in current]
+    missing = [
+        id_number for id_number, status in current.items()
+        if id_number not in face_gallery or face_gallery.get_info(id_number).get('status') != status
+    ]
+
+    upserts = list(load_gallery_entries(updated_after=face_gallery.high_water))
+    if missing:
+        upserts.extend(load_gallery_entries(missing))
+
+    upserted, removed = face_gallery.apply_changes(upserts, removals)
+    face_gallery.high_water = high_water or face_gallery.high_water
+    face_gallery.last_update = time.time()
+    if upserted or removed:
+        print(f"🔄 Face gallery synced: {upserted} updated, {removed} removed, {len(face_gallery)} people")
+        publish_gallery_snapshot()
+    return len(face_gallery)
+
+
+def warm_start_face_gallery():
+    """
+    Start from the memory-mapped snapshot and apply deltas, or do a full load
+
+    Returns:
+        int: Number of people in the gallery
+    """
+    directory = _snapshot_dir()
+    snapshot = read_snapshot(directory, face_gallery.dim) if directory else None
+    if snapshot is None:
+        return reload_face_gallery()
+
+    _attach_snapshot(snapshot)
+    print(f"✅ Face gallery mapped from snapshot: {len(face_gallery)} people ({face_gallery.row_count} pose rows)")
+    return sync_face_gallery()
+
+
+def refresh_gallery_entry(id_number):
+    """
+    Re-read a single user after an enrollment or status change
+
+    Only touches that user's rows; the user is dropped if they have no usable
+    embeddings any more. Skipped until the first full load so the gallery is
+    never mistaken for a complete one. This process sees the change at once;
+    other workers get it from the next background snapshot publish.
+
+    Returns:
+        bool: True if the user is in the gallery afterwards
+    """
+    if not face_gallery.last_update:
+        return False
+    follow_published_gallery()
+
+    entries = list(load_gallery_entries([id_number]))
+    if entries:
+        changed = face_gallery.upsert(*entries[0])
+    else:
+        changed = face_gallery.remove(id_number)
+    if changed:
+        gallery_publisher.schedule([id_number])
+    return bool(entries) and changed
+
+
+def remove_gallery_entry(id_number):
+    """Drop a single user from the gallery (unenrolled or deleted)"""
+    if not face_gallery.last_update:
+        return False
+    follow_published_gallery()
+    removed = face_gallery.remove(id_number)
+    if removed:
+        gallery_publisher.schedule([id_number])
+    return removed
+
+
+def publish_gallery_changes(id_numbers):
+    """
+    Publish this process's changes to the given people on top of the latest snapshot
+
+    Under the snapshot lock: follows whatever another worker published, re-reads
+    the people from the database so their changes are applied on top of it, then
+    writes the result.
+
+    Returns:
+        bool: True if a snapshot was written
+    """
+    if not _snapshot_dir() or not face_gallery.last_update:
+        return False
+    with _publish_lock():
+        follow_published_gallery()
+        id_numbers = list(id_numbers)
+        entries = list(load_gallery_entries(id_numbers))
+        loaded = {entry[0] for entry in entries}
+        face_gallery.apply_changes(entries, [id_number for id_number in id_numbers if id_number not in loaded])
+        return publish_gallery_snapshot()
+
+
+class GalleryPublisher:
+    """
+    Coalesces enrollment changes into background snapshot writes
+
+    Signal handlers only mark people as changed; a background thread waits
+    FACE_GALLERY_PUBLISH_DELAY seconds so a burst of saves becomes one
+    snapshot write, instead of every save rewriting the whole snapshot in
+    the request thread. A change lost with the process is still picked up
+    by the other workers' sync_face_gallery() from the database.
+    """
+
+    def __init__(self, delay=None):
+        """
+        Args:
+            delay: Seconds to collect changes before publishing (None = FACE_GALLERY_PUBLISH_DELAY)
+        """
+        self._delay = delay
+        self._pending = set()
+        self._lock = threading.Lock()
+        self._thread = None
+
+    @property
+    def delay(self):
+        if self._delay is not None:
+            return self._delay
+        from django.conf import settings
+
+        return getattr(settings, 'FACE_GALLERY_PUBLISH_DELAY', 1.0)
+
+    @property
+    def pending(self):
+        with self._lock:
+            return set(self._pending)
+
+    def schedule(self, id_numbers):
+        """Mark people as changed; publishes them shortly from the background thread"""
+        if not _snapshot_dir():
+            return
+        with self._lock:
+            self._pending.update(id_numbers)
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name='FaceGalleryPublisher', daemon=True)
+                self._thread.start()
+
+    def flush(self):
+        """
+        Publish pending changes now, in the calling thread
+
+        Returns:
+            bool: True if a snapshot was written
+        """
+        with self._lock:
+            id_numbers, self._pending = self._pending, set()
+        if not id_numbers:
+            return False
+        try:
+            return publish_gallery_changes(id_numbers)
+        except Exception as e:
+            print(f"⚠️ Could not publish face gallery changes: {e}")
+            return False
+
+    def _run(self):
+        from django.db import connections
+
+        try:
+            while True:
+                time.sleep(self.delay)
+                with self._lock:
+                    if not self._pending:
+                        self._thread = None
+                        return
+                self.flush()
+        finally:
+            connections.close_all()
+
+
+# Shared gallery instance for the whole process
+face_gallery = gallery_from_settings()
+gallery_publisher = GalleryPublisher()
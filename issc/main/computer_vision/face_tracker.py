@@ -0,0 +1,157 @@
+"""
+ISSC Face Tracker
+Lightweight per-camera multi-face tracker so a face is embedded once per
+appearance instead of on every processed frame.
+
+Each detection is associated with an existing track by IoU against the
+track's predicted box (constant-velocity motion of the box corners, smoothed
+over updates). Detections that overlap no track start a new one; tracks that
+go unmatched for more than max_missed updates are dropped.
+
+A track carries the identity decided for it. The caller only runs Facenet for
+a track when needs_embedding() says so:
+
+    - the track is new (no identity yet)
+    - the last decision was close to the threshold (low confidence)
+    - refresh_interval seconds have passed since the last embedding
+"""
+import itertools
+import time
+
+import numpy as np
+
+
+def box_iou(a, b):
+    """IoU of two (x1, y1, x2, y2) boxes"""
+    ix1, iy1 = max(a[0], b[0]), max(a[1], b[1])
+    ix2, iy2 = min(a[2], b[2]), min(a[3], b[3])
+    inter = max(0.0, ix2 - ix1) * max(0.0, iy2 - iy1)
+    if inter <= 0:
+        return 0.0
+    union = (a[2] - a[0]) * (a[3] - a[1]) + (b[2] - b[0]) * (b[3] - b[1]) - inter
+    return inter / union if union > 0 else 0.0
+
+
+class FaceTrack:
+    """One face followed across frames, with the identity last decided for it"""
+
+    def __init__(self, track_id, box):
+        self.track_id = track_id
+        self.box = np.asarray(box, dtype=np.float64)
+        self.velocity = np.zeros(4)
+        self.hits = 1
+        self.missed = 0
+
+        # Identity state, set by assign()
+        self.label = None
+        self.score = None
+        self.confidence = 0.0
+        self.last_embedded = None
+
+    @property
+    def predicted_box(self):
+        return self.box + self.velocity * (self.missed + 1)
+
+    def observe(self, box, smoothing):
+        box = np.asarray(box, dtype=np.float64)
+        steps = self.missed + 1
+        velocity = (box - self.box) / steps
+        self.velocity = smoothing * velocity + (1.0 - smoothing) * self.velocity
+        self.box = box
+        self.hits += 1
+        self.missed = 0
+
+    def assign(self, label, score, confidence, now=None):
+        """
+        Record the identity decided from a fresh embedding
+
+        Args:
+            label: Matched id_number, or None for an unknown face
+            score: Matcher score to display (e.g. cosine distance)
+            confidence: Margin of the decision from the threshold (>= 0)
+            now: Timestamp of the embedding (defaults to time.monotonic())
+        """
+        self.label = label
+        self.score = score
+        self.confidence = confidence
+        self.last_embedded = time.monotonic() if now is None else now
+
+    def needs_embedding(self, now, refresh_interval, min_confidence):
+        if self.last_embedded is None:
+            return True
+        if self.confidence < min_confidence:
+            return True
+        return now - self.last_embedded >= refresh_interval
+
+
+class FaceTracker:
+    """IoU association of per-frame face detections to tracks"""
+
+    def __init__(self, iou_threshold=0.3, max_missed=5, refresh_interval=3.0, min_confidence=0.05, smoothing=0.5):
+        """
+        Args:
+            iou_threshold: Minimum IoU between a detection and a predicted box to continue a track
+            max_missed: Updates a track survives without a matching detection
+            refresh_interval: Seconds after which a track's identity is re-checked
+            min_confidence: Decision margin below which every update re-embeds the face
+            smoothing: Weight of the newest motion in the velocity estimate (0-1)
+        """
+        self.iou_threshold = iou_threshold
+        self.max_missed = max_missed
+        self.refresh_interval = refresh_interval
+        self.min_confidence = min_confidence
+        self.smoothing = smoothing
+        self.tracks = []
+        self._ids = itertools.count(1)
+
+    def update(self, boxes):
+        """
+        Associate this frame's detections with tracks
+
+        Args:
+            boxes: List of (x, y, w, h) face boxes
+
+        Returns:
+            list: FaceTrack per box, in input order
+        """
+        corners = [(x, y, x + w, y + h) for x, y, w, h in boxes]
+        pairs = []
+        for t_index, track in enumerate(self.tracks):
+            predicted = track.predicted_box
+            for d_index, box in enumerate(corners):
+                iou = box_iou(predicted, box)
+                if iou >= self.iou_threshold:
+                    pairs.append((iou, t_index, d_index))
+
+        # Greedy assignment, best overlaps first
+        assigned = [None] * len(corners)
+        used_tracks = set()
+        for iou, t_index, d_index in sorted(pairs, reverse=True):
+            if t_index in used_tracks or assigned[d_index] is not None:
+                continue
+            track = self.tracks[t_index]
+            track.observe(corners[d_index], self.smoothing)
+            assigned[d_index] = track
+            used_tracks.add(t_index)
+
+        survivors = []
+        for t_index, track in enumerate(self.tracks):
+            if t_index not in used_tracks:
+                track.missed += 1
+                if track.missed > self.max_missed:
+                    continue
+            survivors.append(track)
+
+        for d_index, box in enumerate(corners):
+            if assigned[d_index] is None:
+                track = FaceTrack(next(self._ids), box)
+                assigned[d_index] = track
+                survivors.append(track)
+
+        self.tracks = survivors
+        return assigned
+
+    def needs_embedding(self, track, now=None):
+        """True if the track's face should go through Facenet on this frame"""
+        now = time.monotonic() if now is None else now
+        return track.needs_embedding(now, self.refresh_interval, self.min_confidence)
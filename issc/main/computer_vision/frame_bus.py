@@ -0,0 +1,377 @@
+"""
+ISSC Frame Bus
+Capture-once frame distribution for the live feed.
+
+Every physical camera has exactly one reader thread (FrameBus) that publishes
+what the device delivers into a FrameBuffer: a small ring of the latest frames
+with monotonically increasing sequence numbers. Any number of subscribers
+(recognition workers, MJPEG streams, the recorder) read from it without taking
+the frame away from anyone else. Subscribers remember the last sequence number
+they handled and block in wait() until something newer is published; they
+wake as soon as it is, nothing polls and nothing is copied on the way.
+Coroutines (the ASGI video feeds) await wait_async() instead, which parks them
+on their event loop rather than on a thread.
+
+Published images are marked read-only because they are shared. A subscriber
+that draws on a frame takes its own copy first, and publishes the annotated
+result into its own FrameBuffer for the streams that show it.
+
+Buses are shared through the frame_buses registry, keyed by device index, and
+reference counted: the second manager that asks for a camera gets the running
+bus instead of opening the device again.
+"""
+import asyncio
+import threading
+import time
+from collections import deque, namedtuple
+
+import cv2
+from django.conf import settings
+
+Frame = namedtuple('Frame', ['seq', 'image', 'timestamp'])
+
+CAPTURE_WIDTH = 640
+CAPTURE_HEIGHT = 480
+CAPTURE_FPS = 30
+
+
+class FrameBuffer:
+    """Ring buffer of the latest frames of one stream, read by any number of subscribers"""
+
+    def __init__(self, capacity=4, clock=time.monotonic):
+        """
+        Args:
+            capacity: Frames kept for subscribers that fall behind
+        """
+        self._frames = deque(maxlen=max(1, capacity))
+        self._seq = 0
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._published = threading.Condition(self._lock)
+        self._async_waiters = set()  # (event loop, future) of coroutines in wait_async()
+        self.closed = False
+
+    @property
+    def seq(self):
+        """Sequence number of the latest frame (0 before the first one)"""
+        return self._seq
+
+    def publish(self, image):
+        """
+        Add a frame; the buffer takes ownership and marks it read-only
+
+        Returns:
+            Frame: The published frame with its sequence number
+        """
+        image.flags.writeable = False
+        with self._lock:
+            self._seq += 1
+            frame = Frame(self._seq, image, self._clock())
+            self._frames.append(frame)
+            self._published.notify_all()
+            self._wake_async_waiters()
+        return frame
+
+    def wait(self, seq, timeout=None):
+        """
+        Block until a frame newer than seq is published
+
+        Args:
+            seq: Sequence number the caller already handled
+            timeout: Seconds to wait at most (None = until a frame or close())
+
+        Returns:
+            Frame or None: The most recent frame, or None on timeout or close
+        """
+        with self._lock:
+            self._published.wait_for(lambda: self._seq > seq or self.closed, timeout)
+            if self._seq > seq and self._frames:
+                return self._frames[-1]
+            return None
+
+    async def wait_async(self, seq, timeout=None):
+        """
+        wait() for coroutines: suspends on the running event loop instead of blocking a thread
+
+        Args:
+            seq: Sequence number the caller already handled
+            timeout: Seconds to wait at most (None = until a frame or close())
+
+        Returns:
+            Frame or None: The most recent frame, or None on timeout or close
+        """
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            if self._seq > seq and self._frames:
+                return self._frames[-1]
+            if self.closed:
+                return None
+            waiter = (loop, loop.create_future())
+            self._async_waiters.add(waiter)
+        try:
+            await asyncio.wait_for(waiter[1], timeout)
+        except asyncio.TimeoutError:
+            pass
+        finally:
+            with self._lock:
+                self._async_waiters.discard(waiter)
+        return self.newer(seq)
+
+    def _wake_async_waiters(self):
+        # Called with the lock held, from whichever thread publishes: one
+        # callback per event loop resolves all of its waiting coroutines
+        if not self._async_waiters:
+            return
+        by_loop = {}
+        for loop, future in self._async_waiters:
+            by_loop.setdefault(loop, []).append(future)
+        self._async_waiters.clear()
+        for loop, futures in by_loop.items():
+            try:
+                loop.call_soon_threadsafe(_resolve, futures)
+            except RuntimeError:
+                pass  # Loop already closed; nobody is waiting on it any more
+
+    def close(self):
+        """Wake every waiting subscriber; wait() returns None from now on unless newer frames exist"""
+        with self._lock:
+            self.closed = True
+            self._published.notify_all()
+            self._wake_async_waiters()
+
+    def latest(self):
+        """The most recent Frame, or None before the first publish"""
+        with self._lock:
+            return self._frames[-1] if self._frames else None
+
+    def newer(self, seq):
+        """The most recent Frame if it is newer than seq, else None"""
+        frame = self.latest()
+        return frame if frame is not None and frame.seq > seq else None
+
+    def since(self, seq):
+        """Every buffered Frame newer than seq, oldest first (for subscribers that need each frame)"""
+        with self._lock:
+            return [frame for frame in self._frames if frame.seq > seq]
+
+    def age(self):
+        """Seconds since the latest frame was published (None before the first one)"""
+        frame = self.latest()
+        return None if frame is None else self._clock() - frame.timestamp
+
+
+def _resolve(futures):
+    for future in futures:
+        if not future.done():
+            future.set_result(None)
+
+
+def open_capture(device, width=CAPTURE_WIDTH, height=CAPTURE_HEIGHT, fps=CAPTURE_FPS):
+    """
+    Open a camera the way the live feed managers do (DirectShow, minimal buffering)
+
+    Returns:
+        cv2.VideoCapture or None: An opened capture that delivered a test frame
+    """
+    cap = cv2.VideoCapture(device, cv2.CAP_DSHOW)
+    if not cap.isOpened():
+        cap.release()
+        return None
+    cap.set(cv2.CAP_PROP_FRAME_WIDTH, width)
+    cap.set(cv2.CAP_PROP_FRAME_HEIGHT, height)
+    cap.set(cv2.CAP_PROP_FPS, fps)
+    cap.set(cv2.CAP_PROP_BUFFERSIZE, 1)
+    ret, frame = cap.read()
+    if not ret or frame is None:
+        cap.release()
+        return None
+    return cap
+
+
+class FrameBus:
+    """The single reader thread of one camera"""
+
+    def __init__(self, device, open_capture=open_capture, capture=None, capacity=4,
+                 max_failures=10, reopen_delay=1.0):
+        """
+        Args:
+            device: Camera index
+            open_capture: Callable(device) -> opened capture or None, used to open
+                and to reopen the device after max_failures failed reads
+            capture: Already opened capture to read from instead of opening one
+            capacity: FrameBuffer size
+        """
+        self.device = device
+        self.frames = FrameBuffer(capacity)
+        self.capture = capture
+        self.subscribers = 0
+        self.max_failures = max_failures
+        self.reopen_delay = reopen_delay
+        self.reopens = 0
+        self._open_capture = open_capture
+        self._stopped = threading.Event()
+        self._thread = None
+
+    def start(self):
+        """
+        Open the device if needed and start the reader thread
+
+        Returns:
+            bool: False if the device could not be opened
+        """
+        if self.capture is None:
+            self.capture = self._open_capture(self.device)
+            if self.capture is None:
+                return False
+        self._thread = threading.Thread(target=self._run, name=f'frame-bus-{self.device}', daemon=True)
+        self._thread.start()
+        return True
+
+    def _run(self):
+        failures = 0
+        while not self._stopped.is_set():
+            try:
+                ret, image = self.capture.read() if self.capture is not None else (False, None)
+            except Exception as e:
+                print(f"⚠️ Frame bus {self.device}: read error: {e}")
+                ret, image = False, None
+
+            if ret and image is not None:
+                failures = 0
+                self.frames.publish(image)
+                continue
+
+            failures += 1
+            if failures > self.max_failures:
+                self._reopen()
+                failures = 0
+            else:
+                self._stopped.wait(0.01)
+
+        if self.capture is not None:
+            self.capture.release()
+            self.capture = None
+
+    def _reopen(self):
+        print(f"🔄 Frame bus {self.device}: reopening camera after repeated read failures")
+        if self.capture is not None:
+            self.capture.release()
+            self.capture = None
+        if self._stopped.wait(self.reopen_delay):
+            return
+        self.capture = self._open_capture(self.device)
+        self.reopens += 1
+        if self.capture is None:
+            print(f"❌ Frame bus {self.device}: camera unavailable, retrying")
+
+    def stop(self):
+        """Stop the reader thread (the thread releases the device) and wake subscribers"""
+        self._stopped.set()
+        self.frames.close()
+        if self._thread is not None and self._thread is not threading.current_thread():
+            self._thread.join(timeout=2)
+
+    def status(self):
+        """Latest sequence number, frame age and subscriber count"""
+        age = self.frames.age()
+        return {
+            'device': self.device,
+            'seq': self.frames.seq,
+            'frame_age': None if age is None else round(age, 3),
+            'subscribers': self.subscribers,
+            'reopens': self.reopens,
+            'running': self._thread is not None and self._thread.is_alive(),
+        }
+
+
+class FrameBuses:
+    """Reference-counted FrameBus per device"""
+
+    def __init__(self, capacity=4, open_capture=open_capture):
+        self.capacity = capacity
+        self.open_capture = open_capture
+        self._buses = {}
+        self._opening = {}  # device -> Event set once its first acquire() finished opening it
+        self._lock = threading.Lock()
+
+    def acquire(self, device, capture=None, open_capture=None):
+        """
+        Subscribe to a device's bus, starting it on first use
+
+        Args:
+            device: Camera index
+            capture: Capture the caller already opened; released if the device
+                already has a bus
+            open_capture: Opener for this device (defaults to the registry's)
+
+        Returns:
+            FrameBus or None: None if the device could not be opened
+        """
+        while True:
+            with self._lock:
+                bus = self._buses.get(device)
+                if bus is not None:
+                    if capture is not None and capture is not bus.capture:
+                        # The device is already being read; never open it twice
+                        capture.release()
+                    bus.subscribers += 1
+                    return bus
+                opening = self._opening.get(device)
+                if opening is None:
+                    opening = self._opening[device] = threading.Event()
+                    break
+            # Another caller is opening the device (which can take seconds);
+            # wait for it without holding the registry lock, then look again
+            opening.wait()
+            with self._lock:
+                if device not in self._buses and capture is None:
+                    return None  # It could not be opened
+
+        # Open outside the lock so get(), release() and snapshot() of other
+        # cameras never wait for a slow or hanging device
+        bus = FrameBus(device, open_capture or self.open_capture, capture=capture, capacity=self.capacity)
+        started = False
+        try:
+            started = bus.start()
+        finally:
+            with self._lock:
+                del self._opening[device]
+                if started:
+                    self._buses[device] = bus
+                    bus.subscribers += 1
+            opening.set()
+        return bus if started else None
+
+    def release(self, bus):
+        """Drop a subscription; the last one stops the bus and releases the device"""
+        if bus is None:
+            return
+        with self._lock:
+            bus.subscribers -= 1
+            if bus.subscribers > 0:
+                return
+            if self._buses.get(bus.device) is bus:
+                del self._buses[bus.device]
+        bus.stop()
+
+    def get(self, device):
+        """The device's running bus, or None"""
+        with self._lock:
+            return self._buses.get(device)
+
+    def snapshot(self):
+        """Bus status of every open device, keyed by device index"""
+        with self._lock:
+            buses = dict(self._buses)
+        return {str(device): bus.status() for device, bus in buses.items()}
+
+    def stop_all(self):
+        """Stop every bus regardless of subscribers (process shutdown)"""
+        with self._lock:
+            buses = list(self._buses.values())
+            self._buses.clear()
+        for bus in buses:
+            bus.stop()
+
+
+frame_buses = FrameBuses(capacity=getattr(settings, 'FRAME_BUS_CAPACITY', 4))
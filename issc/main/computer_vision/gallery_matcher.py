@@ -0,0 +1,115 @@
+"""
+ISSC Gallery Matcher
+One matching service for every recognition path.
+
+All callers score probes against the shared FaceGallery (unit-normalized pose
+rows, so stored norms are precomputed once at load time) with a single matrix
+product. Callers differ only in how they express the decision, which is a
+pluggable metric plus a threshold:
+
+    cosine_similarity   higher is better, match if score >= threshold
+    cosine_distance     1 - similarity, match if score < threshold
+    euclidean           L2 distance between unit vectors, match if score < threshold
+"""
+from collections import namedtuple
+
+import numpy as np
+
+from .face_gallery import face_gallery
+
+# id_number / score are None when nothing could be scored (invalid probe, empty gallery);
+# score is in the matcher's metric, similarity is always the cosine similarity
+MatchResult = namedtuple('MatchResult', 'id_number score similarity matched')
+
+
+class Metric:
+    """Maps cosine similarity of unit vectors to a score and decides matches"""
+    name = None
+    higher_is_better = True
+
+    def from_similarity(self, similarity):
+        raise NotImplementedError
+
+    def is_match(self, score, threshold):
+        return score >= threshold if self.higher_is_better else score < threshold
+
+
+class CosineSimilarity(Metric):
+    name = 'cosine_similarity'
+
+    def from_similarity(self, similarity):
+        return similarity
+
+
+class CosineDistance(Metric):
+    name = 'cosine_distance'
+    higher_is_better = False
+
+    def from_similarity(self, similarity):
+        return 1.0 - np.clip(similarity, -1.0, 1.0)
+
+
+class EuclideanDistance(Metric):
+    name = 'euclidean'
+    higher_is_better = False
+
+    def from_similarity(self, similarity):
+        # ||a - b||^2 = 2 - 2 a.b for unit vectors
+        return np.sqrt(np.maximum(2.0 - 2.0 * similarity, 0.0))
+
+
+METRICS = {}
+
+
+def register_metric(metric):
+    """Make a Metric instance available to GalleryMatcher by name"""
+    METRICS[metric.name] = metric
+    return metric
+
+
+for _metric in (CosineSimilarity(), CosineDistance(), EuclideanDistance()):
+    register_metric(_metric)
+
+
+class GalleryMatcher:
+    """Threshold decision over batched gallery scoring"""
+
+    def __init__(self, metric='cosine_similarity', threshold=0.95, gallery=None, allowed_only=True):
+        """
+        Args:
+            metric: Metric name (see METRICS) or Metric instance
+            threshold: Default decision threshold in the metric's units
+            gallery: FaceGallery to search (defaults to the shared gallery)
+            allowed_only: Ignore enrolled users whose account is not 'allowed'
+        """
+        self.metric = METRICS[metric] if isinstance(metric, str) else metric
+        self.threshold = threshold
+        self.gallery = gallery if gallery is not None else face_gallery
+        self.allowed_only = allowed_only
+
+    def match_batch(self, embeddings, threshold=None):
+        """
+        Match several probes with one matrix product
+
+        Args:
+            embeddings: (N, D) array or list of embedding vectors
+            threshold: Optional override of the default threshold
+
+        Returns:
+            list: MatchResult per probe, in input order
+        """
+        if threshold is None:
+            threshold = self.threshold
+
+        results = []
+        for id_number, similarity in self.gallery.best_matches(embeddings, allowed_only=self.allowed_only):
+            if id_number is None:
+                results.append(MatchResult(None, None, 0.0, False))
+                continue
+            score = float(self.metric.from_similarity(similarity))
+            results.append(MatchResult(id_number, score, similarity, bool(self.metric.is_match(score, threshold))))
+        return results
+
+    def match(self, embedding, threshold=None):
+        """Match a single probe; see match_batch()"""
+        return self.match_batch([embedding], threshold)[0]
@@ -0,0 +1,293 @@
+"""
+ISSC Face Gallery Snapshot
+Shared on-disk copy of the face gallery, mapped by every worker process, so
+workers start without a full DB load and see each other's enrollment changes.
+
+Files in the snapshot directory:
+
+    gallery-<generation>-<token>.npy
+                           (R, D) float32 pose matrix, opened with mmap_mode='r'
+    gallery.json           sidecar: matrix file name, person ids / segment starts,
+                           display names, generation and the DB high-water mark
+                           (max FacesEmbeddings.updated_at)
+    generation             8-byte counter, memory-mapped by every worker
+    lock                   held (flock / msvcrt.locking) while a process reads,
+                           changes and republishes the gallery
+
+Every process maps the same .npy file, so the matrix lives once in the page
+cache instead of once per worker. Matrix files are never overwritten - each
+save writes a new token and the sidecar is swapped with os.replace(), so a
+reader always sees a consistent pair and an old mapping stays valid. Only
+matrices older than the previously published one are deleted, so a reader
+that read the sidecar just before a save can still open its matrix.
+
+Publishers take the directory lock around the whole read-apply-publish
+sequence (see snapshot_lock), so two workers enrolling at the same time
+apply their changes on top of each other instead of overwriting them.
+
+The generation counter is bumped after the sidecar swap. Readers compare it
+with the generation they attached (a plain memory read, no syscall) and only
+re-read the sidecar when another process has published a newer gallery.
+"""
+import glob
+import json
+import mmap
+import os
+import struct
+import threading
+import time
+import uuid
+from collections import namedtuple
+from datetime import datetime
+
+import numpy as np
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+SNAPSHOT_FORMAT_VERSION = 1
+SIDECAR_NAME = 'gallery.json'
+GENERATION_NAME = 'generation'
+LOCK_NAME = 'lock'
+
+Snapshot = namedtuple('Snapshot', 'matrix person_starts person_ids person_info high_water generation')
+
+
+class GenerationCounter:
+    """Little-endian uint64 in a shared memory-mapped file"""
+    _format = struct.Struct('<Q')
+
+    def __init__(self, path):
+        # Create the file once; never truncate a counter another process has mapped
+        with open(path, 'ab') as handle:
+            if handle.tell() < self._format.size:
+                handle.write(b'\0' * (self._format.size - handle.tell()))
+        self._file = open(path, 'r+b')
+        self._map = mmap.mmap(self._file.fileno(), self._format.size)
+
+    def read(self):
+        return self._format.unpack_from(self._map)[0]
+
+    def write(self, value):
+        self._map[:self._format.size] = self._format.pack(value)
+
+    def next_value(self):
+        """Strictly increasing across processes and restarts"""
+        return max(self.read() + 1, time.time_ns())
+
+
+_counters = {}
+_counters_lock = threading.Lock()
+
+
+def generation_counter(directory):
+    """Shared counter of a snapshot directory (one mapping per process)"""
+    with _counters_lock:
+        counter = _counters.get(directory)
+        if counter is None:
+            os.makedirs(directory, exist_ok=True)
+            counter = GenerationCounter(os.path.join(directory, GENERATION_NAME))
+            _counters[directory] = counter
+        return counter
+
+
+def _lock_file(handle):
+    if fcntl is not None:
+        fcntl.flock(handle.fileno(), fcntl.LOCK_EX)
+        return
+    handle.seek(0)
+    while True:
+        try:
+            msvcrt.locking(handle.fileno(), msvcrt.LK_LOCK, 1)
+            return
+        except OSError:
+            # LK_LOCK gives up after ~10 s; keep waiting like flock does
+            continue
+
+
+def _unlock_file(handle):
+    if fcntl is not None:
+        fcntl.flock(handle.fileno(), fcntl.LOCK_UN)
+    else:
+        handle.seek(0)
+        msvcrt.locking(handle.fileno(), msvcrt.LK_UNLCK, 1)
+
+
+class SnapshotLock:
+    """
+    Exclusive lock on a snapshot directory, across processes and threads
+
+    Re-entrant within a thread: write_snapshot() takes it again inside a
+    caller's read-apply-publish block without deadlocking on its own file lock.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._thread_lock = threading.RLock()
+        self._depth = 0
+        self._handle = None
+
+    def __enter__(self):
+        self._thread_lock.acquire()
+        if self._depth == 0:
+            try:
+                handle = open(self.path, 'a+b')
+                try:
+                    _lock_file(handle)
+                except BaseException:
+                    handle.close()
+                    raise
+            except BaseException:
+                self._thread_lock.release()
+                raise
+            self._handle = handle
+        self._depth += 1
+        return self
+
+    def __exit__(self, exc_type, exc, traceback):
+        self._depth -= 1
+        if self._depth == 0:
+            handle, self._handle = self._handle, None
+            try:
+                _unlock_file(handle)
+            finally:
+                handle.close()
+        self._thread_lock.release()
+
+
+_locks = {}
+
+
+def snapshot_lock(directory):
+    """Lock serializing publishers of a snapshot directory (one per process)"""
+    with _counters_lock:
+        lock = _locks.get(directory)
+        if lock is None:
+            os.makedirs(directory, exist_ok=True)
+            lock = SnapshotLock(os.path.join(directory, LOCK_NAME))
+            _locks[directory] = lock
+        return lock
+
+
+def write_snapshot(directory, state, high_water):
+    """
+    Persist a gallery state and publish it to every attached process
+
+    Takes the directory lock; callers that read the published gallery before
+    changing it should hold snapshot_lock() around the whole sequence.
+
+    Args:
+        directory: Snapshot directory (created if missing)
+        state: GalleryState to save
+        high_water: datetime of the newest FacesEmbeddings.updated_at it contains
+
+    Returns:
+        int: Generation number of the published snapshot
+    """
+    os.makedirs(directory, exist_ok=True)
+    with snapshot_lock(directory):
+        counter = generation_counter(directory)
+        generation = counter.next_value()
+        previous_name = _sidecar_matrix(directory)
+        matrix_name = f'gallery-{generation:020d}-{uuid.uuid4().hex[:8]}.npy'
+        matrix_path = os.path.join(directory, matrix_name)
+        np.save(matrix_path, np.ascontiguousarray(state.matrix, dtype=np.float32))
+        _write_sidecar(directory, generation, matrix_name, state, high_water)
+        counter.write(generation)
+
+        _remove_stale_matrices(directory, matrix_name, previous_name)
+    return generation
+
+
+def _write_sidecar(directory, generation, matrix_name, state, high_water):
+    sidecar = {
+        'version': SNAPSHOT_FORMAT_VERSION,
+        'generation': generation,
+        'dim': int(state.matrix.shape[1]),
+        'matrix': matrix_name,
+        'high_water': high_water.isoformat() if high_water else None,
+        'person_ids': list(state.person_ids),
+        'person_starts': state.person_starts.tolist(),
+        'person_info': state.person_info,
+    }
+    sidecar_tmp = os.path.join(directory, f'{SIDECAR_NAME}.{uuid.uuid4().hex}.tmp')
+    with open(sidecar_tmp, 'w', encoding='utf-8') as handle:
+        json.dump(sidecar, handle)
+    os.replace(sidecar_tmp, os.path.join(directory, SIDECAR_NAME))
+
+
+def _sidecar_matrix(directory):
+    """Matrix file name the published sidecar points to (None if there is none)"""
+    try:
+        with open(os.path.join(directory, SIDECAR_NAME), encoding='utf-8') as handle:
+            return json.load(handle).get('matrix')
+    except (OSError, ValueError, AttributeError):
+        return None
+
+
+def _matrix_generation(name):
+    """Generation encoded in a matrix file name (0 for unversioned names)"""
+    generation = name[len('gallery-'):].split('-', 1)[0]
+    return int(generation) if len(generation) == 20 and generation.isdigit() else 0
+
+
+def _remove_stale_matrices(directory, current_name, previous_name):
+    """Delete matrices older than the previously published one, which readers may still be opening"""
+    if previous_name is None:
+        return
+    oldest_kept = _matrix_generation(previous_name)
+    for path in glob.glob(os.path.join(directory, 'gallery-*.npy')):
+        name = os.path.basename(path)
+        if name in (current_name, previous_name) or _matrix_generation(name) >= oldest_kept:
+            continue
+        try:
+            os.remove(path)
+        except OSError:
+            # Still mapped by another process (Windows) - removed on a later save
+            pass
+
+
+def read_snapshot(directory, dim):
+    """
+    Map the current snapshot read-only
+
+    Args:
+        directory: Snapshot directory
+        dim: Expected embedding dimension
+
+    Returns:
+        Snapshot or None when there is no usable snapshot
+    """
+    sidecar_path = os.path.join(directory, SIDECAR_NAME)
+    try:
+        with open(sidecar_path, encoding='utf-8') as handle:
+            sidecar = json.load(handle)
+    except (OSError, ValueError):
+        return None
+
+    if sidecar.get('version') != SNAPSHOT_FORMAT_VERSION or sidecar.get('dim') != dim:
+        return None
+
+    try:
+        matrix = np.load(os.path.join(directory, sidecar['matrix']), mmap_mode='r')
+    except (OSError, ValueError, KeyError):
+        return None
+
+    person_starts = np.array(sidecar['person_starts'], dtype=np.int64)
+    person_ids = np.array(sidecar['person_ids'], dtype=object)
+    if matrix.ndim != 2 or matrix.shape[1] != dim or len(person_starts) != len(person_ids):
+        return None
+
+    high_water = datetime.fromisoformat(sidecar['high_water']) if sidecar.get('high_water') else None
+    return Snapshot(matrix, person_starts, person_ids, sidecar['person_info'], high_water, sidecar.get('generation', 0))
+
+
+def published_generation(directory):
+    """Generation most recently published in a snapshot directory (0 if none)"""
+    try:
+        return generation_counter(directory).read()
+    except (OSError, ValueError):
+        return 0
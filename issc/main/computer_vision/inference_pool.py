@@ -0,0 +1,374 @@
+"""
+ISSC Inference Pool
+One face inference service shared by every live feed camera.
+
+Capture threads submit work per camera; a dispatcher thread hands it to a pool
+of worker processes, each of which loads DeepFace and the models once (see
+inference_worker.init_worker). Model inference therefore runs outside the web
+process's GIL and TensorFlow is loaded once per worker, not once per camera.
+
+    - Bounded: each camera has at most max_pending queued jobs, and at most
+      `workers` batches are in flight, so a slow pool never builds a backlog.
+    - Drop-oldest: a new job for a camera whose queue is full evicts that
+      camera's oldest queued job (a stale frame is worth less than a new one).
+    - Fair: cameras with queued work are served round-robin, so one busy
+      gate cannot starve the others.
+    - Batched: a free worker is handed up to batch_size queued frames (taken
+      round-robin across cameras), waiting at most batch_window seconds for
+      more to arrive. The worker embeds all of their faces in one forward
+      pass (inference_worker.run_batch).
+
+Results are delivered to the submitting camera's handler, in the web process,
+from the executor's callback thread.
+
+A worker process that dies (TensorFlow running out of memory, a crash in a
+native detector) breaks the whole ProcessPoolExecutor. The batches it held
+fail, and the dispatcher replaces the executor with a new one, waiting
+longer after each break in a row, so recognition resumes without a restart
+of the web process.
+"""
+import logging
+import multiprocessing
+import threading
+import time
+from collections import OrderedDict, deque
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+from django.conf import settings
+
+from . import inference_worker
+from .cv_logging import log_limited, logger
+from .face_detectors import DETECTORS, create_detector
+
+
+class InferenceJob:
+    __slots__ = ('camera_id', 'func', 'args', 'handler', 'context')
+
+    def __init__(self, camera_id, func, args, handler, context):
+        self.camera_id = camera_id
+        self.func = func
+        self.args = args
+        self.handler = handler
+        self.context = context
+
+
+class InferencePool:
+    """Bounded, per-camera fair dispatch of inference jobs to worker processes"""
+
+    def __init__(self, workers=2, max_pending=2, batch_size=1, batch_window=0.0, worker_config=None, executor=None,
+                 executor_factory=None, restart_backoff=1.0, max_restart_backoff=30.0):
+        """
+        Args:
+            workers: Worker processes (= batches in flight)
+            max_pending: Queued jobs kept per camera before the oldest is dropped
+            batch_size: Most jobs handed to a worker in one call
+            batch_window: Seconds a partial batch waits for more jobs
+            worker_config: inference_worker.configure() options for each worker
+            executor: Executor to use instead of a process pool (tests, inline use)
+            executor_factory: Callable() -> executor, used to start and to replace
+                a broken pool (defaults to the worker process pool unless
+                executor is given)
+            restart_backoff: Seconds before the first replacement of a broken
+                pool, doubled for each further break in a row
+            max_restart_backoff: Longest wait before a replacement
+        """
+        self.workers = workers
+        self.max_pending = max_pending
+        self.batch_size = max(1, batch_size)
+        self.batch_window = batch_window
+        self.worker_config = worker_config or {}
+        self.restart_backoff = restart_backoff
+        self.max_restart_backoff = max_restart_backoff
+        self.restarts = 0  # Executors replaced after a worker died
+
+        self._executor = executor
+        if executor_factory is None and executor is None:
+            executor_factory = self._process_executor
+        self._executor_factory = executor_factory
+        self._broken = None  # The executor that broke, until it is replaced
+        self._breaks_in_row = 0
+        self._cond = threading.Condition()
+        self._queues = OrderedDict()  # camera_id -> deque of InferenceJob, in round-robin order
+        self._stats = {}
+        self._in_flight = 0
+        self._closed = False
+        self._dispatcher = None
+
+    def start(self):
+        """Start the worker processes and the dispatcher thread"""
+        with self._cond:
+            if self._dispatcher is not None:
+                return self
+            if self._executor is None:
+                self._executor = self._executor_factory()
+            self._dispatcher = threading.Thread(target=self._dispatch, name='inference-dispatcher', daemon=True)
+            self._dispatcher.start()
+        return self
+
+    def submit(self, camera_id, func, args, handler, context=None):
+        """
+        Queue func(*args) for a worker process
+
+        Args:
+            camera_id: Camera the job belongs to (fairness and backpressure unit)
+            func: Module-level function run in the worker (must be picklable)
+            args: Arguments for func
+            handler: handler(context, result, error) called with the outcome
+            context: Caller data passed back to handler (stays in this process)
+
+        Returns:
+            bool: False if an older job of the camera was dropped to make room
+        """
+        job = InferenceJob(camera_id, func, args, handler, context)
+        with self._cond:
+            if self._closed:
+                raise RuntimeError("Inference pool is shut down")
+
+            queue = self._queues.get(camera_id)
+            if queue is None:
+                queue = self._queues[camera_id] = deque()
+            stats = self._camera_stats(camera_id)
+            stats['submitted'] += 1
+
+            dropped = len(queue) >= self.max_pending
+            if dropped:
+                queue.popleft()
+                stats['dropped'] += 1
+            queue.append(job)
+            self._cond.notify_all()
+        return not dropped
+
+    def remove_camera(self, camera_id):
+        """Discard a camera's queued jobs; results of its in-flight jobs are ignored"""
+        with self._cond:
+            self._queues.pop(camera_id, None)
+            self._stats.pop(camera_id, None)
+
+    def stats(self):
+        """Per-camera counters plus queued jobs, keyed by camera id"""
+        with self._cond:
+            return {
+                camera_id: dict(stats, pending=len(self._queues.get(camera_id, ())))
+                for camera_id, stats in self._stats.items()
+            }
+
+    def shutdown(self, wait=False):
+        with self._cond:
+            self._closed = True
+            self._queues.clear()
+            self._cond.notify_all()
+        if self._executor is not None:
+            self._executor.shutdown(wait=wait, cancel_futures=True)
+
+    def _process_executor(self):
+        return ProcessPoolExecutor(
+            max_workers=self.workers,
+            mp_context=multiprocessing.get_context('spawn'),
+            initializer=inference_worker.init_worker,
+            initargs=(self.worker_config,),
+        )
+
+    def _mark_broken(self, executor):
+        with self._cond:
+            # Batches still in flight on an executor that was already replaced fail too
+            if executor is self._executor and self._broken is None:
+                self._broken = executor
+                log_limited(logging.ERROR, ('inference_pool', 'broken'),
+                            "Inference worker process died; replacing the worker pool")
+
+    def _replace_broken_executor(self):
+        """Swap the broken executor for a new one after the backoff (False when closed meanwhile)"""
+        with self._cond:
+            broken = self._broken
+            if broken is None or self._executor_factory is None:
+                self._broken = None
+                return not self._closed
+            delay = min(self.max_restart_backoff, self.restart_backoff * 2 ** self._breaks_in_row)
+            self._cond.wait_for(lambda: self._closed, delay)
+            if self._closed:
+                return False
+            try:
+                self._executor = self._executor_factory()
+            except Exception:
+                logger.exception("Could not start a new inference worker pool")
+                self._breaks_in_row += 1
+                return True  # Submitting to the broken pool fails and marks it again
+            self._broken = None
+            self._breaks_in_row += 1
+            self.restarts += 1
+        broken.shutdown(wait=False, cancel_futures=True)
+        logger.warning("Inference worker pool replaced (restart %d, after %.1fs)", self.restarts, delay)
+        return True
+
+    def _camera_stats(self, camera_id):
+        stats = self._stats.get(camera_id)
+        if stats is None:
+            stats = self._stats[camera_id] = {'submitted': 0, 'dropped': 0, 'completed': 0, 'failed': 0}
+        return stats
+
+    def _next_job(self, func=None):
+        """Oldest job of the next camera in round-robin order (optionally only jobs of func), or None"""
+        for camera_id, queue in self._queues.items():
+            if queue and (func is None or queue[0].func is func):
+                job = queue.popleft()
+                self._queues.move_to_end(camera_id)
+                return job
+        return None
+
+    def _next_batch(self):
+        """Wait for a free worker and collect the next batch (None when closed)"""
+        with self._cond:
+            job = None
+            while not self._closed:
+                if self._in_flight < self.workers:
+                    job = self._next_job()
+                    if job is not None:
+                        break
+                self._cond.wait()
+            if self._closed:
+                return None
+
+            jobs = [job]
+            deadline = time.monotonic() + self.batch_window
+            while len(jobs) < self.batch_size and not self._closed:
+                more = self._next_job(job.func)
+                if more is not None:
+                    jobs.append(more)
+                    continue
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                self._cond.wait(remaining)
+            self._in_flight += 1
+            return jobs
+
+    def _dispatch(self):
+        while True:
+            jobs = self._next_batch()
+            if jobs is None:
+                return
+
+            if self._broken is not None and not self._replace_broken_executor():
+                self._finish(jobs, None, None, deliver=False)
+                return
+
+            executor = self._executor
+            try:
+                future = executor.submit(inference_worker.run_batch, jobs[0].func, [job.args for job in jobs])
+            except Exception as e:
+                if isinstance(e, BrokenProcessPool):
+                    self._mark_broken(executor)
+                self._finish(jobs, None, e)
+                continue
+            future.add_done_callback(lambda future, jobs=jobs, executor=executor: self._on_done(jobs, future, executor))
+
+    def _on_done(self, jobs, future, executor=None):
+        if future.cancelled():
+            self._finish(jobs, None, None, deliver=False)
+            return
+        error = future.exception()
+        if isinstance(error, BrokenProcessPool):
+            self._mark_broken(executor)
+        elif executor is self._executor:
+            self._breaks_in_row = 0
+        self._finish(jobs, None if error else future.result(), error)
+
+    def _finish(self, jobs, results, error, deliver=True):
+        """Scatter a batch's results to the handlers of its jobs"""
+        outcomes = []
+        for index, job in enumerate(jobs):
+            result = results[index] if results is not None else None
+            job_error = error or (result if isinstance(result, Exception) else None)
+            outcomes.append((job, None if job_error else result, job_error))
+
+        with self._cond:
+            self._in_flight -= 1
+            active = [outcome for outcome in outcomes if outcome[0].camera_id in self._queues]
+            for job, _, job_error in active:
+                self._camera_stats(job.camera_id)['failed' if job_error else 'completed'] += 1
+            self._cond.notify_all()
+
+        if not deliver:
+            return
+        for job, result, job_error in active:
+            try:
+                job.handler(job.context, result, job_error)
+            except Exception:
+                logger.exception("Inference result handler failed for camera %s", job.camera_id)
+
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def detector_options():
+    """face_detectors.create_detector() options from settings"""
+    return {
+        'input_width': getattr(settings, 'FACE_DETECTOR_INPUT_WIDTH', 320),
+        'score_threshold': getattr(settings, 'FACE_DETECTOR_SCORE_THRESHOLD', 0.8),
+        'model_path': str(getattr(settings, 'FACE_DETECTOR_MODEL_PATH', '') or '') or None,
+        'config_path': str(getattr(settings, 'FACE_DETECTOR_CONFIG_PATH', '') or '') or None,
+    }
+
+
+def native_detector_from_settings():
+    """The configured face detector if it is a native one (see face_detectors.DETECTORS), else None"""
+    name = getattr(settings, 'FACE_DETECTOR_BACKEND', 'mtcnn')
+    if name not in DETECTORS:
+        return None
+    return create_detector(name, **detector_options())
+
+
+def inference_config():
+    """inference_worker.configure() options from settings"""
+    return {
+        'detector_backend': getattr(settings, 'FACE_DETECTOR_BACKEND', 'mtcnn'),
+        'detector_options': detector_options(),
+        'model_name': 'Facenet',
+        'embedding_backend': getattr(settings, 'FACE_EMBEDDING_BACKEND', 'deepface'),
+        'embedding_model_path': str(getattr(settings, 'FACE_EMBEDDING_MODEL_PATH', '') or '') or None,
+    }
+
+
+def get_inference_pool():
+    """
+    The process-wide inference pool, started on first use
+
+    Returns:
+        InferencePool or None when FACE_INFERENCE_WORKERS is 0 (inference
+        runs inline in each live feed thread, configured for this process)
+    """
+    global _pool
+    workers = getattr(settings, 'FACE_INFERENCE_WORKERS', 2)
+    if workers <= 0:
+        inference_worker.configure(inference_config())
+        return None
+
+    with _pool_lock:
+        if _pool is None:
+            _pool = InferencePool(
+                workers=workers,
+                max_pending=getattr(settings, 'FACE_INFERENCE_MAX_PENDING', 2),
+                batch_size=getattr(settings, 'FACE_INFERENCE_BATCH_SIZE', 8),
+                batch_window=getattr(settings, 'FACE_INFERENCE_BATCH_WINDOW_MS', 20) / 1000.0,
+                worker_config=inference_config(),
+            ).start()
+            print(f"🧠 Inference pool started with {workers} worker process(es)")
+        return _pool
+
+
+def shutdown_inference_pool():
+    """Stop the shared pool's worker processes (restarted by the next get_inference_pool())"""
+    global _pool
+    with _pool_lock:
+        pool, _pool = _pool, None
+    if pool is not None:
+        pool.shutdown()
+
+
+def forget_camera(camera_id):
+    """Drop a stopped camera from the shared pool, if it is running"""
+    pool = _pool
+    if pool is not None:
+        pool.remove_camera(camera_id)
@@ -0,0 +1,280 @@
+"""
+ISSC Inference Worker
+Face detection and batched Facenet embedding.
+
+Runs inside the inference pool's worker processes (each loads DeepFace and the
+models once in init_worker()) or inline in the live feed thread when the pool
+is disabled. The module has no Django imports so spawned workers start
+without loading the project.
+
+The pool hands a worker several queued frames at once (run_batch). Faces are
+detected frame by frame, then every face that needs an embedding - from all
+of those frames, i.e. from several cameras - goes through one Facenet forward
+pass instead of one DeepFace.represent() call per face. The forward pass runs
+on the configured embedding backend (see embedding_backends), detection on
+the configured detector (a native one from face_detectors, or DeepFace's).
+"""
+import time
+
+import numpy as np
+
+from .embedding_backends import create_backend
+from .face_detectors import DETECTORS, align_face, create_detector
+from .face_tracker import box_iou
+
+_deepface = None
+_embedding_backend = None
+_detector = None
+_config = {
+    'detector_backend': 'mtcnn',
+    'detector_options': {},
+    'model_name': 'Facenet',
+    'embedding_backend': 'deepface',
+    'embedding_model_path': None,
+}
+
+
+def get_deepface():
+    """Import DeepFace (and TensorFlow) on first use"""
+    global _deepface
+    if _deepface is None:
+        from deepface import DeepFace
+        _deepface = DeepFace
+    return _deepface
+
+
+def configure(config):
+    """
+    Set detector / embedding model options (see _config for the keys)
+
+    The detector and embedding backend are rebuilt on next use if their
+    options changed.
+    """
+    global _embedding_backend, _detector
+    backend_keys = ('model_name', 'embedding_backend', 'embedding_model_path')
+    if any(config.get(key, _config[key]) != _config[key] for key in backend_keys):
+        _embedding_backend = None
+    if any(config.get(key, _config[key]) != _config[key] for key in ('detector_backend', 'detector_options')):
+        _detector = None
+    _config.update(config)
+
+
+def init_worker(config):
+    """Process initializer: configure, load DeepFace and warm the models once"""
+    configure(config)
+    try:
+        warm_up()
+    except Exception as e:
+        # The first detect_and_embed() call will load (or fail) again
+        print(f"⚠️ Inference worker could not preload {_config['model_name']}: {e}")
+
+
+def warm_up():
+    """
+    Build the detector and embedding model and run one dummy inference each,
+    so graph tracing and buffer allocation happen before the first real frame
+
+    Returns:
+        dict: Seconds spent per step
+    """
+    timings = {}
+    if get_detector() is None or _config['embedding_backend'] == 'deepface':
+        started = time.monotonic()
+        get_deepface()
+        timings['import'] = time.monotonic() - started
+
+    started = time.monotonic()
+    detect_faces(np.zeros((480, 640, 3), dtype=np.uint8))
+    timings['detector'] = time.monotonic() - started
+
+    started = time.monotonic()
+    embed_faces([np.zeros((160, 160, 3), dtype=np.uint8)])
+    timings['embedding'] = time.monotonic() - started
+    return timings
+
+
+def get_embedding_backend():
+    """The process's embedding backend, built from _config on first use"""
+    global _embedding_backend
+    if _embedding_backend is None:
+        _embedding_backend = create_backend(
+            _config['embedding_backend'],
+            model_name=_config['model_name'],
+            model_path=_config['embedding_model_path'],
+        )
+    return _embedding_backend
+
+
+def get_detector():
+    """The process's native face detector, or None when detection goes through DeepFace"""
+    global _detector
+    if _detector is None and _config['detector_backend'] in DETECTORS:
+        _detector = create_detector(_config['detector_backend'], **_config['detector_options'])
+    return _detector
+
+
+def extract_native_faces(detector, rgb_frame):
+    """
+    DeepFace.extract_faces() for a native detector
+
+    Returns:
+        list: {'facial_area', 'face', 'confidence'} per face, with aligned
+        uint8 crops in the channel order extract_faces() would return
+    """
+    face_objs = []
+    for detection in detector.detect(rgb_frame, is_rgb=True):
+        x, y, w, h = detection.box
+        facial_area = {'x': x, 'y': y, 'w': w, 'h': h}
+        if detection.landmarks:
+            for key in ('left_eye', 'right_eye'):
+                if key in detection.landmarks:
+                    facial_area[key] = tuple(int(round(v)) for v in detection.landmarks[key])
+        face = align_face(rgb_frame, detection)
+        if face is None:
+            continue
+        # extract_faces() treats arrays as BGR and returns the face flipped;
+        # flip the same way so embeddings match DeepFace-detected faces
+        face_objs.append({'facial_area': facial_area, 'face': face[:, :, ::-1], 'confidence': detection.score})
+    return face_objs
+
+
+def embed_faces(faces):
+    """
+    Embed several face crops with one forward pass
+
+    Args:
+        faces: List of face crops from DeepFace.extract_faces
+
+    Returns:
+        numpy.ndarray: (N, D) float32, L2-normalized rows (all-zero rows for
+        degenerate outputs)
+    """
+    return get_embedding_backend().embed(faces)
+
+
+def detect_faces(rgb_frame, skip_boxes=(), skip_iou=0.3, min_size=0):
+    """
+    Detect faces and pick the ones that need an embedding
+
+    Args:
+        rgb_frame: RGB image array
+        skip_boxes: (x, y, w, h) boxes of faces whose identity is already known;
+            detections overlapping one by skip_iou or more are not embedded
+        skip_iou: IoU with a skip box at which a detection is not embedded
+        min_size: Detections narrower or shorter than this (pixels) are not embedded
+
+    Returns:
+        tuple: (detections, crops) - detection dicts as returned by
+        detect_and_embed() with 'embedding' still None, and
+        {detection index: face crop} for the faces to embed
+    """
+    detector = get_detector()
+    if detector is not None:
+        face_objs = extract_native_faces(detector, rgb_frame)
+    else:
+        face_objs = get_deepface().extract_faces(
+            img_path=rgb_frame,
+            detector_backend=_config['detector_backend'],
+            enforce_detection=False,
+            align=True
+        )
+
+    known = [(x, y, x + w, y + h) for x, y, w, h in skip_boxes]
+    detections = []
+    crops = {}
+    for face_obj in face_objs:
+        facial_area = face_obj.get('facial_area', {})
+        if not all(key in facial_area for key in ('x', 'y', 'w', 'h')):
+            continue
+
+        x, y, w, h = facial_area['x'], facial_area['y'], facial_area['w'], facial_area['h']
+        wanted = w >= min_size and h >= min_size
+        if wanted and not any(box_iou((x, y, x + w, y + h), box) >= skip_iou for box in known):
+            crops[len(detections)] = face_obj['face']
+        detections.append({'facial_area': facial_area, 'embedding': None, 'error': None})
+    return detections, crops
+
+
+def detect_and_embed_batch(args_list):
+    """
+    detect_and_embed() for several frames, embedding all their faces in one pass
+
+    Args:
+        args_list: List of detect_and_embed() argument tuples
+
+    Returns:
+        list: detect_and_embed() result per frame, or the exception its
+        detection raised
+    """
+    results = []
+    pending = []  # (frame index, detection index, crop)
+    for frame_index, args in enumerate(args_list):
+        try:
+            detections, crops = detect_faces(*args)
+        except Exception as e:
+            results.append(e)
+            continue
+        results.append(detections)
+        pending.extend((frame_index, detection_index, crop) for detection_index, crop in crops.items())
+
+    if not pending:
+        return results
+
+    try:
+        embeddings = embed_faces([crop for _, _, crop in pending])
+    except Exception as e:
+        for frame_index, detection_index, _ in pending:
+            results[frame_index][detection_index]['error'] = str(e)
+        return results
+
+    # Scatter the batch back to the frames it came from
+    for (frame_index, detection_index, _), embedding in zip(pending, embeddings):
+        results[frame_index][detection_index]['embedding'] = embedding if embedding.any() else None
+    return results
+
+
+def detect_and_embed(rgb_frame, skip_boxes=(), skip_iou=0.3, min_size=0):
+    """
+    Detect faces in a frame and embed the ones that need it
+
+    Args:
+        rgb_frame: RGB image array
+        skip_boxes: (x, y, w, h) boxes of faces whose identity is already known
+        skip_iou: IoU with a skip box at which a detection is not embedded
+        min_size: Detections narrower or shorter than this (pixels) are not embedded
+
+    Returns:
+        list: {'facial_area': dict, 'embedding': ndarray or None, 'error': str or None}
+        per detection
+    """
+    result = detect_and_embed_batch([(rgb_frame, skip_boxes, skip_iou, min_size)])[0]
+    if isinstance(result, Exception):
+        raise result
+    return result
+
+
+# Functions the pool may run for several jobs in one call: func -> batch(args_list)
+BATCH_FUNCTIONS = {
+    detect_and_embed: detect_and_embed_batch,
+}
+
+
+def run_batch(func, args_list):
+    """
+    Pool entry point: run several queued jobs of one function
+
+    Returns:
+        list: func(*args) result per job, in order; a job that failed on its
+        own gets its exception instead of a result
+    """
+    batch = BATCH_FUNCTIONS.get(func)
+    if batch is not None:
+        return batch(args_list)
+
+    results = []
+    for args in args_list:
+        try:
+            results.append(func(*args))
+        except Exception as e:
+            results.append(e)
+    return results
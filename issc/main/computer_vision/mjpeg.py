@@ -0,0 +1,288 @@
+"""
+ISSC MJPEG Encoding
+Encode-once JPEG parts for the multipart/x-mixed-replace video feeds.
+
+Every FrameBuffer gets one MJPEGEncoder per variant (JPEG quality and
+maximum width). The first stream that asks for a new frame encodes it; every
+other stream watching the same camera in the same variant gets the cached part
+for that sequence number. Encoder CPU therefore
+follows the camera frame rate, not the number of viewers, and nothing is
+encoded while nobody is watching.
+
+Under ASGI the feeds stream through stream_async(): each viewer is a coroutine
+awaiting FrameBuffer.wait_async(), so a wall of monitors costs coroutines
+rather than server threads. Encodes still run on a thread pool, once per frame.
+"""
+import asyncio
+import threading
+import time
+import weakref
+
+import cv2
+
+BOUNDARY = b'frame'
+CONTENT_TYPE = 'multipart/x-mixed-replace; boundary=frame'
+
+
+def fit_width(image, width):
+    """The image scaled down (aspect kept) to at most width pixels wide"""
+    height, source_width = image.shape[:2]
+    if not width or source_width <= width:
+        return image
+    return cv2.resize(image, (width, max(1, round(height * width / source_width))), interpolation=cv2.INTER_AREA)
+
+
+def encode_part(image, quality=85, width=None):
+    """
+    Encode one image as a complete multipart JPEG part
+
+    Args:
+        image: BGR frame
+        quality: JPEG quality (0-100)
+        width: Maximum width; wider images are scaled down first (None = as is)
+
+    Returns:
+        bytes: Boundary, headers, JPEG data and trailing CRLF
+    """
+    image = fit_width(image, width)
+    ok, buffer = cv2.imencode('.jpg', image, [cv2.IMWRITE_JPEG_QUALITY, quality])
+    if not ok:
+        raise ValueError("JPEG encoding failed")
+    return (b'--' + BOUNDARY + b'\r\n'
+            b'Content-Type: image/jpeg\r\n\r\n' + buffer.tobytes() + b'\r\n')
+
+
+class MJPEGEncoder:
+    """Encodes a FrameBuffer's frames once each, for any number of streams"""
+
+    def __init__(self, frames, quality=85, width=None):
+        """
+        Args:
+            frames: FrameBuffer to encode
+            quality: JPEG quality (0-100)
+            width: Maximum width of the encoded frames (None = camera resolution)
+        """
+        # Weak: the registry below is keyed by the buffer, and a strong
+        # reference from its value would keep every retired buffer alive
+        self._frames = weakref.ref(frames)
+        self.quality = quality
+        self.width = width
+        self.encoded = 0  # Frames encoded
+        self.served = 0   # Parts handed to streams
+        self._seq = 0
+        self._part = None
+        self._lock = threading.Lock()
+
+    @property
+    def frames(self):
+        """The encoded FrameBuffer (None once nothing else references it)"""
+        return self._frames()
+
+    def part(self, frame):
+        """The encoded part of a Frame from self.frames, encoding it if nobody has yet"""
+        with self._lock:
+            if frame.seq != self._seq:
+                if frame.seq < self._seq:
+                    # A stream that fell behind; the cache only keeps the newest part
+                    return encode_part(frame.image, self.quality, self.width)
+                self._part = encode_part(frame.image, self.quality, self.width)
+                self._seq = frame.seq
+                self.encoded += 1
+            self.served += 1
+            return self._part
+
+    def cached_part(self, seq):
+        """The cached part of frame seq, or None; never waits for an encode in progress"""
+        if not self._lock.acquire(blocking=False):
+            return None
+        try:
+            if seq != self._seq:
+                return None
+            self.served += 1
+            return self._part
+        finally:
+            self._lock.release()
+
+    def next_part(self, after_seq):
+        """
+        The newest part if its frame is newer than after_seq
+
+        Returns:
+            tuple or None: (seq, part bytes)
+        """
+        frame = self.frames.newer(after_seq)
+        if frame is None:
+            return None
+        return frame.seq, self.part(frame)
+
+    def wait_part(self, after_seq, timeout=None):
+        """
+        Block until a frame newer than after_seq is published (see FrameBuffer.wait)
+
+        Returns:
+            tuple or None: (seq, part bytes), None on timeout or when the buffer closes
+        """
+        frame = self.frames.wait(after_seq, timeout)
+        if frame is None:
+            return None
+        return frame.seq, self.part(frame)
+
+    async def wait_part_async(self, after_seq, timeout=None):
+        """
+        wait_part() for coroutines; a frame nobody has encoded yet is encoded on
+        the default executor so the event loop keeps serving the other viewers
+
+        Returns:
+            tuple or None: (seq, part bytes), None on timeout or when the buffer closes
+        """
+        frame = await self.frames.wait_async(after_seq, timeout)
+        if frame is None:
+            return None
+        part = self.cached_part(frame.seq)
+        if part is None:
+            part = await asyncio.get_running_loop().run_in_executor(None, self.part, frame)
+        return frame.seq, part
+
+    def status(self):
+        """Frames encoded and parts served (served / encoded = viewers sharing each encode)"""
+        return {
+            'quality': self.quality,
+            'width': self.width,
+            'seq': self._seq,
+            'encoded': self.encoded,
+            'served': self.served,
+        }
+
+
+_encoders = weakref.WeakKeyDictionary()  # FrameBuffer -> {(quality, width): MJPEGEncoder}
+_encoders_lock = threading.Lock()
+
+
+def mjpeg_encoder(frames, quality=85, width=None):
+    """The shared MJPEGEncoder of a FrameBuffer in this variant (created on first use)"""
+    with _encoders_lock:
+        variants = _encoders.get(frames)
+        if variants is None:
+            variants = _encoders[frames] = {}
+        encoder = variants.get((quality, width))
+        if encoder is None:
+            encoder = variants[(quality, width)] = MJPEGEncoder(frames, quality, width)
+        return encoder
+
+
+def mjpeg_encoders(frames):
+    """Every variant encoder of a FrameBuffer (for status reports)"""
+    with _encoders_lock:
+        return list(_encoders.get(frames, {}).values())
+
+
+def is_async_request(request):
+    """True when the request is served by the ASGI handler (stream with stream_async())"""
+    from django.core.handlers.asgi import ASGIRequest
+    return isinstance(request, ASGIRequest)
+
+
+async def stream_async(source, quality, placeholder=None, delay=0.1, running=None, timeout=1.0, control=None):
+    """
+    Async generator of MJPEG parts for StreamingHttpResponse under ASGI
+
+    Args:
+        source: Callable() -> FrameBuffer to stream, or None while there is none;
+            called on every iteration because cameras start and stop
+        quality: JPEG quality (the encoder is shared with the sync streams)
+        placeholder: Callable() -> part bytes sent every delay seconds while
+            source() returns None (None = send nothing and check again)
+        delay: Seconds between placeholder parts / source checks
+        running: Callable() -> bool; the stream ends when it returns False
+        timeout: Seconds to wait for a frame before checking source() and running() again
+        control: StreamControl of the viewer; picks the variant (instead of
+            quality), paces the stream and adapts to the time each send takes
+    """
+    last_seq = 0
+    while running is None or running():
+        try:
+            frames = source()
+            if frames is None:
+                last_seq = 0  # A restarted camera gets a new buffer
+                if placeholder is not None:
+                    yield placeholder()
+                await asyncio.sleep(delay)
+                continue
+            if control is None:
+                encoded = await mjpeg_encoder(frames, quality).wait_part_async(last_seq, timeout)
+            else:
+                pause = control.delay()
+                if pause:
+                    await asyncio.sleep(pause)
+                encoded = await control.encoder(frames).wait_part_async(last_seq, timeout)
+            if encoded is not None:
+                last_seq, part = encoded
+                started = time.monotonic()
+                yield part  # Resumes once the server has taken the part (drained under backpressure)
+                if control is not None:
+                    control.sent(time.monotonic() - started)
+            elif frames.closed:
+                await asyncio.sleep(delay)  # Stopped camera, until source() lets go of it
+        except Exception as e:
+            print(f"Error in async video stream: {e}")
+            await asyncio.sleep(delay)
+
+
+def cancel_on_disconnect(application):
+    """
+    ASGI wrapper that ends MJPEG streams when their viewer disconnects
+
+    Django 4.2 stops reading the ASGI receive channel once it has the request
+    body, so it never sees http.disconnect and an endless feed would keep
+    streaming into a closed socket. This reads the channel for responses with
+    the MJPEG content type and cancels the response when the viewer leaves.
+
+    Args:
+        application: Django's ASGI application
+
+    Returns:
+        The wrapped ASGI application
+    """
+    async def app(scope, receive, send):
+        if scope['type'] != 'http':
+            return await application(scope, receive, send)
+
+        body_read = asyncio.Event()
+        streaming = asyncio.Event()
+        disconnected = False
+
+        async def receive_request():
+            message = await receive()
+            if message['type'] != 'http.request' or not message.get('more_body', False):
+                body_read.set()
+            return message
+
+        async def send_response(message):
+            if message['type'] == 'http.response.start':
+                headers = {name.lower(): value for name, value in message.get('headers', [])}
+                if headers.get(b'content-type', b'').startswith(b'multipart/x-mixed-replace'):
+                    streaming.set()
+            await send(message)
+
+        response = asyncio.ensure_future(application(scope, receive_request, send_response))
+
+        async def watch():
+            nonlocal disconnected
+            await body_read.wait()
+            await streaming.wait()
+            while (await receive())['type'] != 'http.disconnect':
+                pass
+            disconnected = True
+            response.cancel()
+
+        watcher = asyncio.ensure_future(watch())
+        try:
+            await response
+        except asyncio.CancelledError:
+            response.cancel()
+            if not disconnected:
+                raise
+        finally:
+            watcher.cancel()
+
+    return app
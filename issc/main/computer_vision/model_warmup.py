@@ -0,0 +1,133 @@
+"""
+ISSC Model Warm-up
+Optional start-up phase that makes the recognition models hot before traffic.
+
+With FACE_WARMUP_ON_START enabled the server loads the face gallery and warms
+the models in a background thread as soon as Django is ready:
+
+    - inference pool enabled: every pool worker builds MTCNN and Facenet and
+      runs a dummy inference in its initializer; warm-up waits for each one
+    - inference pool disabled: the same happens in the web process
+
+/healthz/ready reports readiness() so a load balancer or systemd unit can hold
+traffic until the state is 'ready'. Without FACE_WARMUP_ON_START nothing is
+loaded up front (the lazy dev path) and the probe reports 'lazy'.
+"""
+import threading
+import time
+
+from django.conf import settings
+
+from . import inference_worker
+from .face_gallery import warm_start_face_gallery
+from .inference_pool import get_inference_pool
+
+COLD = 'cold'
+WARMING = 'warming'
+READY = 'ready'
+FAILED = 'failed'
+LAZY = 'lazy'
+
+_lock = threading.Lock()
+_status = {'state': COLD, 'error': None, 'started': None, 'finished': None, 'timings': {}}
+
+
+def warmup_enabled():
+    return getattr(settings, 'FACE_WARMUP_ON_START', False)
+
+
+def readiness():
+    """
+    Current warm-up status
+
+    Returns:
+        dict: state ('lazy', 'cold', 'warming', 'ready' or 'failed'), error,
+        seconds taken per step and in total
+    """
+    with _lock:
+        status = dict(_status, timings=dict(_status['timings']))
+    if status['state'] == COLD and not warmup_enabled():
+        status['state'] = LAZY
+    if status['started'] is not None:
+        status['elapsed'] = (status['finished'] or time.monotonic()) - status['started']
+    return status
+
+
+def _set(**changes):
+    with _lock:
+        _status.update(changes)
+
+
+def _warm_pool_workers(pool, timeout):
+    """
+    Wait until one dummy job per worker has gone through the pool
+
+    Workers warm themselves in their initializer before taking any job, so a
+    completed job means the worker that ran it is hot.
+    """
+    done = threading.Semaphore(0)
+    errors = []
+
+    def handler(context, result, error):
+        if error is not None:
+            errors.append(error)
+        done.release()
+
+    # One queue per job so none of them is dropped as backpressure
+    keys = [f'__warmup_{index}' for index in range(pool.workers)]
+    for key in keys:
+        pool.submit(key, inference_worker.warm_up, (), handler)
+
+    deadline = time.monotonic() + timeout
+    try:
+        for _ in keys:
+            if not done.acquire(timeout=max(0.0, deadline - time.monotonic())):
+                raise TimeoutError(f"Inference workers not ready after {timeout:.0f}s")
+    finally:
+        for key in keys:
+            pool.remove_camera(key)
+    if errors:
+        raise errors[0]
+
+
+def warm_up_models():
+    """
+    Load the gallery and warm the recognition models (blocking)
+
+    Returns:
+        dict: readiness() after the warm-up
+    """
+    with _lock:
+        already = _status['state'] in (WARMING, READY)
+        if not already:
+            _status.update(state=WARMING, error=None, started=time.monotonic(), finished=None, timings={})
+    if already:
+        return readiness()
+
+    try:
+        timings = {}
+        started = time.monotonic()
+        warm_start_face_gallery()
+        timings['gallery'] = time.monotonic() - started
+
+        started = time.monotonic()
+        pool = get_inference_pool()
+        if pool is not None:
+            _warm_pool_workers(pool, getattr(settings, 'FACE_WARMUP_TIMEOUT', 300))
+            timings['pool'] = time.monotonic() - started
+        else:
+            timings.update(inference_worker.warm_up())
+
+        _set(state=READY, timings=timings, finished=time.monotonic())
+        print(f"✅ Recognition models warm: {', '.join(f'{step} {seconds:.1f}s' for step, seconds in timings.items())}")
+    except Exception as e:
+        _set(state=FAILED, error=str(e), finished=time.monotonic())
+        print(f"❌ Model warm-up failed: {e}")
+    return readiness()
+
+
+def start_warmup_thread():
+    """Run warm_up_models() in the background (returns immediately)"""
+    thread = threading.Thread(target=warm_up_models, name='model-warmup', daemon=True)
+    thread.start()
+    return thread
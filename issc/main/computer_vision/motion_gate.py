@@ -0,0 +1,161 @@
+"""
+ISSC Motion Gate
+Skips face detection on frames where nothing in the scene changed.
+
+Each camera keeps a tiny grayscale copy of its previous frame. A new frame
+passes the gate when the share of pixels that changed by more than
+pixel_delta reaches threshold. Detection also runs for `hold` seconds after
+the last motion (someone who walked in and stopped is still tracked) and at
+least every `keepalive` seconds (nothing stays undetected forever on a
+perfectly still scene).
+
+Gate state and skip ratios per camera are reported by motion_gates.snapshot().
+"""
+import threading
+import time
+
+import cv2
+import numpy as np
+from django.conf import settings
+
+MOTION = 'motion'
+HOLD = 'hold'
+IDLE = 'idle'
+
+
+class MotionGate:
+    """Frame-differencing change detector for one camera"""
+
+    def __init__(self, threshold=0.005, width=160, pixel_delta=25, hold=2.0, keepalive=5.0, clock=time.monotonic):
+        """
+        Args:
+            threshold: Changed-pixel ratio (0-1) that counts as motion; 0 disables gating
+            width: Width the frame is downscaled to before differencing
+            pixel_delta: Gray level change for a pixel to count as changed
+            hold: Seconds detection keeps running after the last motion
+            keepalive: Longest gap between detections on a still scene (0 = none)
+        """
+        self.threshold = threshold
+        self.width = width
+        self.pixel_delta = pixel_delta
+        self.hold = hold
+        self.keepalive = keepalive
+        self._clock = clock
+
+        self._previous = None
+        self._last_motion = None
+        self._last_pass = None
+        self.state = IDLE
+        self.changed_ratio = 0.0
+        self.frames = 0
+        self.skipped = 0
+
+    def _small_gray(self, frame):
+        height, width = frame.shape[:2]
+        small_height = max(1, round(height * self.width / width))
+        small = cv2.resize(frame, (self.width, small_height), interpolation=cv2.INTER_AREA)
+        if small.ndim == 3:
+            small = cv2.cvtColor(small, cv2.COLOR_BGR2GRAY)
+        # Blur away sensor noise so it does not count as motion
+        return cv2.GaussianBlur(small, (5, 5), 0)
+
+    def check(self, frame):
+        """
+        Args:
+            frame: BGR (or grayscale) frame
+
+        Returns:
+            bool: True if the detector should run on this frame
+        """
+        now = self._clock()
+        self.frames += 1
+
+        if self.threshold <= 0:
+            self.state = MOTION
+            self._last_pass = now
+            return True
+
+        gray = self._small_gray(frame)
+        previous, self._previous = self._previous, gray
+        # Nothing to compare the first frame with: detect, but it is not motion
+        first = previous is None or previous.shape != gray.shape
+        if first:
+            self.changed_ratio = 0.0
+        else:
+            changed = cv2.absdiff(gray, previous) > self.pixel_delta
+            self.changed_ratio = float(np.count_nonzero(changed)) / changed.size
+
+        if self.changed_ratio >= self.threshold:
+            self.state = MOTION
+            self._last_motion = now
+        elif self._last_motion is not None and now - self._last_motion < self.hold:
+            self.state = HOLD
+        else:
+            self.state = IDLE
+
+        run = first or self.state != IDLE or (
+            self.keepalive > 0 and (self._last_pass is None or now - self._last_pass >= self.keepalive)
+        )
+        if run:
+            self._last_pass = now
+        else:
+            self.skipped += 1
+        return run
+
+    def status(self):
+        """Gate state, last changed-pixel ratio and how many frames were skipped"""
+        now = self._clock()
+        return {
+            'state': self.state,
+            'changed_ratio': round(self.changed_ratio, 4),
+            'threshold': self.threshold,
+            'frames': self.frames,
+            'skipped': self.skipped,
+            'skip_ratio': round(self.skipped / self.frames, 3) if self.frames else 0.0,
+            'seconds_since_motion': None if self._last_motion is None else round(now - self._last_motion, 1),
+        }
+
+
+class MotionGates:
+    """MotionGate per camera, created on first use with shared options"""
+
+    def __init__(self, **options):
+        self.options = options
+        self._gates = {}
+        self._lock = threading.Lock()
+
+    def gate(self, camera_id):
+        with self._lock:
+            gate = self._gates.get(camera_id)
+            if gate is None:
+                gate = self._gates[camera_id] = MotionGate(**self.options)
+            return gate
+
+    def check(self, camera_id, frame):
+        """MotionGate.check() for the camera's gate"""
+        return self.gate(camera_id).check(frame)
+
+    def status(self, camera_id):
+        """The camera's gate status, or None if it has no gate yet"""
+        with self._lock:
+            gate = self._gates.get(camera_id)
+        return gate.status() if gate is not None else None
+
+    def snapshot(self):
+        """Gate status of every camera, keyed by camera id"""
+        with self._lock:
+            gates = dict(self._gates)
+        return {str(camera_id): gate.status() for camera_id, gate in gates.items()}
+
+    def forget(self, camera_id):
+        with self._lock:
+            self._gates.pop(camera_id, None)
+
+
+motion_gates = MotionGates(
+    threshold=getattr(settings, 'MOTION_GATE_THRESHOLD', 0.005),
+    width=getattr(settings, 'MOTION_GATE_WIDTH', 160),
+    pixel_delta=getattr(settings, 'MOTION_GATE_PIXEL_DELTA', 25),
+    hold=getattr(settings, 'MOTION_GATE_HOLD', 2.0),
+    keepalive=getattr(settings, 'MOTION_GATE_KEEPALIVE', 5.0),
+)
@@ -0,0 +1,178 @@
+"""
+ISSC Stream Control
+Per-viewer frame rate, size and JPEG quality of the MJPEG video feeds.
+
+A viewer can cap its stream with query parameters (video-feed/0/?fps=10&width=480&quality=60).
+On top of those caps the stream adapts to the viewer's connection: the time
+spent handing each part to the server (a blocking socket write under WSGI,
+an awaited send that drains the transport under ASGI) is the write
+backpressure. When writes take a large share of the frame interval the
+stream steps down its quality, then its width, then its frame rate; once
+writes are fast again for a while it steps back up.
+
+Widths are rounded so that viewers on the same step share one variant
+encoder (see mjpeg.mjpeg_encoder): each variant is still encoded once per
+frame, however many viewers watch it.
+"""
+import time
+
+from django.conf import settings
+
+from .frame_bus import CAPTURE_FPS
+from .mjpeg import mjpeg_encoder
+
+# Adaptation ladder: (quality reduction, width factor, fps factor) per step
+STEPS = [
+    (0, 1.0, 1.0),
+    (15, 1.0, 1.0),
+    (15, 0.75, 1.0),
+    (30, 0.75, 1.0),
+    (30, 0.5, 1.0),
+    (30, 0.5, 0.5),
+    (40, 0.5, 0.25),
+]
+
+MIN_QUALITY = 30
+WIDTH_MULTIPLE = 16
+
+CONGESTED = 0.5      # Step down when writes take this share of the frame interval
+RELAXED = 0.15       # Step up when they take less than this share...
+RECOVER_AFTER = 3.0  # ...for this many seconds
+HOLD_PARTS = 5       # Parts sent on a step before it may change again
+
+
+def _query_number(params, name, cast, low, high):
+    try:
+        value = cast(params.get(name))
+    except (TypeError, ValueError):
+        return None
+    return min(max(value, low), high)
+
+
+class StreamControl:
+    """Frame rate, width and quality limits of one viewer's stream"""
+
+    def __init__(self, max_fps=None, max_width=None, quality=85, adaptive=True, clock=time.monotonic):
+        """
+        Args:
+            max_fps: Most parts per second to send (None = every new frame)
+            max_width: Widest frame to send; wider frames are scaled down (None = camera resolution)
+            quality: JPEG quality when the connection keeps up
+            adaptive: Step down/up with the write backpressure
+        """
+        self.max_fps = max_fps
+        self.max_width = max_width
+        self.base_quality = quality
+        self.adaptive = adaptive
+        self.step = 0
+        self.write_time = None  # Smoothed seconds per part write
+        self._clock = clock
+        self._source_width = None
+        self._last_sent = None
+        self._parts_on_step = 0
+        self._relaxed_since = None
+
+    @classmethod
+    def from_query(cls, params, quality=85):
+        """
+        Limits from request.GET: fps, width, quality and adaptive=0 to turn adaptation off;
+        values that do not parse are ignored and the rest are clamped to a sane range
+        """
+        requested_quality = _query_number(params, 'quality', int, 10, 95)
+        return cls(
+            max_fps=_query_number(params, 'fps', float, 0.5, 60.0),
+            max_width=_query_number(params, 'width', int, 64, 4096),
+            quality=requested_quality or quality,
+            adaptive=params.get('adaptive', '1' if getattr(settings, 'VIDEO_FEED_ADAPTIVE', True) else '0') != '0',
+        )
+
+    @property
+    def quality(self):
+        """JPEG quality on the current step"""
+        reduction = STEPS[self.step][0]
+        return max(min(self.base_quality, MIN_QUALITY), self.base_quality - reduction)
+
+    @property
+    def fps(self):
+        """Parts per second on the current step"""
+        return (self.max_fps or CAPTURE_FPS) * STEPS[self.step][2]
+
+    def width(self, source_width=None):
+        """
+        Encoded width on the current step
+
+        Args:
+            source_width: Width of the camera frames, if known
+
+        Returns:
+            int or None: Width rounded to a multiple of 16, None for full size
+        """
+        width = self.max_width
+        factor = STEPS[self.step][1]
+        if factor < 1.0 and (width or source_width):
+            width = min(width or source_width, source_width or width) * factor
+        if not width:
+            return None
+        width = max(WIDTH_MULTIPLE, int(width) // WIDTH_MULTIPLE * WIDTH_MULTIPLE)
+        if source_width and width >= source_width:
+            return None  # No scaling: share the full-size variant
+        return width
+
+    def encoder(self, frames):
+        """The shared variant encoder of a FrameBuffer for the current step"""
+        latest = frames.latest()
+        if latest is not None:
+            self._source_width = latest.image.shape[1]
+        return mjpeg_encoder(frames, self.quality, self.width(self._source_width))
+
+    def delay(self):
+        """Seconds to wait before the next part, to stay within the frame rate"""
+        if self._last_sent is None or (self.max_fps is None and STEPS[self.step][2] == 1.0):
+            return 0.0
+        return max(0.0, self._last_sent + 1.0 / self.fps - self._clock())
+
+    def sent(self, write_seconds):
+        """
+        Record a part handed to the server and adapt to how long that took
+
+        Args:
+            write_seconds: Time from yielding the part until the stream resumed
+        """
+        now = self._clock()
+        self._last_sent = now
+        if self.write_time is None:
+            self.write_time = write_seconds
+        else:
+            self.write_time = 0.7 * self.write_time + 0.3 * write_seconds
+        if not self.adaptive:
+            return
+
+        self._parts_on_step += 1
+        budget = 1.0 / self.fps
+        if self.write_time > CONGESTED * budget:
+            self._relaxed_since = None
+            if self._parts_on_step >= HOLD_PARTS and self.step < len(STEPS) - 1:
+                self._change_step(1)
+        elif self.write_time < RELAXED * budget:
+            if self._relaxed_since is None:
+                self._relaxed_since = now
+            elif (now - self._relaxed_since >= RECOVER_AFTER and self._parts_on_step >= HOLD_PARTS
+                    and self.step > 0):
+                self._change_step(-1)
+        else:
+            self._relaxed_since = None
+
+    def _change_step(self, change):
+        self.step += change
+        self._parts_on_step = 0
+        self._relaxed_since = None
+
+    def status(self):
+        """Current limits, for logs and status views"""
+        return {
+            'step': self.step,
+            'quality': self.quality,
+            'width': self.width(self._source_width),
+            'fps': round(self.fps, 2) if self.max_fps or STEPS[self.step][2] < 1.0 else None,
+            'write_ms': None if self.write_time is None else round(self.write_time * 1000.0, 1),
+        }
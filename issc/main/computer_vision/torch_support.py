@@ -0,0 +1,61 @@
+"""
+ISSC Torch Support
+Lazy, CUDA-only access to PyTorch.
+
+Importing torch costs hundreds of MB of RSS and seconds of startup, and the
+recognition paths are NumPy-only on CPU. torch is therefore only imported
+when an NVIDIA driver is actually present; on CPU-only hosts (the production
+VPS) get_torch() returns None without ever touching the package.
+"""
+import ctypes.util
+import os
+import threading
+
+_lock = threading.Lock()
+_torch = None
+_probed = False
+
+
+def cuda_driver_available():
+    """True if the NVIDIA CUDA driver library can be found (no torch import)"""
+    if os.environ.get('ISSC_DISABLE_GPU_INIT') == '1':
+        return False
+    if os.environ.get('CUDA_VISIBLE_DEVICES', None) in ('', '-1'):
+        return False
+    return bool(ctypes.util.find_library('cuda') or ctypes.util.find_library('nvcuda'))
+
+
+def get_torch():
+    """
+    Import torch on first use, only on hosts with a CUDA driver
+
+    Returns:
+        module or None: torch with a usable CUDA device, else None
+    """
+    global _torch, _probed
+    if _probed:
+        return _torch
+
+    with _lock:
+        if not _probed:
+            if cuda_driver_available():
+                try:
+                    import torch
+                    if torch.cuda.is_available():
+                        _torch = torch
+                except ImportError:
+                    pass
+            _probed = True
+    return _torch
+
+
+def torch_cuda_available():
+    """True when get_torch() provides a CUDA device"""
+    return get_torch() is not None
+
+
+def empty_cuda_cache():
+    """Release cached CUDA memory; no-op on CPU-only hosts"""
+    torch = get_torch()
+    if torch is not None:
+        torch.cuda.empty_cache()
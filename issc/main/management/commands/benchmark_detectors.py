@@ -0,0 +1,90 @@
+import glob
+import os
+import time
+
+import cv2
+import numpy as np
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from main.computer_vision.face_detectors import create_detector
+from main.computer_vision.inference_pool import detector_options
+
+MODELS_DIR = os.path.join(settings.BASE_DIR, 'models')
+DEFAULT_IMAGES = [os.path.join(settings.BASE_DIR, 'main', 'static', 'images', name)
+                  for name in ('front.jpg', 'left.jpg', 'right.jpg')]
+
+
+class Command(BaseCommand):
+    help = ('Time the face detectors against each other on the same images: ms per frame, '
+            'faces found and whether landmarks are available. Detectors whose model or '
+            'dependency is missing are reported and skipped.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('images', nargs='*', help='Image files or directories (default: the enrollment guide images)')
+        parser.add_argument('--detectors', default='yunet,ssd,haar,mtcnn',
+                            help='Comma-separated detector names (native or DeepFace backends)')
+        parser.add_argument('--input-width', type=int, default=getattr(settings, 'FACE_DETECTOR_INPUT_WIDTH', 320),
+                            help='Downscaled width for the native detectors (0 = full size)')
+        parser.add_argument('--repeat', type=int, default=10, help='Timed runs per image')
+        parser.add_argument('--yunet-model', default=os.path.join(MODELS_DIR, 'face_detection_yunet_2023mar.onnx'))
+        parser.add_argument('--ssd-model', default=os.path.join(MODELS_DIR, 'res10_300x300_ssd_iter_140000.caffemodel'))
+        parser.add_argument('--ssd-config', default=os.path.join(MODELS_DIR, 'deploy.prototxt'))
+
+    def _load_images(self, paths):
+        files = []
+        for path in paths or DEFAULT_IMAGES:
+            if os.path.isdir(path):
+                files.extend(sorted(f for ext in ('jpg', 'jpeg', 'png') for f in glob.glob(os.path.join(path, f'*.{ext}'))))
+            else:
+                files.append(path)
+
+        images = []
+        for path in files:
+            image = cv2.imread(path)
+            if image is None:
+                self.stderr.write(f'Skipping unreadable image {path}')
+                continue
+            images.append((os.path.basename(path), image))
+        if not images:
+            raise CommandError('No readable images to benchmark on')
+        return images
+
+    def _options(self, name, options):
+        detector_kwargs = dict(detector_options(), input_width=options['input_width'])
+        if name == 'yunet':
+            detector_kwargs['model_path'] = options['yunet_model']
+        elif name == 'ssd':
+            detector_kwargs.update(model_path=options['ssd_model'], config_path=options['ssd_config'])
+        elif name == 'haar':
+            detector_kwargs['model_path'] = None
+        return detector_kwargs
+
+    def handle(self, *args, **options):
+        images = self._load_images(options['images'])
+        repeat = max(1, options['repeat'])
+        self.stdout.write(f'{len(images)} image(s), {repeat} run(s) each, native input width {options["input_width"]}px\n')
+        self.stdout.write(f'{"detector":<12}{"mean ms":>10}{"p95 ms":>10}{"faces":>8}  landmarks')
+
+        for name in [n.strip() for n in options['detectors'].split(',') if n.strip()]:
+            detector = create_detector(name, **self._options(name, options))
+            try:
+                # First call builds the model; keep it out of the timings
+                detector.detect(images[0][1])
+            except Exception as e:
+                self.stdout.write(f'{name:<12}skipped: {e}')
+                continue
+
+            timings = []
+            faces = 0
+            landmarks = False
+            for _, image in images:
+                for _ in range(repeat):
+                    started = time.perf_counter()
+                    detections = detector.detect(image)
+                    timings.append((time.perf_counter() - started) * 1000.0)
+                faces += len(detections)
+                landmarks = landmarks or any(d.landmarks for d in detections)
+
+            self.stdout.write(f'{name:<12}{np.mean(timings):>10.1f}{np.percentile(timings, 95):>10.1f}'
+                              f'{faces:>8}  {"yes" if landmarks else "no"}')
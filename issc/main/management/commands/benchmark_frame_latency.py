@@ -0,0 +1,161 @@
+import threading
+import time
+
+import cv2
+import numpy as np
+from django.core.management.base import BaseCommand
+
+from main.computer_vision.frame_bus import FrameBuffer, FrameBus
+from main.computer_vision.mjpeg import mjpeg_encoder
+
+
+class SyntheticCapture:
+    """cv2.VideoCapture stand-in that delivers frames at a fixed rate (read() blocks like a camera)"""
+
+    def __init__(self, fps, width, height):
+        self.interval = 1.0 / fps
+        self.paused = False
+        self.released = False
+        self._base = np.random.default_rng(0).integers(0, 255, (height, width, 3), dtype=np.uint8)
+        self._next = time.monotonic()
+
+    def read(self):
+        while self.paused and not self.released:
+            time.sleep(0.05)
+            self._next = time.monotonic()
+        if self.released:
+            return False, None
+        self._next += self.interval
+        delay = self._next - time.monotonic()
+        if delay > 0:
+            time.sleep(delay)
+        frame = self._base.copy()
+        cv2.putText(frame, f'{time.monotonic():.3f}', (10, 30), cv2.FONT_HERSHEY_SIMPLEX, 0.8, (255, 255, 255), 2)
+        return True, frame
+
+    def release(self):
+        self.released = True
+
+
+class Command(BaseCommand):
+    help = ('Measure capture-to-wire delay of the live feed pipeline (camera -> processing '
+            'thread -> MJPEG viewers) on a synthetic camera, with the former sleep-polling '
+            'loops and per-viewer encoding ("polling") against condition-variable wake-ups '
+            'and the shared encoder ("events"). Also reports CPU use while the camera is idle.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--fps', type=float, default=30.0, help='Synthetic camera frame rate')
+        parser.add_argument('--viewers', type=int, default=5, help='Concurrent MJPEG viewers')
+        parser.add_argument('--seconds', type=float, default=5.0, help='Measured streaming time per mode')
+        parser.add_argument('--idle', type=float, default=2.0, help='Seconds with a stalled camera per mode')
+        parser.add_argument('--poll', type=float, default=0.01, help='Sleep of the polling loops (seconds)')
+        parser.add_argument('--quality', type=int, default=85, help='JPEG quality')
+        parser.add_argument('--width', type=int, default=640)
+        parser.add_argument('--height', type=int, default=480)
+        parser.add_argument('--modes', default='polling,events', help='Comma-separated modes to run')
+
+    def _run(self, mode, options):
+        polling = mode == 'polling'
+        fps = options['fps']
+        capture = SyntheticCapture(fps, options['width'], options['height'])
+        bus = FrameBus('synthetic', open_capture=lambda device: None, capture=capture)
+        output = FrameBuffer()
+        captured_at = {}  # output seq -> capture timestamp of its camera frame
+        latencies = []
+        encodes = [0]
+        measuring = threading.Event()
+        stopped = threading.Event()
+        lock = threading.Lock()
+
+        def processing():
+            # Stands in for a manager's capture loop: take new camera frames,
+            # annotate a copy, publish to the stream buffer
+            last_seq = 0
+            while not stopped.is_set():
+                if polling:
+                    latest = bus.frames.newer(last_seq)
+                    if latest is None:
+                        time.sleep(options['poll'])
+                        continue
+                else:
+                    latest = bus.frames.wait(last_seq, timeout=0.5)
+                    if latest is None:
+                        continue
+                last_seq = latest.seq
+                frame = latest.image.copy()
+                cv2.rectangle(frame, (20, 40), (120, 140), (0, 255, 0), 2)
+                captured_at[output.publish(frame).seq] = latest.timestamp
+                if polling:
+                    # The former loops paced themselves with a fixed frame interval
+                    time.sleep(1.0 / fps)
+
+        def viewer():
+            last_seq = 0
+            encoder = mjpeg_encoder(output, options['quality'])
+            while not stopped.is_set():
+                if polling:
+                    latest = output.newer(last_seq)
+                    if latest is None:
+                        time.sleep(options['poll'])
+                        continue
+                    last_seq = latest.seq
+                    _, buffer = cv2.imencode('.jpg', latest.image, [cv2.IMWRITE_JPEG_QUALITY, options['quality']])
+                    part = buffer.tobytes()
+                    with lock:
+                        encodes[0] += 1
+                else:
+                    encoded = encoder.wait_part(last_seq, timeout=0.5)
+                    if encoded is None:
+                        continue
+                    last_seq, part = encoded
+                # "On the wire": the part is ready to be written to the socket
+                delay = time.monotonic() - captured_at.get(last_seq, time.monotonic())
+                if measuring.is_set() and part:
+                    with lock:
+                        latencies.append(delay * 1000.0)
+
+        bus.start()
+        threads = [threading.Thread(target=processing, daemon=True)]
+        threads += [threading.Thread(target=viewer, daemon=True) for _ in range(options['viewers'])]
+        for thread in threads:
+            thread.start()
+
+        time.sleep(0.5)  # Warm-up: first encodes, thread start-up
+        encodes[0] = 0
+        measuring.set()
+        cpu, wall = time.process_time(), time.monotonic()
+        time.sleep(options['seconds'])
+        streaming_cpu = (time.process_time() - cpu) / (time.monotonic() - wall) * 100.0
+        measuring.clear()
+        total_encodes = encodes[0] if polling else mjpeg_encoder(output, options['quality']).encoded
+
+        capture.paused = True
+        time.sleep(0.2)
+        cpu, wall = time.process_time(), time.monotonic()
+        time.sleep(options['idle'])
+        idle_cpu = (time.process_time() - cpu) / (time.monotonic() - wall) * 100.0 if options['idle'] > 0 else 0.0
+
+        stopped.set()
+        capture.paused = False
+        bus.stop()
+        for thread in threads:
+            thread.join(timeout=2)
+        return latencies, total_encodes, streaming_cpu, idle_cpu
+
+    def handle(self, *args, **options):
+        self.stdout.write(f'{options["width"]}x{options["height"]} @ {options["fps"]:g} fps, {options["viewers"]} viewer(s), '
+                          f'{options["seconds"]:g}s streaming + {options["idle"]:g}s idle per mode\n')
+        self.stdout.write(f'{"mode":<10}{"mean ms":>9}{"p50 ms":>9}{"p95 ms":>9}{"max ms":>9}'
+                          f'{"parts":>8}{"encodes":>9}{"cpu %":>8}{"idle cpu %":>12}')
+
+        for mode in [m.strip() for m in options['modes'].split(',') if m.strip()]:
+            if mode not in ('polling', 'events'):
+                self.stderr.write(f'Unknown mode {mode} (use polling or events)')
+                continue
+            latencies, encodes, streaming_cpu, idle_cpu = self._run(mode, options)
+            if not latencies:
+                self.stdout.write(f'{mode:<10}no frames delivered')
+                continue
+            self.stdout.write(f'{mode:<10}{np.mean(latencies):>9.1f}{np.percentile(latencies, 50):>9.1f}'
+                              f'{np.percentile(latencies, 95):>9.1f}{np.max(latencies):>9.1f}'
+                              f'{len(latencies):>8}{encodes:>9}{streaming_cpu:>8.1f}{idle_cpu:>12.1f}')
@@ -0,0 +1,33 @@
+import os
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from main.computer_vision.embedding_backends import DeepFaceBackend
+
+
+class Command(BaseCommand):
+    help = ('Export DeepFace\'s Facenet Keras model to ONNX for the onnxruntime / opencv embedding backends '
+            '(needs TensorFlow, DeepFace and tf2onnx on the exporting machine only).')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--output', dest='output', default=getattr(settings, 'FACE_EMBEDDING_MODEL_PATH', 'facenet.onnx'),
+                            help='Where to write the .onnx file (default: FACE_EMBEDDING_MODEL_PATH)')
+        parser.add_argument('--opset', dest='opset', type=int, default=13, help='ONNX opset version')
+
+    def handle(self, *args, **options):
+        try:
+            import tensorflow as tf
+            import tf2onnx
+        except ImportError as e:
+            raise CommandError(f'{e}. Install tf2onnx (and tensorflow) to export the model.')
+
+        backend = DeepFaceBackend()
+        model = backend.load()
+        height, width = backend.input_size
+        signature = (tf.TensorSpec((None, height, width, 3), tf.float32, name='input'),)
+
+        output = options['output']
+        os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+        tf2onnx.convert.from_keras(model, input_signature=signature, opset=options['opset'], output_path=output)
+        self.stdout.write(self.style.SUCCESS(f'Exported {backend.model_name} ({height}x{width} NHWC input) to {output}'))
@@ -0,0 +1,18 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from main.computer_vision.model_warmup import READY, warm_up_models
+
+
+class Command(BaseCommand):
+    help = ('Load the face gallery, download/build MTCNN and Facenet and run a dummy inference. '
+            'Warms this process only: use it to fetch model weights and verify the models before a deploy; '
+            'set FACE_WARMUP_ON_START to warm a running server.')
+
+    def handle(self, *args, **options):
+        status = warm_up_models()
+        for step, seconds in status['timings'].items():
+            self.stdout.write(f'{step}: {seconds:.2f}s')
+
+        if status['state'] != READY:
+            raise CommandError(f"Warm-up failed: {status['error']}")
+        self.stdout.write(self.style.SUCCESS(f"Models ready in {status['elapsed']:.2f}s"))
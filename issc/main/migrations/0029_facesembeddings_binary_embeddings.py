@@ -0,0 +1,27 @@
+import main.models
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('main', '0028_incidentreport_raised_to_admin_reason'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='facesembeddings',
+            name='front_embedding_data',
+            field=main.models.EmbeddingField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='facesembeddings',
+            name='left_embedding_data',
+            field=main.models.EmbeddingField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='facesembeddings',
+            name='right_embedding_data',
+            field=main.models.EmbeddingField(blank=True, null=True),
+        ),
+    ]
@@ -0,0 +1,75 @@
+import json
+import struct
+
+import numpy as np
+from django.db import migrations
+
+POSES = ('front', 'left', 'right')
+
+# Embedding format version 1 (uint16 version | uint16 dim | dim x float32, little-endian),
+# inlined so this migration keeps working whatever happens to the app's codec later
+FORMAT_VERSION = 1
+HEADER = struct.Struct('<HH')
+
+
+def pack_embedding(vector):
+    vector = np.asarray(vector, dtype='<f4').reshape(-1)
+    return HEADER.pack(FORMAT_VERSION, vector.shape[0]) + vector.tobytes()
+
+
+def unpack_embedding(blob):
+    if blob is None or len(blob) == 0:
+        return None
+    version, dim = HEADER.unpack_from(blob)
+    if version != FORMAT_VERSION or len(blob) != HEADER.size + dim * 4:
+        raise ValueError(f"Unreadable embedding blob ({len(blob)} bytes, version {version})")
+    return np.frombuffer(blob, dtype='<f4', count=dim, offset=HEADER.size)
+
+
+def _json_list(value):
+    if isinstance(value, str):
+        try:
+            value = json.loads(value)
+        except ValueError:
+            return None
+    if not isinstance(value, list) or len(value) == 0:
+        return None
+    return value
+
+
+def pack_json_embeddings(apps, schema_editor):
+    FacesEmbeddings = apps.get_model('main', 'FacesEmbeddings')
+    fields = [f'{pose}_embedding' for pose in POSES]
+
+    for row in FacesEmbeddings.objects.values('pk', *fields).iterator(chunk_size=500):
+        packed = {}
+        for pose in POSES:
+            value = _json_list(row[f'{pose}_embedding'])
+            packed[f'{pose}_embedding_data'] = pack_embedding(value) if value else None
+        # update() keeps updated_at untouched - the embeddings themselves did not change
+        FacesEmbeddings.objects.filter(pk=row['pk']).update(**packed)
+
+
+def unpack_binary_embeddings(apps, schema_editor):
+    FacesEmbeddings = apps.get_model('main', 'FacesEmbeddings')
+    fields = [f'{pose}_embedding_data' for pose in POSES]
+
+    for row in FacesEmbeddings.objects.values('pk', *fields).iterator(chunk_size=500):
+        lists = {}
+        for pose in POSES:
+            value = row[f'{pose}_embedding_data']
+            if isinstance(value, (bytes, bytearray, memoryview)):
+                value = unpack_embedding(value)
+            lists[f'{pose}_embedding'] = value.tolist() if value is not None else {}
+        FacesEmbeddings.objects.filter(pk=row['pk']).update(**lists)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('main', '0029_facesembeddings_binary_embeddings'),
+    ]
+
+    operations = [
+        migrations.RunPython(pack_json_embeddings, unpack_binary_embeddings),
+    ]
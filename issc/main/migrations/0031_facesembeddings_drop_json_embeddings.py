@@ -0,0 +1,38 @@
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('main', '0030_pack_face_embeddings'),
+    ]
+
+    operations = [
+        migrations.RemoveField(
+            model_name='facesembeddings',
+            name='front_embedding',
+        ),
+        migrations.RemoveField(
+            model_name='facesembeddings',
+            name='left_embedding',
+        ),
+        migrations.RemoveField(
+            model_name='facesembeddings',
+            name='right_embedding',
+        ),
+        migrations.RenameField(
+            model_name='facesembeddings',
+            old_name='front_embedding_data',
+            new_name='front_embedding',
+        ),
+        migrations.RenameField(
+            model_name='facesembeddings',
+            old_name='left_embedding_data',
+            new_name='left_embedding',
+        ),
+        migrations.RenameField(
+            model_name='facesembeddings',
+            old_name='right_embedding_data',
+            new_name='right_embedding',
+        ),
+    ]
@@ -1,8 +1,12 @@
 from django.db import models
 from django.contrib.auth.models import AbstractUser
+import json
 import uuid
+from base64 import b64encode
 from datetime import datetime
 
+from .computer_vision.embedding_codec import pack_embedding, unpack_embedding
+
 
 # Create your models here.
 
@@ -142,12 +146,41 @@ class IncidentUpdate(models.Model):
         ordering = ['-created_at']
 
 
+class EmbeddingField(models.BinaryField):
+    """Face embedding stored as versioned packed float32 bytes, read back as a numpy array"""
+
+    def __init__(self, *args, **kwargs):
+        kwargs.setdefault('null', True)
+        kwargs.setdefault('blank', True)
+        super().__init__(*args, **kwargs)
+
+    def from_db_value(self, value, expression, connection):
+        return unpack_embedding(value)
+
+    def to_python(self, value):
+        if value is None or isinstance(value, (bytes, bytearray, memoryview, str)):
+            return unpack_embedding(super().to_python(value))
+        return value
+
+    def get_prep_value(self, value):
+        # Accept lists / arrays (what callers produce) as well as already-packed bytes
+        if value is None or isinstance(value, (bytes, bytearray, memoryview)):
+            return super().get_prep_value(value)
+        if len(value) == 0:
+            return None
+        return super().get_prep_value(pack_embedding(value))
+
+    def value_to_string(self, obj):
+        value = self.value_from_object(obj)
+        return '' if value is None else b64encode(pack_embedding(value)).decode('ascii')
+
+
 class FacesEmbeddings(models.Model):
     face_id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
     id_number = models.ForeignKey(AccountRegistration, to_field="id_number", on_delete=models.CASCADE)
-    front_embedding = models.JSONField(default=dict)
-    left_embedding = models.JSONField(default=dict)
-    right_embedding = models.JSONField(default=dict)
+    front_embedding = EmbeddingField()
+    left_embedding = EmbeddingField()
+    right_embedding = EmbeddingField()
     enrolled_by = models.CharField(max_length=150, blank=True, default='')
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
@@ -263,3 +296,28 @@ class SystemConfig(models.Model):
             }
         )
         return config
+    
+    @classmethod
+    def get_camera_roi(cls, camera_key):
+        """Get a camera's detection region as a list of normalized [x, y] points, or None"""
+        try:
+            config = cls.objects.get(config_key=f'camera_roi_{camera_key}')
+            return json.loads(config.config_value)
+        except (cls.DoesNotExist, ValueError):
+            return None
+    
+    @classmethod
+    def set_camera_roi(cls, camera_key, polygon, user=None):
+        """Set or update a camera's detection region (None removes it)"""
+        if polygon is None:
+            cls.objects.filter(config_key=f'camera_roi_{camera_key}').delete()
+            return None
+        config, created = cls.objects.update_or_create(
+            config_key=f'camera_roi_{camera_key}',
+            defaults={
+                'config_value': json.dumps(polygon),
+                'description': f'Face detection region of interest for camera {camera_key}',
+                'updated_by': user
+            }
+        )
+        return config
@@ -0,0 +1,45 @@
+"""
+Keep the shared face gallery in step with enrollment changes.
+
+Saving or deleting one FacesEmbeddings row (or changing one account's status
+or name) updates only that id_number in the gallery, instead of re-reading
+the whole table. Restricted users stay in the gallery with their status so
+matchers can decide whether to consider them.
+"""
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .computer_vision.face_gallery import refresh_gallery_entry, remove_gallery_entry
+from .models import AccountRegistration, FacesEmbeddings
+
+# AccountRegistration fields that affect the gallery (who is allowed and the displayed name)
+GALLERY_ACCOUNT_FIELDS = {'id_number', 'status', 'first_name', 'middle_name', 'last_name'}
+
+
+@receiver(post_save, sender=FacesEmbeddings)
+def face_embeddings_saved(sender, instance, **kwargs):
+    id_number = instance.id_number_id
+    transaction.on_commit(lambda: refresh_gallery_entry(id_number))
+
+
+@receiver(post_delete, sender=FacesEmbeddings)
+def face_embeddings_deleted(sender, instance, **kwargs):
+    id_number = instance.id_number_id
+    transaction.on_commit(lambda: remove_gallery_entry(id_number))
+
+
+@receiver(post_save, sender=AccountRegistration)
+def account_saved(sender, instance, update_fields=None, **kwargs):
+    # Logins and OTP bookkeeping save with update_fields - nothing to do for the gallery
+    if update_fields is not None and not GALLERY_ACCOUNT_FIELDS.intersection(update_fields):
+        return
+
+    id_number = instance.id_number
+    transaction.on_commit(lambda: refresh_gallery_entry(id_number))
+
+
+@receiver(post_delete, sender=AccountRegistration)
+def account_deleted(sender, instance, **kwargs):
+    id_number = instance.id_number
+    transaction.on_commit(lambda: remove_gallery_entry(id_number))
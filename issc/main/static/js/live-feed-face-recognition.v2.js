@@ -39,6 +39,61 @@ class UltraFastFaceRecognition {
         this.unauthorizedCooldown = new Map(); // Track unauthorized faces to avoid duplicate saves
         this.unauthorizedCooldownMs = 2000; // Save same unauthorized face only once per 2 seconds
         this.spoofProofEnabled = false; // DISABLED for live feed as requested
+        this.roi = null; // Detection region: normalized [[x, y], ...] of the source frame (live-feed-roi.js)
+        this.roiCanvas = null;
+        this.roiCtx = null;
+    }
+
+    setRoi(polygon) {
+        this.roi = polygon && polygon.length >= 3 ? polygon : null;
+        this.previousDetections = [];
+    }
+
+    // Detection input: the ROI's bounding rectangle (outside the polygon blacked
+    // out) so the detector sees fewer pixels at a higher effective resolution
+    detectionInput() {
+        const { width, height } = this.getMediaDimensions();
+        const fullFrame = { source: this.video, offsetX: 0, offsetY: 0 };
+        if (!this.roi || !width || !height) {
+            return fullFrame;
+        }
+
+        const xs = this.roi.map(point => point[0] * width);
+        const ys = this.roi.map(point => point[1] * height);
+        const x = Math.max(0, Math.floor(Math.min(...xs)));
+        const y = Math.max(0, Math.floor(Math.min(...ys)));
+        const w = Math.min(width, Math.ceil(Math.max(...xs))) - x;
+        const h = Math.min(height, Math.ceil(Math.max(...ys))) - y;
+        if (w < 2 || h < 2) {
+            return fullFrame;
+        }
+
+        if (!this.roiCanvas) {
+            this.roiCanvas = document.createElement('canvas');
+            this.roiCtx = this.roiCanvas.getContext('2d');
+        }
+        if (this.roiCanvas.width !== w || this.roiCanvas.height !== h) {
+            this.roiCanvas.width = w;
+            this.roiCanvas.height = h;
+        }
+
+        const ctx = this.roiCtx;
+        ctx.fillStyle = '#000';
+        ctx.fillRect(0, 0, w, h);
+        ctx.save();
+        ctx.beginPath();
+        xs.forEach((px, index) => {
+            if (index === 0) {
+                ctx.moveTo(px - x, ys[index] - y);
+            } else {
+                ctx.lineTo(px - x, ys[index] - y);
+            }
+        });
+        ctx.closePath();
+        ctx.clip();
+        ctx.drawImage(this.video, x, y, w, h, 0, 0, w, h);
+        ctx.restore();
+        return { source: this.roiCanvas, offsetX: x, offsetY: y };
     }
 
     getMediaDimensions() {
@@ -525,10 +580,11 @@ class UltraFastFaceRecognition {
         }
 
         let detections = [];
+        const input = this.detectionInput();
         try {
             console.log(`[Box ${this.cameraBoxId}] 🔍 Running face detection on image ${this.video.width}x${this.video.height}...`);
             detections = await faceapi
-                .detectAllFaces(this.video, this.detectorOptions)
+                .detectAllFaces(input.source, this.detectorOptions)
                 .withFaceLandmarks()
                 .withFaceDescriptors();
             
@@ -553,9 +609,12 @@ class UltraFastFaceRecognition {
 
         const boxes = detections.map(detection => {
             const box = detection.detection.box;
+            // ROI crop -> full frame coordinates
+            const x = box.x + input.offsetX;
+            const y = box.y + input.offsetY;
             return {
-                start: [box.x * this.scaleX, box.y * this.scaleY],
-                end: [(box.x + box.width) * this.scaleX, (box.y + box.height) * this.scaleY]
+                start: [x * this.scaleX, y * this.scaleY],
+                end: [(x + box.width) * this.scaleX, (y + box.height) * this.scaleY]
             };
         });
 
@@ -573,7 +632,7 @@ class UltraFastFaceRecognition {
             detections.forEach((det, index) => {
                 const liveState = livenessStates[index];
                 if (liveState && liveState.status === 'live') {
-                    liveDescriptors.push(Array.from(det.descriptor));
+                    liveDescriptors.push(det.descriptor);
                     liveIndices.push(index);
                 }
             });
@@ -651,12 +710,17 @@ class UltraFastFaceRecognition {
         }
 
         try {
+            // Pack all descriptors into one float32 buffer instead of JSON float lists
+            const dim = faceEmbeddings[0].length;
+            const packed = new Float32Array(faceEmbeddings.length * dim);
+            faceEmbeddings.forEach((descriptor, index) => packed.set(descriptor, index * dim));
+
             const response = await fetch('/api/recognize-faces/', {
                 method: 'POST',
                 headers: {
-                    'Content-Type': 'application/json'
+                    'Content-Type': 'application/octet-stream'
                 },
-                body: JSON.stringify({ face_embeddings: faceEmbeddings })
+                body: packed.buffer
             });
 
             if (!response.ok) {
@@ -900,6 +964,9 @@ window.initializeFaceRecognitionForBox = function(boxId) {
             
             // Create and initialize
             const recognition = new UltraFastFaceRecognition(boxId, imgId, canvasId, fpsId);
+            if (typeof window.getLiveFeedRoi === 'function') {
+                recognition.setRoi(window.getLiveFeedRoi(boxId));
+            }
             recognition.initialize();
             
             // Store instance
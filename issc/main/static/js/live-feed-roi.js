@@ -0,0 +1,215 @@
+/**
+ * Live Feed detection regions (ROI)
+ * Draw a polygon per camera box; face detection then only runs inside it, in
+ * the browser (live-feed-face-recognition.v2.js) and on the server.
+ * Polygons are saved through /api/live-feed/roi/ as normalized points of the
+ * source frame (not mirrored, independent of the displayed size).
+ */
+(function () {
+    const ROI_API_URL = '/api/live-feed/roi/';
+    const rois = {};     // { boxId: [[x, y], ...] or null }
+    const drafts = {};   // { boxId: points being drawn }
+
+    function cameraKey(boxId) {
+        return `box-${boxId}`;
+    }
+
+    function getCookie(name) {
+        const match = document.cookie.split(';').map(c => c.trim()).find(c => c.startsWith(name + '='));
+        return match ? decodeURIComponent(match.substring(name.length + 1)) : null;
+    }
+
+    // Displayed <img> geometry: object-fit: cover scale/offset and mirroring
+    function geometry(boxId) {
+        const img = document.getElementById(`camera-frame-${boxId}`);
+        const rect = img.getBoundingClientRect();
+        const width = img.naturalWidth || rect.width;
+        const height = img.naturalHeight || rect.height;
+        const scale = Math.max(rect.width / width, rect.height / height);
+        return {
+            rect,
+            width,
+            height,
+            scale,
+            offsetX: (rect.width - width * scale) / 2,
+            offsetY: (rect.height - height * scale) / 2,
+            mirrored: (img.style.transform || '').includes('scaleX(-1)')
+        };
+    }
+
+    function toSource(boxId, clientX, clientY) {
+        const g = geometry(boxId);
+        let px = clientX - g.rect.left;
+        const py = clientY - g.rect.top;
+        if (g.mirrored) {
+            px = g.rect.width - px;
+        }
+        const x = (px - g.offsetX) / g.scale / g.width;
+        const y = (py - g.offsetY) / g.scale / g.height;
+        return [Math.min(Math.max(x, 0), 1), Math.min(Math.max(y, 0), 1)];
+    }
+
+    function toDisplay(g, point) {
+        let px = g.offsetX + point[0] * g.width * g.scale;
+        const py = g.offsetY + point[1] * g.height * g.scale;
+        if (g.mirrored) {
+            px = g.rect.width - px;
+        }
+        return [px, py];
+    }
+
+    function draw(boxId) {
+        const canvas = document.getElementById(`roi-canvas-${boxId}`);
+        if (!canvas) {
+            return;
+        }
+        const g = geometry(boxId);
+        canvas.width = g.rect.width;
+        canvas.height = g.rect.height;
+        const ctx = canvas.getContext('2d');
+        ctx.clearRect(0, 0, canvas.width, canvas.height);
+
+        const editing = boxId in drafts;
+        const points = editing ? drafts[boxId] : rois[boxId];
+        if (!points || !points.length) {
+            return;
+        }
+
+        ctx.beginPath();
+        points.map(point => toDisplay(g, point)).forEach(([x, y], index) => {
+            if (index === 0) {
+                ctx.moveTo(x, y);
+            } else {
+                ctx.lineTo(x, y);
+            }
+            if (editing) {
+                ctx.fillStyle = '#FACC15';
+                ctx.fillRect(x - 3, y - 3, 6, 6);
+            }
+        });
+        if (!editing || points.length > 2) {
+            ctx.closePath();
+        }
+        ctx.lineWidth = 2;
+        ctx.setLineDash(editing ? [6, 4] : []);
+        ctx.strokeStyle = '#FACC15';
+        ctx.stroke();
+        if (!editing) {
+            ctx.fillStyle = 'rgba(250, 204, 21, 0.08)';
+            ctx.fill();
+        }
+    }
+
+    function applyToRecognition(boxId) {
+        const instances = window.liveFeedFaceRecognitionInstances || {};
+        const recognition = instances[boxId];
+        if (recognition && typeof recognition.setRoi === 'function') {
+            recognition.setRoi(rois[boxId] || null);
+        }
+    }
+
+    async function load(boxId) {
+        try {
+            const response = await fetch(`${ROI_API_URL}?camera=${cameraKey(boxId)}`);
+            const data = await response.json();
+            rois[boxId] = data.success ? data.polygon : null;
+        } catch (error) {
+            console.error(`[Box ${boxId}] Failed to load detection region:`, error);
+            rois[boxId] = null;
+        }
+        draw(boxId);
+        applyToRecognition(boxId);
+    }
+
+    async function save(boxId, polygon) {
+        const response = await fetch(ROI_API_URL, {
+            method: 'POST',
+            headers: {
+                'Content-Type': 'application/json',
+                'X-CSRFToken': getCookie('csrftoken')
+            },
+            body: JSON.stringify({ camera: cameraKey(boxId), polygon: polygon })
+        });
+        const data = await response.json();
+        if (!data.success) {
+            throw new Error(data.error || 'Failed to save detection region');
+        }
+        rois[boxId] = data.polygon;
+        applyToRecognition(boxId);
+    }
+
+    function setEditing(boxId, editing) {
+        const canvas = document.getElementById(`roi-canvas-${boxId}`);
+        const toolbar = document.getElementById(`roi-toolbar-${boxId}`);
+        if (editing) {
+            drafts[boxId] = [];
+        } else {
+            delete drafts[boxId];
+        }
+        canvas.classList.toggle('editing', editing);
+        toolbar.style.display = editing ? 'flex' : 'none';
+        draw(boxId);
+    }
+
+    function setUp(button) {
+        const boxId = String(button.getAttribute('data-box-id'));
+        const canvas = document.getElementById(`roi-canvas-${boxId}`);
+        const toolbar = document.getElementById(`roi-toolbar-${boxId}`);
+
+        button.addEventListener('click', () => setEditing(boxId, !(boxId in drafts)));
+
+        canvas.addEventListener('click', event => {
+            if (boxId in drafts) {
+                drafts[boxId].push(toSource(boxId, event.clientX, event.clientY));
+                draw(boxId);
+            }
+        });
+
+        toolbar.querySelector('.roi-save').addEventListener('click', async () => {
+            const points = drafts[boxId] || [];
+            if (points.length < 3) {
+                alert('Click at least 3 points on the camera view to outline the detection region.');
+                return;
+            }
+            try {
+                await save(boxId, points);
+                setEditing(boxId, false);
+            } catch (error) {
+                alert(error.message);
+            }
+        });
+
+        toolbar.querySelector('.roi-clear').addEventListener('click', async () => {
+            try {
+                await save(boxId, null);
+                setEditing(boxId, false);
+            } catch (error) {
+                alert(error.message);
+            }
+        });
+
+        toolbar.querySelector('.roi-cancel').addEventListener('click', () => setEditing(boxId, false));
+
+        // Redraw when the displayed size, the stream resolution or mirroring changes
+        const img = document.getElementById(`camera-frame-${boxId}`);
+        if (typeof ResizeObserver !== 'undefined') {
+            new ResizeObserver(() => draw(boxId)).observe(img);
+        }
+        let layout = null;
+        img.addEventListener('load', () => {
+            const current = `${img.naturalWidth}x${img.naturalHeight}:${img.style.transform}`;
+            if (current !== layout) {
+                layout = current;
+                draw(boxId);
+            }
+        });
+        load(boxId);
+    }
+
+    // Read by UltraFastFaceRecognition when a box starts
+    window.getLiveFeedRoi = boxId => rois[String(boxId)] || null;
+
+    document.addEventListener('DOMContentLoaded', () => {
+        document.querySelectorAll('.roi-edit-btn').forEach(setUp);
+    });
+})();
@@ -1,11 +1,18 @@
+import json
+import os
+import tempfile
+import time
+from unittest import skipUnless
 from unittest.mock import patch
 
+import numpy as np
+
 from django.contrib.auth import get_user_model
-from django.test import TestCase
+from django.test import RequestFactory, TestCase
 from django.test import override_settings
 from django.urls import reverse
 
-from .models import IncidentReport
+from .models import IncidentReport, FacesEmbeddings
 
 
 @override_settings(ROOT_URLCONF='main.tests_urls')
@@ -111,3 +118,1225 @@ class IncidentNotificationTests(TestCase):
 			['admin_user@example.com', 'faculty_user@example.com'],
 		)
 		self.assertNotIn('another_student@example.com', recipients)
+
+
+class FaceRecognitionEngineGalleryTests(TestCase):
+	def setUp(self):
+		from .computer_vision.face_recognition_engine import face_engine
+
+		self.engine = face_engine
+		self.user_model = get_user_model()
+		rng = np.random.default_rng(7)
+		self.vectors = {}
+
+		for index, id_number in enumerate(['S-2001', 'S-2002', 'S-2003']):
+			user = self.user_model.objects.create_user(
+				username=f'enrollee_{index}',
+				password='test-pass-123',
+				first_name='En',
+				middle_name='R',
+				last_name=f'Ollee{index}',
+				email=f'enrollee_{index}@example.com',
+				id_number=id_number,
+				contact_number='09123456700',
+				gender='M',
+				department='CCS',
+				privilege='student',
+				status='allowed',
+			)
+			vector = rng.normal(size=128)
+			self.vectors[id_number] = vector
+			FacesEmbeddings.objects.create(
+				id_number=user,
+				front_embedding=vector.tolist(),
+				left_embedding=vector.tolist(),
+				right_embedding=vector.tolist(),
+			)
+
+		self.engine.load_all_embeddings()
+
+	def test_gallery_keeps_each_pose_as_contiguous_float32_row(self):
+		gallery = self.engine.gallery
+
+		self.assertEqual(len(gallery), 3)
+		self.assertEqual(gallery.state.matrix.shape, (9, 128))
+		self.assertEqual(gallery.state.matrix.dtype, np.float32)
+		self.assertTrue(gallery.state.matrix.flags['C_CONTIGUOUS'])
+		self.assertEqual(list(gallery.state.row_person), [0, 0, 0, 1, 1, 1, 2, 2, 2])
+
+	def test_person_score_is_max_over_poses(self):
+		from .computer_vision.face_gallery import FaceGallery
+
+		gallery = FaceGallery(dim=4)
+		gallery.replace([
+			('A', [np.array([1, 0, 0, 0.]), np.array([0, 1, 0, 0.])], {}),
+			('B', [np.array([0, 0, 1, 0.])], {}),
+		])
+
+		matches = gallery.best_matches([[0, 1, 0, 0], [0, 0, 0.9, 0.1], [0, 0, 0, 0]])
+
+		self.assertEqual(matches[0], ('A', 1.0))
+		self.assertEqual(matches[1][0], 'B')
+		self.assertEqual(matches[2], (None, 0.0))
+
+	def test_ann_search_with_exact_rerank_agrees_with_brute_force(self):
+		from .computer_vision.face_gallery import FaceGallery
+
+		rng = np.random.default_rng(1)
+		entries = [
+			(f'P-{i}', list(rng.normal(size=(3, 16)).astype(np.float32)), {})
+			for i in range(200)
+		]
+		probes = rng.normal(size=(20, 16)).astype(np.float32)
+
+		exact = FaceGallery(dim=16)
+		exact.replace(entries)
+		# nprobe covering every list makes the IVF candidate search exhaustive
+		approximate = FaceGallery(dim=16, ann_enabled=True, ann_min_size=100, ann_nprobe=1000)
+		approximate.replace(entries)
+		small = FaceGallery(dim=16, ann_enabled=True, ann_min_size=500)
+		small.replace(entries)
+
+		self.assertTrue(approximate.uses_ann())
+		self.assertFalse(small.uses_ann())
+		for (exact_id, exact_score), (ann_id, ann_score) in zip(exact.best_matches(probes), approximate.best_matches(probes)):
+			self.assertEqual(ann_id, exact_id)
+			self.assertAlmostEqual(ann_score, exact_score, places=5)
+
+		approximate.ann_index.remove('P-0')
+		self.assertNotIn('P-0', approximate.ann_index)
+
+	def test_ann_search_finds_allowed_people_behind_restricted_neighbours(self):
+		from .computer_vision.face_gallery import FaceGallery
+
+		rng = np.random.default_rng(2)
+		probe = rng.normal(size=16).astype(np.float32)
+		# Restricted look-alikes closer to the probe than the allowed person
+		entries = [(f'R-{i}', [probe + rng.normal(scale=0.01, size=16)], {'status': 'restricted'}) for i in range(12)]
+		entries.append(('ALLOWED', [probe + rng.normal(scale=0.2, size=16)], {'status': 'allowed'}))
+		entries += [(f'P-{i}', [rng.normal(size=16)], {'status': 'allowed'}) for i in range(150)]
+
+		exact = FaceGallery(dim=16)
+		exact.replace(entries)
+		approximate = FaceGallery(dim=16, ann_enabled=True, ann_min_size=100, ann_rerank_k=4)
+		approximate.replace(entries)
+
+		self.assertTrue(approximate.uses_ann())
+		self.assertEqual(exact.best_matches([probe], allowed_only=True)[0][0], 'ALLOWED')
+		self.assertEqual(approximate.best_matches([probe], allowed_only=True)[0][0], 'ALLOWED')
+		self.assertTrue(approximate.best_matches([probe])[0][0].startswith('R-'))
+
+	def test_embeddings_are_stored_as_packed_float32(self):
+		from django.db import connection
+
+		record = FacesEmbeddings.objects.get(id_number__id_number='S-2001')
+		self.assertEqual(record.front_embedding.dtype, np.float32)
+		np.testing.assert_allclose(record.front_embedding, self.vectors['S-2001'], rtol=1e-6)
+
+		with connection.cursor() as cursor:
+			cursor.execute('SELECT front_embedding FROM main_facesembeddings WHERE face_id = %s', [record.face_id.hex])
+			raw, = cursor.fetchone()
+		# 4-byte version/dim header + 128 little-endian float32 values
+		self.assertEqual(len(raw), 4 + 128 * 4)
+
+	def test_gallery_reload_is_one_joined_query(self):
+		from .computer_vision.face_gallery import reload_face_gallery
+
+		# High-water mark + one joined query for every row, however many users there are
+		with self.assertNumQueries(2):
+			loaded_count = reload_face_gallery()
+
+		self.assertEqual(loaded_count, 3)
+		self.assertEqual(self.engine.gallery.get_info('S-2002')['last_name'], 'Ollee1')
+
+	def test_warm_start_maps_snapshot_and_applies_only_deltas(self):
+		from django.utils import timezone
+		from .computer_vision import face_gallery as gallery_module
+
+		gallery = self.engine.gallery
+		new_vector = np.random.default_rng(11).normal(size=128)
+
+		with tempfile.TemporaryDirectory() as snapshot_dir, override_settings(FACE_GALLERY_SNAPSHOT_DIR=snapshot_dir):
+			gallery_module.reload_face_gallery()
+			gallery.replace([])
+			gallery.high_water = None
+
+			# High-water mark, enrolled id list and the (empty) delta - no full row load
+			with self.assertNumQueries(3):
+				self.assertEqual(gallery_module.warm_start_face_gallery(), 3)
+			self.assertIsInstance(gallery.state.matrix, np.memmap)
+			self.assertEqual(self.engine.recognize_face(self.vectors['S-2003'])['id_number'], 'S-2003')
+
+			# Changed behind the gallery's back (queryset update sends no signals)
+			FacesEmbeddings.objects.filter(id_number__id_number='S-2002').update(
+				front_embedding=new_vector.tolist(), updated_at=timezone.now()
+			)
+			FacesEmbeddings.objects.filter(id_number__id_number='S-2003').delete()
+			gallery_module.sync_face_gallery()
+
+		self.assertNotIn('S-2003', gallery)
+		self.assertEqual(self.engine.recognize_face(new_vector)['id_number'], 'S-2002')
+		self.assertEqual(self.engine.recognize_face(self.vectors['S-2001'])['id_number'], 'S-2001')
+
+	def test_worker_follows_gallery_published_by_another_process(self):
+		from .computer_vision import face_gallery as gallery_module
+		from .computer_vision.gallery_snapshot import write_snapshot
+
+		other_worker = gallery_module.FaceGallery()
+		other_worker.replace([('S-9001', [np.ones(128, dtype=np.float32)], {'first_name': 'Other'})])
+
+		with tempfile.TemporaryDirectory() as snapshot_dir, override_settings(FACE_GALLERY_SNAPSHOT_DIR=snapshot_dir):
+			gallery_module.reload_face_gallery()
+			self.assertFalse(gallery_module.follow_published_gallery())
+
+			generation = write_snapshot(snapshot_dir, other_worker.state, self.engine.gallery.high_water)
+			self.assertTrue(gallery_module.follow_published_gallery())
+			self.assertEqual(self.engine.gallery.generation, generation)
+			self.assertEqual(list(self.engine.gallery.state.person_ids), ['S-9001'])
+			self.assertFalse(gallery_module.follow_published_gallery())
+
+	def test_live_feed_page_does_not_reload_a_loaded_gallery(self):
+		from .computer_vision import face_gallery as gallery_module
+		from .computer_vision.gallery_snapshot import published_generation
+		from .views.live_feed_simple import load_face_embeddings
+
+		with tempfile.TemporaryDirectory() as snapshot_dir, override_settings(FACE_GALLERY_SNAPSHOT_DIR=snapshot_dir):
+			gallery_module.reload_face_gallery()
+			generation = published_generation(snapshot_dir)
+
+			# Signals keep the gallery current: no table scan and no snapshot rewrite per page view
+			with self.assertNumQueries(0), patch.object(gallery_module, 'write_snapshot') as writes:
+				self.assertTrue(load_face_embeddings())
+				self.assertTrue(load_face_embeddings())
+			writes.assert_not_called()
+			self.assertEqual(published_generation(snapshot_dir), generation)
+
+	def test_snapshot_keeps_the_previous_matrix_for_readers_in_flight(self):
+		import glob
+		from .computer_vision.gallery_snapshot import read_snapshot, write_snapshot
+
+		state = self.engine.gallery.state
+		with tempfile.TemporaryDirectory() as snapshot_dir:
+			write_snapshot(snapshot_dir, state, None)
+			in_flight = read_snapshot(snapshot_dir, 128)
+			write_snapshot(snapshot_dir, state, None)
+			self.assertEqual(len(glob.glob(os.path.join(snapshot_dir, 'gallery-*.npy'))), 2)
+			self.assertTrue(os.path.exists(in_flight.matrix.filename))
+
+			write_snapshot(snapshot_dir, state, None)
+			self.assertEqual(len(glob.glob(os.path.join(snapshot_dir, 'gallery-*.npy'))), 2)
+			self.assertFalse(os.path.exists(in_flight.matrix.filename))
+
+	@skipUnless(os.name == 'posix', 'flock is POSIX only')
+	def test_enrollment_waits_for_another_process_publishing(self):
+		import fcntl
+		import threading
+		from contextlib import nullcontext
+		from .computer_vision import face_gallery as gallery_module
+		from .computer_vision import gallery_snapshot
+
+		other_worker = gallery_module.FaceGallery()
+		other_worker.replace([('S-9001', [np.ones(128, dtype=np.float32)], {'first_name': 'Other'})])
+
+		publisher = gallery_module.GalleryPublisher(delay=60)
+		with tempfile.TemporaryDirectory() as snapshot_dir, override_settings(FACE_GALLERY_SNAPSHOT_DIR=snapshot_dir), \
+				patch.object(gallery_module, 'gallery_publisher', publisher):
+			gallery_module.reload_face_gallery()
+			high_water = self.engine.gallery.high_water
+			with self.captureOnCommitCallbacks(execute=True):
+				user = self.user_model.objects.get(id_number='S-2002')
+				user.status = 'restricted'
+				user.save()
+
+			# Another process takes the lock and publishes its own enrollment a moment later
+			locked = threading.Event()
+
+			def other_process():
+				with open(os.path.join(snapshot_dir, 'lock'), 'a+b') as handle:
+					fcntl.flock(handle.fileno(), fcntl.LOCK_EX)
+					locked.set()
+					time.sleep(0.2)
+					with patch.object(gallery_snapshot, 'snapshot_lock', lambda directory: nullcontext()):
+						gallery_snapshot.write_snapshot(snapshot_dir, other_worker.state, high_water)
+					fcntl.flock(handle.fileno(), fcntl.LOCK_UN)
+
+			other = threading.Thread(target=other_process)
+			other.start()
+			locked.wait(5)
+			self.assertTrue(publisher.flush())
+			other.join(5)
+
+			# Our change was applied on top of the other process's gallery, not over it
+			snapshot = gallery_snapshot.read_snapshot(snapshot_dir, 128)
+			self.assertEqual(sorted(snapshot.person_ids), ['S-2002', 'S-9001'])
+			self.assertEqual(snapshot.person_info['S-2002']['status'], 'restricted')
+
+	def test_enrollment_changes_are_published_once_off_the_request_thread(self):
+		from .computer_vision import face_gallery as gallery_module
+		from .computer_vision.gallery_snapshot import published_generation, read_snapshot, write_snapshot
+
+		publisher = gallery_module.GalleryPublisher(delay=60)
+		with tempfile.TemporaryDirectory() as snapshot_dir, override_settings(FACE_GALLERY_SNAPSHOT_DIR=snapshot_dir), \
+				patch.object(gallery_module, 'gallery_publisher', publisher):
+			gallery_module.reload_face_gallery()
+			generation = published_generation(snapshot_dir)
+
+			with self.captureOnCommitCallbacks(execute=True):
+				FacesEmbeddings.objects.filter(id_number__id_number='S-2001').delete()
+				user = self.user_model.objects.get(id_number='S-2002')
+				user.status = 'restricted'
+				user.save()
+
+			# Applied locally at once, but nothing written in the request thread
+			self.assertNotIn('S-2001', self.engine.gallery)
+			self.assertEqual(published_generation(snapshot_dir), generation)
+			self.assertEqual(publisher.pending, {'S-2001', 'S-2002'})
+
+			with patch.object(gallery_module, 'write_snapshot', wraps=write_snapshot) as writes:
+				self.assertTrue(publisher.flush())
+			self.assertEqual(writes.call_count, 1)
+			self.assertEqual(publisher.pending, set())
+
+			snapshot = read_snapshot(snapshot_dir, 128)
+			self.assertEqual(sorted(snapshot.person_ids), ['S-2002', 'S-2003'])
+			self.assertEqual(snapshot.person_info['S-2002']['status'], 'restricted')
+
+	def test_signals_apply_single_user_deltas_to_gallery(self):
+		gallery = self.engine.gallery
+		new_vector = np.random.default_rng(9).normal(size=128)
+
+		with self.captureOnCommitCallbacks(execute=True):
+			FacesEmbeddings.objects.filter(id_number__id_number='S-2001').delete()
+		self.assertNotIn('S-2001', gallery)
+		self.assertEqual(gallery.state.matrix.shape, (6, 128))
+		self.assertEqual(list(gallery.state.row_person), [0, 0, 0, 1, 1, 1])
+
+		with self.captureOnCommitCallbacks(execute=True):
+			FacesEmbeddings.objects.create(
+				id_number=self.user_model.objects.get(id_number='S-2001'),
+				front_embedding=new_vector.tolist(),
+			)
+		self.assertEqual(self.engine.recognize_face(new_vector)['id_number'], 'S-2001')
+		self.assertEqual(gallery.state.matrix.shape, (7, 128))
+
+		with self.captureOnCommitCallbacks(execute=True):
+			user = self.user_model.objects.get(id_number='S-2002')
+			user.status = 'restricted'
+			user.save()
+		self.assertEqual(gallery.get_info('S-2002')['status'], 'restricted')
+		self.assertFalse(self.engine.recognize_face(self.vectors['S-2002'])['matched'])
+		self.assertEqual(self.engine.recognize_face(self.vectors['S-2003'])['id_number'], 'S-2003')
+
+	def test_gallery_matcher_metrics_agree_on_the_same_candidate(self):
+		from .computer_vision.gallery_matcher import GalleryMatcher
+
+		probe = self.vectors['S-2001'] + np.random.default_rng(3).normal(scale=0.1, size=128)
+		similarity = GalleryMatcher('cosine_similarity', 0.9).match(probe)
+		distance = GalleryMatcher('cosine_distance', 0.1).match(probe)
+		euclidean = GalleryMatcher('euclidean', 0.45).match(probe)
+
+		self.assertEqual({similarity.id_number, distance.id_number, euclidean.id_number}, {'S-2001'})
+		self.assertAlmostEqual(distance.score, 1 - similarity.score, places=6)
+		self.assertAlmostEqual(euclidean.score, np.sqrt(2 - 2 * similarity.score), places=5)
+		self.assertEqual(similarity.matched, distance.matched)
+
+		self.user_model.objects.filter(id_number='S-2001').update(status='restricted')
+		self.engine.load_all_embeddings()
+		self.assertFalse(GalleryMatcher('cosine_similarity', 0.9).match(probe).matched)
+		self.assertEqual(GalleryMatcher('cosine_similarity', 0.9, allowed_only=False).match(probe).id_number, 'S-2001')
+
+	def test_face_matcher_never_imports_torch_on_cpu_hosts(self):
+		import sys
+		from .computer_vision import torch_support
+		from .computer_vision.face_matching import FaceMatcher
+
+		with patch.object(torch_support, 'cuda_driver_available', return_value=False), \
+				patch.object(torch_support, '_probed', False), patch.object(torch_support, '_torch', None):
+			matcher = FaceMatcher(use_gpu=True)
+			probe = self.vectors['S-2002']
+			distances = [matcher.compare_gpu(probe, stored) for stored in (self.vectors['S-2001'], probe, np.zeros(128))]
+
+		self.assertFalse(matcher.has_cuda)
+		self.assertNotIn('torch', sys.modules)
+		self.assertAlmostEqual(distances[1], 0.0, places=5)
+		self.assertAlmostEqual(distances[0], 1 - float(np.dot(probe, self.vectors['S-2001'])) /
+		                       float(np.linalg.norm(probe) * np.linalg.norm(self.vectors['S-2001'])), places=5)
+		self.assertEqual(distances[2], np.inf)
+		self.assertEqual(matcher.match(probe)[0], 'S-2002')
+
+	def test_batch_recognition_matches_single_recognition(self):
+		unknown = np.random.default_rng(11).normal(size=128)
+		probes = [self.vectors['S-2003'], unknown, self.vectors['S-2001']]
+
+		results = self.engine.recognize_multiple_faces(probes)
+
+		self.assertEqual([result['id_number'] for result in results], ['S-2003', None, 'S-2001'])
+		for probe, result in zip(probes, results):
+			self.assertEqual(self.engine.recognize_face(probe)['id_number'], result['id_number'])
+
+	def test_binary_payload_decodes_to_probe_matrix(self):
+		from .views.face_recognition_views import decode_face_embeddings
+
+		packed = np.stack([self.vectors['S-2002'], self.vectors['S-2001']]).astype('<f4').tobytes()
+		request = RequestFactory().post('/api/recognize-faces/', data=packed, content_type='application/octet-stream')
+
+		probes = decode_face_embeddings(request)
+		results = self.engine.recognize_multiple_faces(probes)
+
+		self.assertEqual(probes.shape, (2, 128))
+		self.assertEqual([result['id_number'] for result in results], ['S-2002', 'S-2001'])
+
+
+class CVLoggingTests(TestCase):
+	def test_camera_counters_summarize_per_interval_and_warnings_are_rate_limited(self):
+		import logging
+
+		from .computer_vision.cv_logging import CameraCounters, RateLimiter, log_limited
+
+		now = [100.0]
+		clock = lambda: now[0]
+		counters = CameraCounters(interval=10, clock=clock)
+
+		with self.assertLogs('main.cv', level='INFO') as captured:
+			for _ in range(20):
+				counters.record(3, faces=2, matches=1, unknown=1)
+				now[0] += 0.5
+			counters.record(3)
+
+			limiter = RateLimiter(interval=10, clock=clock)
+			written = [log_limited(logging.WARNING, 'embed', 'embedding failed', limiter=limiter) for _ in range(5)]
+			now[0] += 10
+			log_limited(logging.WARNING, 'embed', 'embedding failed', limiter=limiter)
+
+		summaries = [record for record in captured.records if record.levelno == logging.INFO]
+		self.assertEqual(len(summaries), 1)
+		self.assertEqual(summaries[0].camera_id, 3)
+		self.assertAlmostEqual(summaries[0].faces_per_s, 4.0)
+		self.assertAlmostEqual(summaries[0].matches_per_s, 2.0)
+		self.assertEqual(counters.snapshot()[3]['unknown_per_s'], 2.0)
+
+		self.assertEqual(written, [True, False, False, False, False])
+		warnings = [record.getMessage() for record in captured.records if record.levelno == logging.WARNING]
+		self.assertEqual(warnings, ['embedding failed', 'embedding failed (suppressed 4 similar)'])
+
+
+class FaceTrackerTests(TestCase):
+	def test_moving_face_keeps_its_track_and_is_only_re_embedded_when_needed(self):
+		from .computer_vision.face_tracker import FaceTracker
+
+		tracker = FaceTracker(iou_threshold=0.3, max_missed=2, refresh_interval=3.0, min_confidence=0.05)
+
+		first, = tracker.update([(100, 100, 80, 80)])
+		self.assertTrue(tracker.needs_embedding(first, now=0.0))
+		first.assign('S-2001', 0.2, 0.25, now=0.0)
+
+		# The same face drifting right, plus a newcomer on the other side of the frame
+		for step in range(1, 6):
+			tracked, newcomer = tracker.update([(100 + 12 * step, 100, 80, 80), (400, 50, 70, 70)])
+			self.assertIs(tracked, first)
+			self.assertEqual(tracked.label, 'S-2001')
+			self.assertFalse(tracker.needs_embedding(tracked, now=step * 0.5))
+		self.assertTrue(tracker.needs_embedding(newcomer, now=2.5))
+		self.assertTrue(tracker.needs_embedding(first, now=3.0))
+
+		# Borderline decisions are re-checked on every frame
+		newcomer.assign(None, 0.47, 0.02, now=2.5)
+		self.assertTrue(tracker.needs_embedding(newcomer, now=2.6))
+
+		# Tracks that stay unmatched longer than max_missed are dropped
+		for _ in range(3):
+			tracker.update([(400, 50, 70, 70)])
+		self.assertEqual([track.track_id for track in tracker.tracks], [newcomer.track_id])
+
+
+class InferencePoolTests(TestCase):
+	def test_pool_drops_oldest_per_camera_and_serves_cameras_round_robin(self):
+		import threading
+		from concurrent.futures import ThreadPoolExecutor
+
+		from .computer_vision.inference_pool import InferencePool
+
+		gate = threading.Event()
+		done = threading.Event()
+		delivered = []
+
+		def run(name):
+			if name == 'gate-1':
+				gate.wait(5)
+			return name
+
+		def handler(context, result, error):
+			delivered.append((context, result))
+			if len(delivered) == 4:
+				done.set()
+
+		executor = ThreadPoolExecutor(max_workers=1)
+		pool = InferencePool(workers=1, max_pending=2, executor=executor).start()
+		try:
+			pool.submit('gate', run, ('gate-1',), handler, context='gate')
+			# Wait for the first job to be in flight so the rest queue up behind it
+			for _ in range(100):
+				if pool.stats()['gate']['pending'] == 0:
+					break
+				threading.Event().wait(0.01)
+
+			accepted = [pool.submit('gate', run, (f'gate-{n}',), handler, context='gate') for n in (2, 3, 4)]
+			pool.submit('plate', run, ('plate-1',), handler, context='plate')
+			gate.set()
+			self.assertTrue(done.wait(5))
+		finally:
+			pool.shutdown(wait=True)
+
+		self.assertEqual(accepted, [True, True, False])
+		self.assertEqual([result for _, result in delivered], ['gate-1', 'gate-3', 'plate-1', 'gate-4'])
+		self.assertEqual(pool.stats()['gate']['dropped'], 1)
+		self.assertEqual(pool.stats()['gate']['completed'], 3)
+
+	def test_pool_embeds_faces_from_several_cameras_in_one_forward_pass(self):
+		import threading
+		from concurrent.futures import ThreadPoolExecutor
+
+		from .computer_vision import inference_worker
+		from .computer_vision.embedding_backends import DeepFaceBackend
+		from .computer_vision.inference_pool import InferencePool
+
+		class FakeDeepFace:
+			def extract_faces(self, img_path, **kwargs):
+				# One 80x80 face per frame; the frame's fill value identifies it
+				value = float(img_path[0, 0, 0]) / 255.0
+				return [{'facial_area': {'x': 10, 'y': 10, 'w': 80, 'h': 80}, 'face': np.full((80, 80, 3), value)}]
+
+		class FakeFacenet:
+			input_shape = (None, 160, 160, 3)
+			batches = []
+
+			def predict_on_batch(self, batch):
+				self.batches.append(len(batch))
+				# Embedding encodes the input's fill value
+				return np.stack([np.eye(128)[int(round(face.max() * 10))] for face in batch])
+
+		model = FakeFacenet()
+		backend = DeepFaceBackend()
+		backend._model = model
+		done = threading.Event()
+		delivered = {}
+
+		def handler(camera, detections, error):
+			delivered[camera] = (detections, error)
+			if len(delivered) == 3:
+				done.set()
+
+		pool = InferencePool(workers=1, max_pending=2, batch_size=4, batch_window=0.5, executor=ThreadPoolExecutor(max_workers=1))
+		with patch.object(inference_worker, '_deepface', FakeDeepFace()), \
+				patch.object(inference_worker, '_embedding_backend', backend):
+			pool.start()
+			try:
+				for camera, fill in (('gate', 51), ('plate', 102), ('lobby', 153)):
+					frame = np.full((120, 120, 3), fill, dtype=np.uint8)
+					pool.submit(camera, inference_worker.detect_and_embed, (frame, (), 0.3, 60), handler, context=camera)
+				self.assertTrue(done.wait(5))
+			finally:
+				pool.shutdown(wait=True)
+
+		self.assertEqual(model.batches, [3])
+		for camera, slot in (('gate', 2), ('plate', 4), ('lobby', 6)):
+			detections, error = delivered[camera]
+			self.assertIsNone(error)
+			self.assertEqual(int(np.argmax(detections[0]['embedding'])), slot)
+
+	def test_pool_replaces_its_executor_when_a_worker_process_dies(self):
+		import queue
+		from concurrent.futures import Future, ThreadPoolExecutor
+		from concurrent.futures.process import BrokenProcessPool
+
+		from .computer_vision.inference_pool import InferencePool
+
+		class DeadWorkers:
+			"""A process pool whose worker crashed: running batches fail, then submit() refuses"""
+			submitted = 0
+
+			def submit(self, *args):
+				self.submitted += 1
+				if self.submitted > 1:
+					raise BrokenProcessPool("pool is broken")
+				future = Future()
+				future.set_exception(BrokenProcessPool("worker died"))
+				return future
+
+			def shutdown(self, wait=True, cancel_futures=False):
+				pass
+
+		executors = [DeadWorkers(), ThreadPoolExecutor(max_workers=1)]
+		created = []
+
+		def executor_factory():
+			created.append(executors[len(created)])
+			return created[-1]
+
+		delivered = queue.Queue()
+		pool = InferencePool(workers=1, executor_factory=executor_factory, restart_backoff=0.01).start()
+		try:
+			pool.submit('gate', str.upper, ('first',), lambda context, result, error: delivered.put((result, error)))
+			result, error = delivered.get(timeout=5)
+			self.assertIsInstance(error, BrokenProcessPool)
+
+			pool.submit('gate', str.upper, ('second',), lambda context, result, error: delivered.put((result, error)))
+			self.assertEqual(delivered.get(timeout=5), ('SECOND', None))
+		finally:
+			pool.shutdown(wait=True)
+
+		self.assertEqual(len(created), 2)
+		self.assertEqual(pool.restarts, 1)
+		self.assertEqual(pool.stats()['gate']['failed'], 1)
+
+
+class ModelWarmupTests(TestCase):
+	def test_ready_probe_holds_traffic_until_models_are_warm(self):
+		from .computer_vision import model_warmup
+		from .views.health_view import ready
+
+		request = RequestFactory().get('/healthz/ready')
+		cold = dict(model_warmup._status, timings={})
+		self.addCleanup(model_warmup._status.update, cold)
+
+		self.assertEqual(ready(request).status_code, 200)  # warm-up disabled: lazy dev path
+
+		with override_settings(FACE_WARMUP_ON_START=True, FACE_INFERENCE_WORKERS=0), \
+				patch.object(model_warmup, 'warm_start_face_gallery') as warm_gallery, \
+				patch.object(model_warmup.inference_worker, 'warm_up', return_value={'detector': 0.5, 'embedding': 0.2}) as warm_models:
+			response = ready(request)
+			self.assertEqual(response.status_code, 503)
+			self.assertEqual(json.loads(response.content)['status'], 'cold')
+
+			model_warmup.warm_up_models()
+			model_warmup.warm_up_models()  # already warm: no second load
+
+			response = ready(request)
+			self.assertEqual(response.status_code, 200)
+			self.assertEqual(json.loads(response.content)['status'], 'ready')
+			self.assertEqual(set(json.loads(response.content)['timings']), {'gallery', 'detector', 'embedding'})
+		warm_gallery.assert_called_once_with()
+		warm_models.assert_called_once_with()
+
+
+def _module_available(name):
+	import importlib.util
+	return importlib.util.find_spec(name) is not None
+
+
+class EmbeddingBackendTests(TestCase):
+	FIXTURE_IMAGES = ('front.jpg', 'left.jpg', 'right.jpg')
+
+	def _fixture_faces(self):
+		import os
+
+		import cv2
+
+		from django.conf import settings
+
+		faces = []
+		for name in self.FIXTURE_IMAGES:
+			image = cv2.imread(os.path.join(settings.BASE_DIR, 'main', 'static', 'images', name))
+			faces.append(cv2.cvtColor(image, cv2.COLOR_BGR2RGB))
+		return faces
+
+	def test_enrollment_uses_configured_backend_with_deepface_preprocessing(self):
+		from .computer_vision.embedding_backends import OpenCVDnnBackend, create_backend, prepare_face
+		from .computer_vision.face_enrollment import FaceEnrollment
+
+		face = np.zeros((100, 80, 3), dtype=np.uint8)
+		face[..., 0] = 255  # pure red in RGB
+		prepared = prepare_face(face, (160, 160))
+		self.assertEqual(prepared.shape, (160, 160, 3))
+		self.assertEqual(prepared[80, 80].tolist(), [0.0, 0.0, 1.0])  # flipped like DeepFace.represent
+		self.assertEqual(prepared[80, 0].tolist(), [0.0, 0.0, 0.0])  # letterbox padding
+
+		with self.assertRaises(ValueError):
+			create_backend('tensorrt')
+
+		forward = lambda backend, batch: np.tile(np.arange(1, 129, dtype=np.float32), (len(batch), 1))
+		with override_settings(FACE_EMBEDDING_BACKEND='opencv'), \
+				patch.object(OpenCVDnnBackend, 'load'), patch.object(OpenCVDnnBackend, 'forward', forward):
+			enrollment = FaceEnrollment()
+			embedding = enrollment.extract_embeddings(np.full((120, 100, 3), 90, dtype=np.uint8))
+
+		self.assertIsInstance(enrollment.embedding_backend, OpenCVDnnBackend)
+		self.assertEqual(embedding.shape, (128,))
+		self.assertAlmostEqual(float(np.linalg.norm(embedding)), 1.0, places=5)
+
+	@skipUnless(_module_available('deepface'), 'DeepFace (TensorFlow) is not installed')
+	def test_onnx_backends_match_deepface_on_fixture_images(self):
+		import os
+
+		from django.conf import settings
+
+		from deepface import DeepFace
+
+		from .computer_vision.embedding_backends import create_backend
+
+		model_path = settings.FACE_EMBEDDING_MODEL_PATH
+		if not os.path.exists(model_path):
+			self.skipTest(f'No exported Facenet graph at {model_path} (run export_facenet_onnx)')
+
+		faces = self._fixture_faces()
+		reference = []
+		for face in faces:
+			vector = np.asarray(DeepFace.represent(img_path=face, model_name='Facenet', detector_backend='skip',
+				enforce_detection=False, align=False)[0]['embedding'], dtype=np.float32)
+			reference.append(vector / np.linalg.norm(vector))
+		reference = np.stack(reference)
+
+		backends = ['opencv'] + (['onnxruntime'] if _module_available('onnxruntime') else [])
+		for name in backends:
+			with self.subTest(backend=name):
+				embeddings = create_backend(name, model_path=model_path).embed(faces)
+				self.assertEqual(embeddings.shape, (len(faces), 128))
+				np.testing.assert_allclose(embeddings, reference, atol=1e-4)
+				self.assertTrue(np.all(np.sum(embeddings * reference, axis=1) > 0.9999))
+
+
+class _FakeYuNet:
+	"""cv2.FaceDetectorYN stand-in: one face, given in detection-size pixels"""
+
+	def __init__(self, rows):
+		self.rows = np.asarray(rows, dtype=np.float32)
+		self.input_sizes = []
+
+	def setInputSize(self, size):
+		self.input_sizes.append(size)
+
+	def detect(self, image):
+		return 1, self.rows
+
+
+class FaceDetectorTests(TestCase):
+	# x, y, w, h, right eye, left eye, nose, right mouth corner, left mouth corner, score
+	ROW = [10, 20, 30, 40, 15, 30, 30, 30, 22, 38, 17, 48, 28, 48, 0.95]
+
+	def _yunet(self, **options):
+		import cv2
+
+		from .computer_vision.face_detectors import create_detector
+
+		fake = _FakeYuNet([self.ROW])
+		detector = create_detector('yunet', model_path='yunet.onnx', **options)
+		patcher = patch.object(cv2.FaceDetectorYN, 'create', return_value=fake)
+		patcher.start()
+		self.addCleanup(patcher.stop)
+		return detector, fake
+
+	def test_yunet_runs_downscaled_and_maps_boxes_and_landmarks_back(self):
+		detector, fake = self._yunet(input_width=320)
+		detections = detector.detect(np.zeros((480, 1280, 3), dtype=np.uint8))
+
+		self.assertEqual(fake.input_sizes, [(320, 120)])
+		self.assertEqual(len(detections), 1)
+		detection = detections[0]
+		self.assertEqual(detection.box, (40, 80, 120, 160))
+		self.assertEqual(detection.landmarks['right_eye'], (60.0, 120.0))
+		self.assertEqual(detection.landmarks['mouth_left'], (112.0, 192.0))
+		self.assertAlmostEqual(detection.score, 0.95, places=5)
+
+		# Input size is configurable; 0 detects at full resolution
+		detector, fake = self._yunet(input_width=0)
+		self.assertEqual(detector.detect(np.zeros((480, 640, 3), dtype=np.uint8))[0].box, (10, 20, 30, 40))
+		self.assertEqual(fake.input_sizes, [(640, 480)])
+
+	def test_align_face_levels_the_eyes(self):
+		import cv2
+
+		from .computer_vision.face_detectors import FaceDetection, align_face
+
+		image = np.zeros((200, 200, 3), dtype=np.uint8)
+		cv2.circle(image, (70, 110), 4, (255, 255, 255), -1)
+		cv2.circle(image, (130, 80), 4, (255, 255, 255), -1)
+		detection = FaceDetection((30, 30, 140, 140), {'right_eye': (70, 110), 'left_eye': (130, 80)}, 0.9)
+
+		crop = align_face(image, detection)
+		self.assertEqual(crop.shape, (140, 140, 3))
+		ys, xs = np.nonzero(crop[..., 0] > 128)
+		left, right = ys[xs < 70], ys[xs >= 70]
+		self.assertLessEqual(abs(left.mean() - right.mean()), 1.0)
+
+		# Without landmarks it is a plain crop
+		plain = align_face(image, detection._replace(landmarks=None))
+		np.testing.assert_array_equal(plain, image[30:170, 30:170])
+
+	def test_worker_uses_native_detector_with_aligned_crops(self):
+		from .computer_vision import inference_worker
+
+		original = dict(inference_worker._config)
+		self.addCleanup(inference_worker.configure, original)
+		self._yunet()
+		inference_worker.configure({'detector_backend': 'yunet', 'detector_options': {'model_path': 'yunet.onnx'}})
+
+		frame = np.random.RandomState(0).randint(0, 255, (480, 1280, 3), dtype=np.uint8)
+		with patch.object(inference_worker, 'get_deepface', side_effect=AssertionError('DeepFace used')):
+			detections, crops = inference_worker.detect_faces(frame, skip_boxes=[(0, 0, 20, 20)])
+
+		self.assertEqual(detections[0]['facial_area']['x'], 40)
+		self.assertEqual(detections[0]['facial_area']['right_eye'], (60, 120))
+		self.assertEqual(crops[0].dtype, np.uint8)
+		self.assertEqual(crops[0].shape, (160, 120, 3))
+
+		# Known faces are still skipped
+		_, crops = inference_worker.detect_faces(frame, skip_boxes=[(40, 80, 120, 160)])
+		self.assertEqual(crops, {})
+
+
+class MotionGateTests(TestCase):
+	def _gate(self, **options):
+		from .computer_vision.motion_gate import MotionGate
+
+		self.now = 0.0
+		return MotionGate(clock=lambda: self.now, **options)
+
+	def test_still_scene_is_skipped_until_motion_or_keepalive(self):
+		gate = self._gate(threshold=0.01, hold=1.0, keepalive=5.0)
+		scene = np.full((480, 640, 3), 80, dtype=np.uint8)
+		noisy = scene + np.random.RandomState(0).randint(0, 3, scene.shape).astype(np.uint8)
+
+		self.assertTrue(gate.check(scene))  # first frame always runs
+		self.now = 0.5
+		self.assertFalse(gate.check(noisy))  # sensor noise is not motion
+		self.assertEqual(gate.state, 'idle')
+
+		walker = scene.copy()
+		walker[100:300, 200:320] = 220
+		self.now = 1.0
+		self.assertTrue(gate.check(walker))
+		self.assertEqual(gate.state, 'motion')
+		self.now = 1.5
+		self.assertTrue(gate.check(walker))  # held after motion
+		self.assertEqual(gate.state, 'hold')
+		self.now = 3.0
+		self.assertFalse(gate.check(walker))
+		self.now = 6.6
+		self.assertTrue(gate.check(walker))  # keepalive on a still scene
+
+		status = gate.status()
+		self.assertEqual(status['frames'], 6)
+		self.assertEqual(status['skipped'], 2)
+		self.assertAlmostEqual(status['skip_ratio'], 0.333)
+		self.assertEqual(status['seconds_since_motion'], 5.6)
+
+	def test_zero_threshold_disables_gating_and_gates_are_per_camera(self):
+		from .computer_vision.motion_gate import MotionGates
+
+		gate = self._gate(threshold=0)
+		frame = np.zeros((120, 160, 3), dtype=np.uint8)
+		self.assertTrue(all(gate.check(frame) for _ in range(5)))
+		self.assertEqual(gate.status()['skipped'], 0)
+
+		gates = MotionGates(threshold=0.01, keepalive=0)
+		gates.check('box-1', frame)
+		self.assertFalse(gates.check('box-1', frame))
+		self.assertTrue(gates.check('box-2', frame))
+		self.assertEqual(sorted(gates.snapshot()), ['box-1', 'box-2'])
+		self.assertEqual(gates.snapshot()['box-1']['skipped'], 1)
+
+		gates.forget('box-1')
+		self.assertIsNone(gates.status('box-1'))
+
+
+class CameraROITests(TestCase):
+	SQUARE = [[0.25, 0.25], [0.75, 0.25], [0.75, 0.75], [0.25, 0.75]]
+
+	def test_region_crops_masks_and_maps_boxes_back(self):
+		from .computer_vision.camera_roi import RegionOfInterest, normalize_polygon, shift_detections
+
+		triangle = RegionOfInterest([[0.5, 0.0], [1.0, 1.0], [0.0, 1.0]])
+		frame = np.full((101, 201, 3), 200, dtype=np.uint8)
+		crop, origin = triangle.crop(frame)
+		self.assertEqual(origin, (0, 0))
+		self.assertEqual(crop.shape, (101, 201, 3))
+		self.assertEqual(crop[0, 0].tolist(), [0, 0, 0])  # outside the polygon
+		self.assertEqual(crop[100, 100].tolist(), [200, 200, 200])
+		self.assertTrue(triangle.contains(100, 90, frame.shape))
+		self.assertFalse(triangle.contains(5, 5, frame.shape))
+
+		crop, origin = RegionOfInterest(self.SQUARE).crop(np.zeros((481, 641, 3), dtype=np.uint8))
+		self.assertEqual(origin, (160, 120))
+		self.assertEqual(crop.shape, (241, 321, 3))
+
+		detections = [{'facial_area': {'x': 10, 'y': 20, 'w': 30, 'h': 40, 'left_eye': (15, 30), 'right_eye': None}}]
+		shift_detections(detections, origin)
+		self.assertEqual(detections[0]['facial_area'], {'x': 170, 'y': 140, 'w': 30, 'h': 40,
+			'left_eye': (175, 150), 'right_eye': None})
+
+		self.assertIsNone(normalize_polygon([]))
+		for bad in ([[0, 0], [1, 1]], [[0, 0], [1, 0], [1, 1.5]], [[0, 0], 'x', [1, 1]]):
+			with self.assertRaises(ValueError):
+				normalize_polygon(bad)
+
+	def test_roi_api_saves_to_system_config(self):
+		from .computer_vision.camera_roi import camera_rois
+		from .models import SystemConfig
+		from .views.live_feed_simple import live_feed_roi
+
+		user = get_user_model().objects.create_user(username='roi_admin', password='test-pass-123', id_number='A-1',
+		                                            privilege='admin')
+		factory = RequestFactory()
+
+		def call(method, data=None, user=user, **params):
+			if method == 'get':
+				request = factory.get('/api/live-feed/roi/', params)
+			else:
+				request = factory.post('/api/live-feed/roi/', data=json.dumps(data), content_type='application/json')
+			request.user = user
+			response = live_feed_roi(request)
+			return response.status_code, json.loads(response.content)
+
+		status, body = call('post', {'camera': 'box-1', 'polygon': self.SQUARE})
+		self.assertEqual((status, body['polygon']), (200, self.SQUARE))
+		self.assertEqual(SystemConfig.get_camera_roi('box-1'), self.SQUARE)
+		self.assertEqual(SystemConfig.objects.get(config_key='camera_roi_box-1').updated_by, user)
+		self.assertEqual(call('get', camera='box-1')[1]['polygon'], self.SQUARE)
+		self.assertIsNotNone(camera_rois.get('box-1'))
+
+		self.assertEqual(call('post', {'camera': 'box-1', 'polygon': [[0, 0]]})[0], 400)
+		self.assertEqual(call('get', camera='../etc')[0], 400)
+
+		status, body = call('post', {'camera': 'box-1', 'polygon': []})
+		self.assertIsNone(body['polygon'])
+		self.assertIsNone(SystemConfig.get_camera_roi('box-1'))
+		self.assertIsNone(camera_rois.get('box-1'))
+
+		# Any account may read a region; only admins may change it
+		faculty = get_user_model().objects.create_user(username='roi_faculty', password='test-pass-123',
+		                                               id_number='F-1', privilege='faculty',
+		                                               email='roi_faculty@example.com')
+		self.assertEqual(call('post', {'camera': 'box-1', 'polygon': self.SQUARE}, user=faculty)[0], 403)
+		self.assertIsNone(SystemConfig.get_camera_roi('box-1'))
+		self.assertEqual(call('get', camera='box-1', user=faculty)[0], 200)
+
+
+class _FakeCapture:
+	"""cv2.VideoCapture stand-in that delivers numbered frames"""
+
+	def __init__(self, frames=1000):
+		self.remaining = frames
+		self.count = 0
+		self.released = False
+
+	def read(self):
+		if self.released or self.remaining <= 0:
+			time.sleep(0.001)
+			return False, None
+		self.remaining -= 1
+		self.count += 1
+		time.sleep(0.001)
+		return True, np.full((4, 4, 3), self.count % 256, dtype=np.uint8)
+
+	def release(self):
+		self.released = True
+
+
+class FrameBusTests(TestCase):
+	def test_buffer_sequences_ring_and_shared_read_only_frames(self):
+		from .computer_vision.frame_bus import FrameBuffer
+
+		frames = FrameBuffer(capacity=3)
+		self.assertIsNone(frames.latest())
+		for value in range(5):
+			frames.publish(np.full((2, 2), value, dtype=np.uint8))
+
+		self.assertEqual(frames.seq, 5)
+		self.assertEqual([f.seq for f in frames.since(0)], [3, 4, 5])  # oldest evicted
+		self.assertEqual([f.seq for f in frames.since(4)], [5])
+
+		# Two subscribers both get the latest frame: the same array, not a copy
+		first, second = frames.newer(0), frames.newer(0)
+		self.assertIs(first.image, second.image)
+		self.assertIsNone(frames.newer(5))
+		with self.assertRaises(ValueError):
+			first.image[0, 0] = 1
+
+	def test_wait_wakes_subscribers_on_publish_and_close(self):
+		import threading
+		from .computer_vision.frame_bus import FrameBuffer
+
+		frames = FrameBuffer()
+		self.assertIsNone(frames.wait(0, timeout=0.01))
+
+		received = []
+		waiters = [threading.Thread(target=lambda: received.append(frames.wait(0, timeout=5))) for _ in range(3)]
+		for waiter in waiters:
+			waiter.start()
+		time.sleep(0.05)
+		started = time.monotonic()
+		frames.publish(np.zeros((2, 2), dtype=np.uint8))
+		for waiter in waiters:
+			waiter.join(timeout=5)
+		self.assertLess(time.monotonic() - started, 1.0)
+		self.assertEqual([frame.seq for frame in received], [1, 1, 1])
+
+		# Already handled frames do not wake anyone; close() does
+		self.assertEqual(frames.wait(0, timeout=0).seq, 1)
+		waiter = threading.Thread(target=lambda: received.append(frames.wait(1, timeout=5)))
+		waiter.start()
+		time.sleep(0.05)
+		frames.close()
+		waiter.join(timeout=5)
+		self.assertIsNone(received[-1])
+
+	def test_wait_async_wakes_coroutines_from_the_publishing_thread(self):
+		import asyncio
+		import threading
+		from .computer_vision.frame_bus import FrameBuffer
+
+		frames = FrameBuffer()
+
+		async def viewers():
+			self.assertIsNone(await frames.wait_async(0, timeout=0.01))
+			publisher = threading.Timer(0.05, frames.publish, [np.zeros((2, 2), dtype=np.uint8)])
+			publisher.start()
+			received = await asyncio.gather(*[frames.wait_async(0, timeout=5) for _ in range(200)])
+			self.assertEqual({frame.seq for frame in received}, {1})
+			self.assertFalse(frames._async_waiters)
+
+			closer = threading.Timer(0.05, frames.close)
+			closer.start()
+			self.assertIsNone(await frames.wait_async(1, timeout=5))
+			self.assertEqual((await frames.wait_async(0)).seq, 1)
+
+		started = time.monotonic()
+		asyncio.run(viewers())
+		self.assertLess(time.monotonic() - started, 2.0)
+
+	def test_registry_reads_each_device_once(self):
+		from .computer_vision.frame_bus import FrameBuses
+
+		opened = []
+
+		def open_capture(device):
+			opened.append(device)
+			return _FakeCapture()
+
+		buses = FrameBuses(capacity=2, open_capture=open_capture)
+		bus = buses.acquire(3)
+		duplicate = _FakeCapture()
+		self.assertIs(buses.acquire(3, capture=duplicate), bus)
+		self.assertTrue(duplicate.released)  # never two readers on one device
+		self.assertEqual(opened, [3])
+
+		deadline = time.monotonic() + 2
+		while bus.frames.seq < 5 and time.monotonic() < deadline:
+			time.sleep(0.01)
+		self.assertGreaterEqual(bus.frames.seq, 5)
+		self.assertEqual(buses.snapshot()['3']['subscribers'], 2)
+
+		capture = bus.capture
+		buses.release(bus)
+		self.assertIs(buses.get(3), bus)
+		buses.release(bus)
+		self.assertIsNone(buses.get(3))
+		self.assertTrue(capture.released)
+		self.assertIsNone(FrameBuses(open_capture=lambda device: None).acquire(0))
+
+	def test_slow_open_does_not_block_the_registry(self):
+		import threading
+		from .computer_vision.frame_bus import FrameBuses
+
+		opened = []
+		release_open = threading.Event()
+
+		def open_capture(device):
+			opened.append(device)
+			if device == 1:
+				release_open.wait(5)  # A DirectShow open that hangs
+			return _FakeCapture()
+
+		buses = FrameBuses(open_capture=open_capture)
+		results = []
+		openers = [threading.Thread(target=lambda: results.append(buses.acquire(1))) for _ in range(2)]
+		for opener in openers:
+			opener.start()
+		time.sleep(0.05)
+
+		started = time.monotonic()
+		other = buses.acquire(2)
+		self.assertIsNone(buses.get(1))
+		self.assertEqual(list(buses.snapshot()), ['2'])
+		self.assertLess(time.monotonic() - started, 1.0)
+
+		release_open.set()
+		for opener in openers:
+			opener.join(timeout=5)
+		self.assertIs(results[0], results[1])
+		self.assertEqual(sorted(opened), [1, 2])  # Each device opened once
+		self.assertEqual(results[0].subscribers, 2)
+		buses.stop_all()
+		self.assertIsNotNone(other)
+
+
+class MJPEGEncoderTests(TestCase):
+	def test_each_frame_is_encoded_once_for_all_viewers(self):
+		from .computer_vision.frame_bus import FrameBuffer
+		from .computer_vision.mjpeg import mjpeg_encoder
+
+		frames = FrameBuffer()
+		encoder = mjpeg_encoder(frames, 85)
+		self.assertIs(mjpeg_encoder(frames, 85), encoder)
+		self.assertIsNot(mjpeg_encoder(frames, 60), encoder)
+		self.assertIsNone(encoder.next_part(0))
+
+		viewers = [0] * 10
+		for value in range(3):
+			frames.publish(np.full((24, 32, 3), value * 50, dtype=np.uint8))
+			parts = set()
+			for index, last_seq in enumerate(viewers):
+				viewers[index], part = encoder.next_part(last_seq)
+				parts.add(part)
+			self.assertEqual(len(parts), 1)
+			part = parts.pop()
+			self.assertTrue(part.startswith(b'--frame\r\nContent-Type: image/jpeg\r\n\r\n\xff\xd8'))
+			self.assertTrue(part.endswith(b'\r\n'))
+
+		self.assertEqual(viewers, [3] * 10)
+		self.assertIsNone(encoder.next_part(3))
+		self.assertEqual(encoder.status(), {'quality': 85, 'width': None, 'seq': 3, 'encoded': 3, 'served': 30})
+
+	def test_retired_buffers_are_not_kept_alive_by_their_encoders(self):
+		import gc
+		from .computer_vision import mjpeg
+		from .computer_vision.frame_bus import FrameBuffer
+
+		before = len(mjpeg._encoders)
+		for _ in range(5):
+			frames = FrameBuffer()
+			frames.publish(np.zeros((24, 32, 3), dtype=np.uint8))
+			mjpeg.mjpeg_encoder(frames, 85).next_part(0)
+			mjpeg.mjpeg_encoder(frames, 60, 16).next_part(0)
+		del frames
+		gc.collect()
+		self.assertEqual(len(mjpeg._encoders), before)
+
+	def test_async_streams_share_encodes(self):
+		import asyncio
+		from .computer_vision.frame_bus import FrameBuffer
+		from .computer_vision.mjpeg import mjpeg_encoder, stream_async
+
+		frames = FrameBuffer()
+		source = {}
+
+		async def viewer(received):
+			stream = stream_async(lambda: source.get('camera'), 70, placeholder=lambda: b'placeholder', delay=0.01)
+			async for part in stream:
+				received.append(part)
+				if len(set(received)) == 3:  # The placeholder and both frames
+					await stream.aclose()
+					return received
+
+		async def watch():
+			tasks = [asyncio.ensure_future(viewer([])) for _ in range(20)]
+			await asyncio.sleep(0.05)
+			source['camera'] = frames
+			for value in range(2):
+				await asyncio.sleep(0.05)
+				frames.publish(np.full((24, 32, 3), value * 80, dtype=np.uint8))
+			return await asyncio.wait_for(asyncio.gather(*tasks), 5)
+
+		results = asyncio.run(watch())
+		for received in results:
+			self.assertEqual(received[0], b'placeholder')
+			self.assertTrue(received[-1].startswith(b'--frame\r\n'))
+		self.assertEqual(mjpeg_encoder(frames, 70).encoded, 2)
+
+	def test_asgi_wrapper_ends_streams_when_the_viewer_disconnects(self):
+		import asyncio
+		from .computer_vision.mjpeg import cancel_on_disconnect
+
+		async def feed(scope, receive, send):
+			await receive()
+			content_type = b'multipart/x-mixed-replace; boundary=frame' if scope['path'] == '/feed' else b'text/html'
+			await send({'type': 'http.response.start', 'status': 200, 'headers': [(b'Content-Type', content_type)]})
+			while True:
+				await send({'type': 'http.response.body', 'body': b'part', 'more_body': True})
+				await asyncio.sleep(0.01)
+
+		async def viewer(path):
+			messages = asyncio.Queue()
+			await messages.put({'type': 'http.request', 'body': b'', 'more_body': False})
+			sent = []
+
+			async def send(message):
+				sent.append(message)
+				if len(sent) == 3:
+					await messages.put({'type': 'http.disconnect'})
+
+			app = cancel_on_disconnect(feed)
+			try:
+				await asyncio.wait_for(app({'type': 'http', 'path': path}, messages.get, send), 0.5)
+			except asyncio.TimeoutError:
+				return None
+			return len(sent)
+
+		async def run():
+			return await asyncio.gather(viewer('/feed'), viewer('/page'))
+
+		feed_sent, page_sent = asyncio.run(run())
+		self.assertEqual(feed_sent, 3)
+		self.assertIsNone(page_sent)  # Only MJPEG responses are cancelled
+
+
+class StreamControlTests(TestCase):
+	def test_query_limits_select_shared_variant_encoders(self):
+		import cv2
+		from django.http import QueryDict
+		from .computer_vision.frame_bus import FrameBuffer
+		from .computer_vision.stream_control import StreamControl
+
+		control = StreamControl.from_query(QueryDict('fps=10&width=330&quality=60'))
+		self.assertEqual((control.max_fps, control.max_width, control.quality), (10.0, 330, 60))
+		self.assertTrue(control.adaptive)
+		junk = StreamControl.from_query(QueryDict('fps=fast&width=-5&quality=500&adaptive=0'))
+		self.assertEqual((junk.max_fps, junk.max_width, junk.quality), (None, 64, 95))
+		self.assertFalse(junk.adaptive)
+
+		frames = FrameBuffer()
+		frames.publish(np.zeros((480, 640, 3), dtype=np.uint8))
+		encoder = control.encoder(frames)
+		self.assertIs(StreamControl.from_query(QueryDict('width=320&quality=60')).encoder(frames), encoder)
+		self.assertEqual((encoder.quality, encoder.width), (60, 320))  # Rounded to a multiple of 16
+		seq, part = encoder.next_part(0)
+		jpeg = part[part.index(b'\r\n\r\n') + 4:-2]
+		self.assertEqual(cv2.imdecode(np.frombuffer(jpeg, np.uint8), cv2.IMREAD_COLOR).shape[:2], (240, 320))
+
+		# Asking for more than the camera delivers shares the full-size variant
+		self.assertIsNone(StreamControl(max_width=1280).encoder(frames).width)
+
+	def test_steps_down_on_slow_writes_and_back_up_when_they_recover(self):
+		from .computer_vision import stream_control
+		from .computer_vision.stream_control import StreamControl
+
+		now = [0.0]
+		control = StreamControl(max_fps=20, quality=80, clock=lambda: now[0])
+		self.assertEqual(control.delay(), 0.0)
+		control.sent(0.001)
+		self.assertAlmostEqual(control.delay(), 0.05)  # 20 fps cap
+
+		def send(seconds, parts):
+			for _ in range(parts):
+				now[0] += 0.05 + seconds
+				control.sent(seconds)
+
+		# Writes taking most of the 50 ms frame interval: quality, then width, then fps
+		send(0.045, stream_control.HOLD_PARTS)
+		self.assertEqual((control.step, control.quality), (1, 65))
+		send(0.045, stream_control.HOLD_PARTS * 10)
+		self.assertEqual((control.step, control.quality, control.fps), (5, 50, 10.0))  # Settles: 45 ms of 100 ms
+		send(0.2, stream_control.HOLD_PARTS * 2)
+		self.assertEqual(control.step, len(stream_control.STEPS) - 1)
+		self.assertEqual((control.quality, control.fps), (40, 5.0))
+
+		# Fast writes for long enough step back up, one step at a time
+		send(0.001, 10)
+		self.assertEqual(control.step, len(stream_control.STEPS) - 1)
+		send(0.001, 500)  # About 3 s per step
+		self.assertEqual(control.step, 0)
+
+		fixed = StreamControl(adaptive=False)
+		for _ in range(50):
+			fixed.sent(1.0)
+		self.assertEqual(fixed.step, 0)
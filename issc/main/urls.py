@@ -17,7 +17,8 @@ from .views import (
         ultra_fast_camera,
         live_feed_simple,
         backup_view,
-        face_recognition_views
+        face_recognition_views,
+        health_view
     ) 
 urlpatterns = [
 
@@ -65,6 +66,7 @@ urlpatterns = [
     path('api/available-cameras/', live_feed_simple.get_available_cameras_simple, name='get_available_cameras'),
     path('api/initialize-live-feed-camera/', live_feed_simple.initialize_live_feed_camera, name='initialize_live_feed_camera'),
     path('api/stop-live-feed/', live_feed_simple.stop_live_feed, name='stop_live_feed'),
+    path('api/live-feed/roi/', live_feed_simple.live_feed_roi, name='live_feed_roi'),
     path('live-feed/archive', live_feed_simple.recording_archive_simple, name="recording_archive"),
     path('live-feed/face-logs', live_feed_simple.face_logs_simple, name='face_logs'),
     path('live-feed/unauthorized-faces', views.unauthorized_faces_archive, name='unauthorized_faces_archive'),
@@ -132,6 +134,7 @@ urlpatterns = [
 
 
     path('api/face-status', video_feed_view.frame_status_view, name='face_status'),
+    path('healthz/ready', health_view.ready, name='healthz_ready'),
     path('api/getUser/', utils.getUser, name='getUserInfo'),
     
     # Backup URLs
@@ -70,13 +70,12 @@ Addresses flickering issu    def _fast_initialize(self):
 """
 
 import cv2
+import logging
 import time
 import numpy as np
 from threading import Thread, Lock
-from queue import Queue
 import os
 from datetime import datetime
-import torch
 
 from django.http import HttpResponse, StreamingHttpResponse
 from django.template import loader
@@ -84,17 +83,25 @@ from django.contrib.auth.decorators import login_required
 
 from ..models import AccountRegistration
 from django.conf import settings
+from ..computer_vision.camera_roi import camera_rois
+from ..computer_vision.cv_logging import cv_stats, log_limited
 from ..computer_vision.face_matching import FaceMatcher
+from ..computer_vision.face_detectors import align_face, create_detector
 from ..computer_vision.face_enrollment import FaceEnrollment
+from ..computer_vision.frame_bus import FrameBuffer, frame_buses
+from ..computer_vision.mjpeg import CONTENT_TYPE, encode_part, is_async_request, mjpeg_encoder, stream_async
+from ..computer_vision.inference_pool import native_detector_from_settings
+from ..computer_vision.motion_gate import motion_gates
 from ..utils.philsms import send_sms_async
 
 # Enhanced camera management
 class EnhancedCameraManager:
     def __init__(self):
         self.cameras = {}
-        self.frame_queues = {}
+        self.frame_buffers = {}  # Processed frames per camera, read by every viewer
         self.display_states = {}
         self.capture_threads = {}
+        self.placeholder_parts = {}  # Encoded NO SIGNAL frame per camera, shared by viewers
         self.running = False
         self.lock = Lock()
         
@@ -123,9 +130,9 @@ class EnhancedCameraManager:
         except Exception:
             self._sms_cooldown = 15 * 60
         
-        # Initialize Haar cascade as fallback
-        cascade_path = cv2.data.haarcascades + 'haarcascade_frontalface_default.xml'
-        self.face_cascade = cv2.CascadeClassifier(cascade_path)
+        # Fast detector for the live path: the configured native detector
+        # (FACE_DETECTOR_BACKEND='yunet' / 'ssd'), else the Haar cascade
+        self.fast_detector = native_detector_from_settings() or create_detector('haar', input_width=0)
         
     def detect_working_cameras(self):
         """Detect and test cameras with improved reliability, excluding virtual cameras"""
@@ -237,14 +244,14 @@ class EnhancedCameraManager:
         common_camera_ids = [0, 1, 2]  # Most common camera indices
         
         self.cameras = {}
-        self.frame_queues = {}
+        self.frame_buffers = {}
         self.display_states = {}
         self.capture_threads = {}
         
         # Initialize placeholders immediately
         for camera_id in common_camera_ids:
             self.cameras[camera_id] = None  # Will be initialized in background
-            self.frame_queues[camera_id] = Queue(maxsize=2)  # Smaller buffer
+            self.frame_buffers[camera_id] = FrameBuffer()
             self.display_states[camera_id] = {
                 "face_count": 0,
                 "previous_face_count": 0,
@@ -285,16 +292,16 @@ class EnhancedCameraManager:
                 for camera_id in cameras_to_remove:
                     if camera_id in self.cameras:
                         del self.cameras[camera_id]
-                    if camera_id in self.frame_queues:
-                        del self.frame_queues[camera_id]
+                    if camera_id in self.frame_buffers:
+                        del self.frame_buffers[camera_id]
                     if camera_id in self.display_states:
                         del self.display_states[camera_id]
                 
                 # Add real cameras
                 for camera_id, cap in working_cameras.items():
                     self.cameras[camera_id] = cap
-                    if camera_id not in self.frame_queues:
-                        self.frame_queues[camera_id] = Queue(maxsize=2)
+                    if camera_id not in self.frame_buffers:
+                        self.frame_buffers[camera_id] = FrameBuffer()
                     if camera_id not in self.display_states:
                         self.display_states[camera_id] = {
                             "face_count": 0,
@@ -326,12 +333,12 @@ class EnhancedCameraManager:
         # Detect working cameras
         self.cameras = self.detect_working_cameras()
         
-        # Initialize frame queues and display states
-        self.frame_queues = {}
+        # Initialize frame buffers and display states
+        self.frame_buffers = {}
         self.display_states = {}
         
         for camera_id in self.cameras:
-            self.frame_queues[camera_id] = Queue(maxsize=2)  # Smaller buffer
+            self.frame_buffers[camera_id] = FrameBuffer()
             self.display_states[camera_id] = {
                 "face_count": 0,
                 "previous_face_count": 0,
@@ -357,97 +364,68 @@ class EnhancedCameraManager:
         print(f"Enhanced camera system initialized with {len(self.cameras)} cameras")
     
     def _stable_capture_loop(self, camera_id):
-        """Enhanced capture loop with better error handling and stability"""
-        cap = self.cameras[camera_id]
+        """Processes the camera's frame bus frames and publishes them to frame_buffers"""
+        output = self.frame_buffers[camera_id]
         frame_count = 0
-        consecutive_failures = 0
-        max_failures = 15
+        last_seq = 0
         
         # Pre-generate a stable "no signal" frame to avoid repeated generation
         no_signal_frame = self._generate_stable_no_signal_frame(camera_id)
         
-        while self.running:
-            try:
-                current_time = time.time()
-                
-                if cap is None:
-                    # Dummy camera - provide stable placeholder
-                    if not self.frame_queues[camera_id].full():
-                        self.frame_queues[camera_id].put(no_signal_frame.copy())
-                    time.sleep(1/self.FPS)
-                    continue
-                
-                success, frame = cap.read()
-                
-                if not success or frame is None:
-                    consecutive_failures += 1
+        bus = None
+        if self.cameras.get(camera_id) is not None:
+            # The bus reads the device (and recovers it after read failures) for
+            # every manager and viewer using this camera
+            bus = frame_buses.acquire(camera_id, capture=self.cameras[camera_id])
+            if bus is None:
+                print(f"Failed to open camera {camera_id}, switching to dummy mode")
+            self.cameras[camera_id] = bus.capture if bus is not None else None
+        
+        try:
+            while self.running:
+                try:
+                    current_time = time.time()
                     
-                    # Use stable no-signal frame
-                    frame = no_signal_frame.copy()
+                    if bus is None:
+                        # Dummy camera - provide stable placeholder
+                        output.publish(no_signal_frame)
+                        time.sleep(1.0)  # Static content; viewers are woken by each publish
+                        continue
                     
-                    # Try to recover the camera if too many failures
-                    if consecutive_failures > max_failures:
-                        print(f"Attempting to recover camera {camera_id}")
-                        cap.release()
-                        time.sleep(1)
-                        
-                        # Try to reinitialize
-                        new_cap = cv2.VideoCapture(camera_id, cv2.CAP_DSHOW)
-                        if new_cap.isOpened():
-                            new_cap.set(cv2.CAP_PROP_FRAME_WIDTH, self.FRAME_WIDTH)
-                            new_cap.set(cv2.CAP_PROP_FRAME_HEIGHT, self.FRAME_HEIGHT)
-                            new_cap.set(cv2.CAP_PROP_FPS, self.FPS)
-                            new_cap.set(cv2.CAP_PROP_BUFFERSIZE, 1)
-                            
-                            self.cameras[camera_id] = new_cap
-                            cap = new_cap
-                            consecutive_failures = 0
-                            print(f"Camera {camera_id} recovered successfully")
-                        else:
-                            print(f"Failed to recover camera {camera_id}, switching to dummy mode")
-                            self.cameras[camera_id] = None
-                            cap = None
-                else:
-                    consecutive_failures = 0
+                    # Wake as soon as the camera delivers a new frame
+                    latest = bus.frames.wait(last_seq, timeout=1.0)
+                    if latest is None:
+                        # Use stable no-signal frame while the camera delivers nothing
+                        output.publish(no_signal_frame)
+                        continue
+                    
+                    last_seq = latest.seq
                     self.display_states[camera_id]["last_successful_frame"] = current_time
                     
-                    # Process frame for face detection (every Nth frame)
+                    # Process frame for face detection (every Nth frame); both paths
+                    # draw on a copy, the bus frame is shared and read-only
                     frame_count += 1
                     if frame_count % self.FRAME_SKIP == 0:
-                        frame = self._process_frame_with_face_detection(frame, camera_id)
+                        frame = self._process_frame_with_face_detection(latest.image, camera_id)
                     else:
                         # For non-processed frames, just add overlay
-                        frame = self._add_stable_overlay(frame, camera_id)
-                
-                # Manage frame queue size to prevent buildup
-                if self.frame_queues[camera_id].full():
-                    try:
-                        self.frame_queues[camera_id].get_nowait()  # Remove oldest frame
-                    except:
-                        pass
-                
-                self.frame_queues[camera_id].put(frame)
-                
-                # Proper timing to maintain FPS
-                time.sleep(max(1/self.FPS - 0.005, 0.01))
-                
-            except Exception as e:
-                consecutive_failures += 1
-                current_time = time.time()
-
-                # Rate-limited error logging
-                if current_time - self.last_error_time > self.error_cooldown:
-                    print(f"Camera {camera_id} error: {e}")
-                    self.last_error_time = current_time
-
-                # Use stable no-signal frame on error
-                try:
-                    if not self.frame_queues[camera_id].full():
-                        self.frame_queues[camera_id].put(no_signal_frame.copy())
-                except Exception:
-                    pass
-
-                time.sleep(0.1)  # Brief pause on error
+                        frame = self._add_stable_overlay(latest.image, camera_id)
+                    
+                    output.publish(frame)
+                    
+                except Exception as e:
+                    current_time = time.time()
+                    
+                    # Rate-limited error logging
+                    if current_time - self.last_error_time > self.error_cooldown:
+                        print(f"Camera {camera_id} error: {e}")
+                        self.last_error_time = current_time
+                    
+                    # Use stable no-signal frame on error
+                    output.publish(no_signal_frame)
+                    time.sleep(0.1)  # Brief pause on error
+        finally:
+            frame_buses.release(bus)
     
     def _generate_stable_no_signal_frame(self, camera_id):
         """Generate a stable, non-flickering 'No Signal' frame"""
@@ -523,23 +501,41 @@ class EnhancedCameraManager:
         """Process frame with enhanced face detection and recognition"""
         try:
             display_frame = frame.copy()
+            camera_key = f'enhanced-{camera_id}'
+            
+            # 🎯 Detect only inside the camera's region of interest, if it has one
+            region, (origin_x, origin_y) = frame, (0, 0)
+            roi = camera_rois.get(camera_key)
+            if roi is not None:
+                region, (origin_x, origin_y) = roi.crop(frame)
+            
+            # ⚡ SKIP detection on a still scene; keep showing the last results
+            if not motion_gates.check(camera_key, region):
+                display_frame = self._add_stable_overlay(display_frame, camera_id)
+                return self._draw_stable_face_boxes(display_frame, camera_id)
             
-            # Resize for faster processing
-            small_frame = cv2.resize(frame, (320, 240))
+            # Resize for faster processing (a region keeps its aspect ratio and is
+            # not shrunk further than needed: higher effective resolution)
+            if roi is None:
+                small_frame = cv2.resize(frame, (320, 240))
+            else:
+                scale = min(1.0, 320 / region.shape[1], 240 / region.shape[0])
+                small_frame = cv2.resize(region, (max(1, int(region.shape[1] * scale)), max(1, int(region.shape[0] * scale))))
             small_frame = np.ascontiguousarray(small_frame)
             
             face_crops = []
             face_locations = []
             
-            # ⚡ LIGHTNING FAST - Use ONLY Haar Cascade (no MTCNN fallback)
+            # ⚡ LIGHTNING FAST - fast detector only (no MTCNN fallback)
             try:
-                gray = cv2.cvtColor(small_frame, cv2.COLOR_BGR2GRAY)
-                opencv_faces = self.face_cascade.detectMultiScale(gray, 1.3, 5, minSize=(30, 30))
-                
-                for (x, y, w, h) in opencv_faces:
+                for detection in self.fast_detector.detect(small_frame):
+                    x, y, w, h = detection.box
                     # ⚡ SKIP if face too small (speeds up processing)
                     if w >= 30 and h >= 30:
-                        face_crops.append(small_frame[y:y+h, x:x+w])
+                        face = align_face(small_frame, detection)
+                        if face is None:
+                            continue
+                        face_crops.append(face)
                         face_locations.append(np.array([y, y+h, x, x+w]))
                     
             except Exception:
@@ -557,7 +553,10 @@ class EnhancedCameraManager:
             # Process face recognition if faces detected
             if face_crops and face_locations:
                 scaled_locations, match_results = self._process_face_recognition(
-                    frame, face_crops, face_locations, small_frame.shape, frame.shape, camera_id)
+                    region, face_crops, face_locations, small_frame.shape, region.shape, camera_id)
+                # Region -> full frame coordinates
+                scaled_locations = [(x1 + origin_x, y1 + origin_y, x2 + origin_x, y2 + origin_y)
+                                    for x1, y1, x2, y2 in scaled_locations]
                 
                 # Update display state
                 self.display_states[camera_id]['face_locations'] = scaled_locations
@@ -571,10 +570,8 @@ class EnhancedCameraManager:
             return display_frame
             
         except Exception as e:
-            current_time = time.time()
-            if current_time - self.last_error_time > self.error_cooldown:
-                print(f"Face processing error for camera {camera_id}: {e}")
-                self.last_error_time = current_time
+            log_limited(logging.WARNING, ('face_processing', camera_id),
+                        "camera %s: face processing error: %s", camera_id, e)
             return self._add_stable_overlay(frame, camera_id)
     
     def _process_face_recognition(self, frame, face_crops, face_locations, small_shape, full_shape, camera_id):
@@ -614,8 +611,6 @@ class EnhancedCameraManager:
                             # ⚡ LIGHTNING FAST MATCHING - Relaxed threshold for speed
                             match_id, confidence = self.matcher.match(embedding, threshold=0.65)
                             
-                            print(f"🔍 Face matching - ID: {match_id}, Confidence: {confidence:.2f}")
-                            
                             # ✅ Check if this is a VALID match from enrolled users
                             is_authorized = False
                             if match_id and confidence >= 0.65:  # 0.65 = good enough (relaxed for speed)
@@ -625,11 +620,12 @@ class EnhancedCameraManager:
                                         is_enrolled = match_id in self.matcher.embeddings
                                         if is_enrolled:
                                             is_authorized = True
-                                            print(f"✅ AUTHORIZED - ID: {match_id} (Confidence: {confidence:.2f})")
                                         else:
-                                            print(f"❌ ID {match_id} not in enrolled database")
+                                            log_limited(logging.WARNING, ('not_enrolled', camera_id),
+                                                        "camera %s: matched ID %s is not enrolled", camera_id, match_id)
                                 except Exception as e:
-                                    print(f"⚠️ Error checking enrollment: {e}")
+                                    log_limited(logging.WARNING, ('enrollment_check', camera_id),
+                                                "camera %s: error checking enrollment: %s", camera_id, e)
                                     is_authorized = False
                             
                             if is_authorized and match_id:
@@ -637,7 +633,6 @@ class EnhancedCameraManager:
                                 try:
                                     from .utils import log
                                     user_info = log(match_id)
-                                    print(f"🟢 GREEN BOX - {user_info.first_name if user_info else match_id}")
                                     match_results.append({
                                         'match_id': match_id,
                                         'confidence': confidence,
@@ -646,7 +641,8 @@ class EnhancedCameraManager:
                                         'match_type': 'AUTHORIZED'
                                     })
                                 except Exception as e:
-                                    print(f"⚠️ Error getting user info: {e}")
+                                    log_limited(logging.WARNING, ('user_info', camera_id),
+                                                "camera %s: error getting user info: %s", camera_id, e)
                                     match_results.append({
                                         'match_id': match_id,
                                         'confidence': confidence,
@@ -656,11 +652,11 @@ class EnhancedCameraManager:
                                     })
                             else:
                                 # 🔴 RED BOX - Unauthorized/Unknown face
-                                print(f"🔴 RED BOX - UNAUTHORIZED (Confidence: {confidence:.2f if confidence else 0.0})")
                                 try:
                                     self._notify_unauthorized(camera_id)
                                 except Exception as _e:
-                                    print(f"Error notifying unauthorized: {_e}")
+                                    log_limited(logging.WARNING, ('notify_unauthorized', camera_id),
+                                            "camera %s: error notifying unauthorized: %s", camera_id, _e)
                                 match_results.append({
                                     'match_id': None,
                                     'confidence': confidence if confidence else 0.0,
@@ -669,11 +665,11 @@ class EnhancedCameraManager:
                                     'match_type': 'UNAUTHORIZED'
                                 })
                         else:
-                            print("DEBUG: No embedding extracted - UNAUTHORIZED")
                             try:
                                 self._notify_unauthorized(camera_id)
                             except Exception as _e:
-                                print(f"Error notifying unauthorized: {_e}")
+                                log_limited(logging.WARNING, ('notify_unauthorized', camera_id),
+                                            "camera %s: error notifying unauthorized: %s", camera_id, _e)
                             match_results.append({
                                 'match_id': None,
                                 'confidence': 0.0,
@@ -683,11 +679,13 @@ class EnhancedCameraManager:
                             })
                             
                     except Exception as e:
-                        print(f"DEBUG: Exception in face matching: {e} - UNAUTHORIZED")
+                        log_limited(logging.WARNING, ('face_matching', camera_id),
+                                    "camera %s: face matching failed: %s", camera_id, e)
                         try:
                             self._notify_unauthorized(camera_id)
                         except Exception as _e:
-                            print(f"Error notifying unauthorized: {_e}")
+                            log_limited(logging.WARNING, ('notify_unauthorized', camera_id),
+                                        "camera %s: error notifying unauthorized: %s", camera_id, _e)
                         match_results.append({
                             'match_id': None,
                             'confidence': 0.0,
@@ -696,11 +694,11 @@ class EnhancedCameraManager:
                             'match_type': 'UNAUTHORIZED'
                         })
                 else:
-                    print("DEBUG: Face too small - UNAUTHORIZED")
                     try:
                         self._notify_unauthorized(camera_id)
                     except Exception as _e:
-                        print(f"Error notifying unauthorized: {_e}")
+                        log_limited(logging.WARNING, ('notify_unauthorized', camera_id),
+                                    "camera %s: error notifying unauthorized: %s", camera_id, _e)
                     match_results.append({
                         'match_id': None,
                         'confidence': 0.0,
@@ -711,6 +709,11 @@ class EnhancedCameraManager:
                     
             except Exception:
                 continue
+        
+        # One counter update per frame; cv_stats logs per-camera rates on an interval
+        matched = sum(1 for result in match_results if result['is_authorized'])
+        cv_stats.record(camera_id, faces=len(match_results), matches=matched,
+                        unknown=len(match_results) - matched)
                 
         return scaled_locations, match_results
     
@@ -850,49 +853,47 @@ class EnhancedCameraManager:
             
         return smoothed_locations
     
+    def _placeholder_part(self, camera_id):
+        """Encoded stable 'No Signal' frame (encoded once per camera)"""
+        part = self.placeholder_parts.get(camera_id)
+        if part is None:
+            part = self.placeholder_parts[camera_id] = encode_part(self._generate_stable_no_signal_frame(camera_id), 85)
+        return part
+    
     def get_frame_generator(self, camera_id):
         """Generate frames for HTTP streaming with stability and fast loading support"""
         initialization_timeout = 30  # Wait up to 30 seconds for camera initialization
         start_time = time.time()
+        last_seq = 0
         
         while self.running:
             try:
-                # Check if camera frame queue exists and has frames
-                if camera_id in self.frame_queues and not self.frame_queues[camera_id].empty():
-                    frame = self.frame_queues[camera_id].get(timeout=1.0)
-                    
-                    # Encode with good quality
-                    _, buffer = cv2.imencode('.jpg', frame, [cv2.IMWRITE_JPEG_QUALITY, 85])
-                    
-                    yield (b'--frame\r\n'
-                          b'Content-Type: image/jpeg\r\n\r\n' + buffer.tobytes() + b'\r\n')
+                # Newest frame this viewer has not sent yet; viewers never take
+                # frames away from each other and share each frame's encode
+                frames = self.frame_buffers.get(camera_id)
+                if frames is not None and frames.seq:
+                    # Camera is streaming; block until its next frame, encoded with
+                    # good quality (the timeout re-checks `running`)
+                    encoded = mjpeg_encoder(frames, 85).wait_part(last_seq, timeout=1.0)
+                    if encoded is not None:
+                        last_seq, part = encoded
+                        yield part
                     
-                elif camera_id in self.frame_queues:
-                    # Frame queue exists but is empty - camera is initializing
+                elif frames is not None:
+                    # Frame buffer exists but is empty - camera is initializing
                     if time.time() - start_time < initialization_timeout:
-                        # Generate a loading frame
-                        loading_frame = self._generate_stable_no_signal_frame(camera_id)
-                        _, buffer = cv2.imencode('.jpg', loading_frame, [cv2.IMWRITE_JPEG_QUALITY, 85])
-                        
-                        yield (b'--frame\r\n'
-                              b'Content-Type: image/jpeg\r\n\r\n' + buffer.tobytes() + b'\r\n')
+                        # Show the loading frame
+                        yield self._placeholder_part(camera_id)
                         
                         time.sleep(0.1)  # Slower rate while initializing
                     else:
                         # Timeout - camera failed to initialize
                         error_frame = self._generate_error_frame(camera_id, "Initialization timeout")
-                        _, buffer = cv2.imencode('.jpg', error_frame, [cv2.IMWRITE_JPEG_QUALITY, 85])
-                        
-                        yield (b'--frame\r\n'
-                              b'Content-Type: image/jpeg\r\n\r\n' + buffer.tobytes() + b'\r\n')
+                        yield encode_part(error_frame, 85)
                         time.sleep(1.0)
                 else:
-                    # No frame queue - camera not initialized
-                    init_frame = self._generate_stable_no_signal_frame(camera_id)
-                    _, buffer = cv2.imencode('.jpg', init_frame, [cv2.IMWRITE_JPEG_QUALITY, 85])
-                    
-                    yield (b'--frame\r\n'
-                          b'Content-Type: image/jpeg\r\n\r\n' + buffer.tobytes() + b'\r\n')
+                    # No frame buffer - camera not initialized
+                    yield self._placeholder_part(camera_id)
                     time.sleep(0.2)
                     
             except Exception as e:
@@ -901,38 +902,51 @@ class EnhancedCameraManager:
                 # Generate error frame
                 try:
                     error_frame = self._generate_error_frame(camera_id, str(e))
-                    _, buffer = cv2.imencode('.jpg', error_frame, [cv2.IMWRITE_JPEG_QUALITY, 85])
-                    
-                    yield (b'--frame\r\n'
-                          b'Content-Type: image/jpeg\r\n\r\n' + buffer.tobytes() + b'\r\n')
+                    yield encode_part(error_frame, 85)
                 except:
                     pass
                     
                 time.sleep(0.5)
     
+    def get_async_frame_generator(self, camera_id):
+        """get_frame_generator() for ASGI: viewers are coroutines instead of server threads"""
+        initialization_timeout = 30  # Same grace period as the sync stream
+        start_time = time.time()
+        timeout_part = None
+        
+        def streaming_buffer():
+            frames = self.frame_buffers.get(camera_id)
+            return frames if frames is not None and frames.seq else None
+        
+        def placeholder():
+            nonlocal timeout_part
+            if camera_id in self.frame_buffers and time.time() - start_time >= initialization_timeout:
+                # Camera failed to initialize
+                if timeout_part is None:
+                    timeout_part = encode_part(self._generate_error_frame(camera_id, "Initialization timeout"), 85)
+                return timeout_part
+            return self._placeholder_part(camera_id)
+        
+        return stream_async(streaming_buffer, 85, placeholder=placeholder, running=lambda: self.running)
+    
     def cleanup(self):
         """Clean up camera resources"""
         print("Cleaning up enhanced camera system...")
         
         self.running = False
         
-        # Wait for threads to finish
+        # Wait for threads to finish; each releases its frame bus subscription,
+        # and the bus releases the camera once no other manager is using it
         for thread in self.capture_threads.values():
             if thread.is_alive():
                 thread.join(timeout=2)
         
-        # Release cameras
-        for camera_id, cap in self.cameras.items():
-            if cap is not None:
-                try:
-                    cap.release()
-                    print(f"Released camera {camera_id}")
-                except Exception as e:
-                    print(f"Error releasing camera {camera_id}: {e}")
+        for camera_id in self.cameras:
+            motion_gates.forget(f'enhanced-{camera_id}')
         
         # Clear resources
         self.cameras.clear()
-        self.frame_queues.clear()
+        self.frame_buffers.clear()
         self.display_states.clear()
         self.capture_threads.clear()
         
@@ -1031,14 +1045,20 @@ def enhanced_video_feed(request, camera_id):
             print(f"Camera {camera_id} not found in manager, available cameras: {list(enhanced_camera_manager.cameras.keys())}")
             return HttpResponse(f"Camera {camera_id} not available", status=404)
         
-        # Check if camera has a frame queue
-        if camera_id not in enhanced_camera_manager.frame_queues:
-            print(f"Camera {camera_id} frame queue not ready")
+        # Check if camera has a frame buffer
+        if camera_id not in enhanced_camera_manager.frame_buffers:
+            print(f"Camera {camera_id} frame buffer not ready")
             return HttpResponse(f"Camera {camera_id} not ready", status=503)
         
+        if is_async_request(request):
+            return StreamingHttpResponse(
+                enhanced_camera_manager.get_async_frame_generator(camera_id),
+                content_type=CONTENT_TYPE
+            )
+        
         return StreamingHttpResponse(
             enhanced_camera_manager.get_frame_generator(camera_id),
-            content_type='multipart/x-mixed-replace; boundary=frame'
+            content_type=CONTENT_TYPE
         )
         
     except Exception as e:
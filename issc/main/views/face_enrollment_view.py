@@ -254,30 +254,9 @@ def face_enrollment_view(request, id_number):
 
                 print("Embeddings saved successfully.")
                 
-                # IMPORTANT: Refresh face embeddings in the live feed system
-                try:
-                    from .video_feed_view import matcher
-                    from .enhanced_video_feed import enhanced_camera_manager
-                    
-                    # Reload embeddings in the original matcher
-                    matcher.load_embeddings()
-                    print("Original face matcher embeddings refreshed")
-                    
-                    # Reload embeddings in the enhanced camera manager
-                    enhanced_camera_manager.reload_face_embeddings()
-                    print("Enhanced camera manager embeddings refreshed")
-                    
-                    # Ensure simple live feed cache picks up the new embeddings immediately
-                    try:
-                        from . import live_feed_simple
-                        live_feed_simple.load_face_embeddings()
-                        print("Simple live feed embeddings refreshed")
-                    except Exception as refresh_err:
-                        print(f"Warning: Could not refresh simple live feed embeddings: {refresh_err}")
-                    
-                except Exception as e:
-                    print(f"Warning: Could not refresh live feed embeddings: {e}")
-
+                # Live feed caches pick up this user through the FacesEmbeddings
+                # post_save signal (main/signals.py) - no full reload needed
+                
                 return render(request, 'face_enrollment/success_page.html', {
                     "front_faces": front_image,
                     "left_faces": left_image,
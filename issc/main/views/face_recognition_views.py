@@ -7,6 +7,7 @@ from django.views.decorators.http import require_http_methods
 from django.views.decorators.csrf import csrf_exempt
 from django.utils import timezone
 import json
+from main.computer_vision.face_gallery import EMBEDDING_DIM
 from main.computer_vision.face_recognition_engine import face_engine
 from main.models import FaceLogs, AccountRegistration, UnauthorizedFaceDetection, SystemConfig
 from main.utils.philsms import send_sms_async
@@ -18,6 +19,35 @@ from datetime import datetime
 from django.conf import settings
 
 
+def decode_face_embeddings(request):
+    """
+    Decode the probe embeddings sent to the recognition API
+    
+    Accepted payloads:
+        - application/octet-stream body of packed little-endian float32 values
+        - JSON {"face_embeddings_b64": "<base64 of packed float32>"}
+        - JSON {"face_embeddings": [[...128 floats...], ...]}
+    
+    Returns:
+        numpy.ndarray of shape (N, 128) for binary payloads, or the raw list
+        of float lists for the legacy JSON format
+    """
+    if request.content_type == 'application/octet-stream':
+        packed = request.body
+    else:
+        data = json.loads(request.body)
+        encoded = data.get('face_embeddings_b64')
+        if not encoded:
+            return data.get('face_embeddings', [])
+        packed = base64.b64decode(encoded)
+    
+    row_bytes = EMBEDDING_DIM * 4
+    if len(packed) % row_bytes != 0:
+        raise ValueError(f"Binary payload must be a multiple of {row_bytes} bytes ({EMBEDDING_DIM} float32 values per face)")
+    
+    return np.frombuffer(packed, dtype='<f4').reshape(-1, EMBEDDING_DIM)
+
+
 @csrf_exempt
 @require_http_methods(["POST"])
 def recognize_faces_api(request):
@@ -26,13 +56,15 @@ def recognize_faces_api(request):
     Receives face embeddings and returns recognition results
     """
     try:
-        data = json.loads(request.body)
-        face_embeddings = data.get('face_embeddings', [])
+        try:
+            face_embeddings = decode_face_embeddings(request)
+        except ValueError as e:
+            return JsonResponse({'error': str(e)}, status=400)
         
-        if not face_embeddings:
+        if len(face_embeddings) == 0:
             return JsonResponse({'error': 'No face embeddings provided'}, status=400)
         
-        # Recognize all faces
+        # Recognize all faces in one batch (single matrix product against the gallery)
         results = face_engine.recognize_multiple_faces(face_embeddings)
         
         return JsonResponse({
@@ -0,0 +1,19 @@
+from django.http import JsonResponse
+from django.views.decorators.http import require_GET
+
+from ..computer_vision.model_warmup import READY, LAZY, readiness
+
+
+@require_GET
+def ready(request):
+    """
+    Readiness probe: 200 once the recognition models are warm (or warm-up is
+    disabled), 503 while they are still loading or failed to load
+    """
+    status = readiness()
+    return JsonResponse({
+        'status': status['state'],
+        'error': status['error'],
+        'elapsed': status.get('elapsed'),
+        'timings': status['timings'],
+    }, status=200 if status['state'] in (READY, LAZY) else 503)
@@ -6,19 +6,22 @@ import cv2
 import numpy as np
 import time
 import threading
-from queue import Queue
 from django.http import StreamingHttpResponse, HttpResponse
 from django.contrib.auth.decorators import login_required
 from django.template import loader
 from threading import Thread, Lock
 import json
 
+from ..computer_vision.frame_bus import FrameBuffer, frame_buses
+from ..computer_vision.mjpeg import CONTENT_TYPE, is_async_request, mjpeg_encoder, stream_async
+
 class LightningCameraManager:
     """Ultra-fast camera manager optimized for speed"""
     
     def __init__(self):
         self.cameras = {}
-        self.frame_queues = {}
+        self.devices = {}  # {camera_id: physical camera index}
+        self.frame_buffers = {}  # Processed frames per camera, read by every viewer
         self.running = False
         self.lock = Lock()
         
@@ -152,6 +155,7 @@ class LightningCameraManager:
         
         # Step 2: Smart camera assignment
         assigned_cameras = {}
+        self.devices = {}
         available_cameras = list(all_detected_cameras.keys())
         
         print(f"\n🎯 INTELLIGENT CAMERA ASSIGNMENT:")
@@ -182,6 +186,7 @@ class LightningCameraManager:
         # Check if Camera 0 (Acer built-in) works
         if 0 in all_detected_cameras:
             assigned_cameras[0] = all_detected_cameras[0]
+            self.devices[0] = 0
             print(f"   🎯 Camera 0: Acer built-in camera (index 0) - WORKING")
         else:
             assigned_cameras[0] = None
@@ -190,6 +195,7 @@ class LightningCameraManager:
         # Check if Camera 1 (External webcam) works
         if 1 in all_detected_cameras:
             assigned_cameras[1] = all_detected_cameras[1]
+            self.devices[1] = 1
             print(f"   🎯 Camera 1: External webcam (index 1) - WORKING")
         else:
             assigned_cameras[1] = None
@@ -204,6 +210,7 @@ class LightningCameraManager:
         # Assign Camera 2
         if len(other_cameras) >= 1:
             assigned_cameras[2] = all_detected_cameras[other_cameras[0]]
+            self.devices[2] = other_cameras[0]
             print(f"   🎯 Camera 2: Additional camera (index {other_cameras[0]}) - WORKING")
         else:
             assigned_cameras[2] = None
@@ -212,6 +219,7 @@ class LightningCameraManager:
         # Assign Camera 3
         if len(other_cameras) >= 2:
             assigned_cameras[3] = all_detected_cameras[other_cameras[1]]
+            self.devices[3] = other_cameras[1]
             print(f"   🎯 Camera 3: Additional camera (index {other_cameras[1]}) - WORKING")
         else:
             assigned_cameras[3] = None
@@ -257,11 +265,11 @@ class LightningCameraManager:
                 self.cameras = self.detect_cameras_fast()
                 print(f"📷 Camera detection complete: {list(self.cameras.keys())}")
                 
-                # Step 2: Initialize frame queues instantly
-                print("🗂️ Initializing frame queues...")
-                self.frame_queues = {}
+                # Step 2: Initialize frame buffers instantly
+                print("🗂️ Initializing frame buffers...")
+                self.frame_buffers = {}
                 for camera_id in self.cameras:
-                    self.frame_queues[camera_id] = Queue(maxsize=2)
+                    self.frame_buffers[camera_id] = FrameBuffer()
                 
                 # Step 3: Start capture threads immediately
                 print("🧵 Starting capture threads...")
@@ -287,42 +295,42 @@ class LightningCameraManager:
             raise e
     
     def _lightning_capture_loop(self, camera_id):
-        """Ultra-fast capture loop with optimized face detection"""
-        cap = self.cameras[camera_id]
+        """Ultra-fast processing of the camera's frame bus frames with optimized face detection"""
+        output = self.frame_buffers[camera_id]
+        bus = frame_buses.acquire(self.devices.get(camera_id, camera_id), capture=self.cameras[camera_id])
+        if bus is None:
+            self._no_input_loop(camera_id)
+            return
+        self.cameras[camera_id] = bus.capture
         frame_count = 0
+        last_seq = 0
         
-        while self.running:
-            try:
-                ret, frame = cap.read()
-                
-                if ret and frame is not None:
-                    # Process face detection every nth frame for speed
-                    if frame_count % self.DETECTION_INTERVAL == 0:
-                        frame = self._fast_face_detection(frame, camera_id)
+        try:
+            while self.running:
+                try:
+                    # Wake as soon as the camera delivers a new frame
+                    latest = bus.frames.wait(last_seq, timeout=1.0)
                     
-                    # Queue management for speed
-                    if self.frame_queues[camera_id].full():
-                        try:
-                            self.frame_queues[camera_id].get_nowait()
-                        except:
-                            pass
+                    if latest is not None:
+                        last_seq = latest.seq
+                        frame = latest.image
+                        # Process face detection every nth frame for speed (on a copy,
+                        # the bus frame is shared and read-only)
+                        if frame_count % self.DETECTION_INTERVAL == 0:
+                            frame = self._fast_face_detection(frame.copy(), camera_id)
+                        
+                        output.publish(frame)
+                        frame_count += 1
+                    else:
+                        # Camera disconnected - show NO INPUT
+                        output.publish(self._generate_no_input_frame(camera_id))
                     
-                    self.frame_queues[camera_id].put(frame)
-                    frame_count += 1
-                else:
-                    # Camera disconnected - show NO INPUT
-                    no_input_frame = self._generate_no_input_frame(camera_id)
-                    if not self.frame_queues[camera_id].full():
-                        self.frame_queues[camera_id].put(no_input_frame)
-                
-                time.sleep(1/self.FPS)
-                
-            except Exception as e:
-                print(f"Capture error camera {camera_id}: {e}")
-                no_input_frame = self._generate_no_input_frame(camera_id)
-                if not self.frame_queues[camera_id].full():
-                    self.frame_queues[camera_id].put(no_input_frame)
-                time.sleep(0.1)
+                except Exception as e:
+                    print(f"Capture error camera {camera_id}: {e}")
+                    output.publish(self._generate_no_input_frame(camera_id))
+                    time.sleep(0.1)
+        finally:
+            frame_buses.release(bus)
     
     def _no_input_loop(self, camera_id):
         """Loop for cameras showing NO INPUT"""
@@ -330,8 +338,7 @@ class LightningCameraManager:
         
         while self.running:
             try:
-                if not self.frame_queues[camera_id].full():
-                    self.frame_queues[camera_id].put(no_input_frame.copy())
+                self.frame_buffers[camera_id].publish(no_input_frame)
                 time.sleep(1.0)  # Slower refresh for static content
             except:
                 time.sleep(0.1)
@@ -409,37 +416,38 @@ class LightningCameraManager:
         return frame
     
     def get_frame_generator(self, camera_id):
-        """Lightning-fast frame generator"""
+        """Lightning-fast frame generator (viewers share the frame buffer and each frame's JPEG encode)"""
+        last_seq = 0
         while self.running:
             try:
-                if camera_id in self.frame_queues and not self.frame_queues[camera_id].empty():
-                    frame = self.frame_queues[camera_id].get(timeout=0.1)
-                    
-                    # Fast JPEG encoding
-                    _, buffer = cv2.imencode('.jpg', frame, [cv2.IMWRITE_JPEG_QUALITY, 80])
-                    
-                    yield (b'--frame\r\n'
-                          b'Content-Type: image/jpeg\r\n\r\n' + buffer.tobytes() + b'\r\n')
-                else:
-                    time.sleep(0.01)
+                frames = self.frame_buffers.get(camera_id)
+                if frames is None:
+                    time.sleep(0.1)
+                    continue
+                # Fast JPEG encoding, once per frame for every viewer; blocks until
+                # the next frame (the timeout re-checks `running`)
+                encoded = mjpeg_encoder(frames, 80).wait_part(last_seq, timeout=1.0)
+                if encoded is not None:
+                    last_seq, part = encoded
+                    yield part
             except Exception as e:
                 print(f"Frame generator error for camera {camera_id}: {e}")
                 time.sleep(0.1)
     
+    def get_async_frame_generator(self, camera_id):
+        """get_frame_generator() for ASGI: viewers are coroutines instead of server threads"""
+        return stream_async(lambda: self.frame_buffers.get(camera_id), 80, running=lambda: self.running)
+    
     def cleanup(self):
         """Fast cleanup"""
         print("🔥 Lightning cleanup starting...")
+        # Capture loops release their frame bus subscriptions when they stop;
+        # the bus releases the camera once no other manager is using it
         self.running = False
         
-        for camera_id, cap in self.cameras.items():
-            if cap is not None:
-                try:
-                    cap.release()
-                except:
-                    pass
-        
         self.cameras.clear()
-        self.frame_queues.clear()
+        self.devices.clear()
+        self.frame_buffers.clear()
         print("🔥 Lightning cleanup complete")
 
 # Global lightning camera manager
@@ -492,9 +500,15 @@ def lightning_video_feed(request, camera_id):
         if camera_id not in lightning_camera_manager.cameras:
             return HttpResponse("Camera not found", status=404)
         
+        if is_async_request(request):
+            return StreamingHttpResponse(
+                lightning_camera_manager.get_async_frame_generator(camera_id),
+                content_type=CONTENT_TYPE
+            )
+        
         return StreamingHttpResponse(
             lightning_camera_manager.get_frame_generator(camera_id),
-            content_type='multipart/x-mixed-replace; boundary=frame'
+            content_type=CONTENT_TYPE
         )
         
     except Exception as e:
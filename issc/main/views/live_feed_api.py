@@ -2,6 +2,9 @@ from django.http import JsonResponse
 from django.views.decorators.csrf import csrf_exempt
 from django.contrib.auth.decorators import login_required
 from ..computer_vision.face_matching import FaceMatcher
+from ..computer_vision.frame_bus import frame_buses
+from ..computer_vision.mjpeg import mjpeg_encoders
+from ..computer_vision.motion_gate import motion_gates
 from ..models import AccountRegistration
 import json
 import logging
@@ -65,6 +68,7 @@ def get_camera_status_api(request):
     """API endpoint to get current camera status and face detection info"""
     try:
         from .video_feed_view import cameras, display_states
+        from .live_feed_simple import live_feed_frames
         
         camera_status = {}
         
@@ -75,7 +79,8 @@ def get_camera_status_api(request):
                 'is_active': cameras[camera_id] is not None,
                 'face_count': 0,
                 'detected_faces': [],
-                'status': 'unknown'
+                'status': 'unknown',
+                'motion_gate': motion_gates.status(camera_id)
             }
             
             if camera_id in display_states:
@@ -122,6 +127,15 @@ def get_camera_status_api(request):
         return JsonResponse({
             'success': True,
             'cameras': camera_status,
+            # Every gated camera, including live feed boxes ('box-<id>') and enhanced feeds
+            'motion_gates': motion_gates.snapshot(),
+            # One reader per physical camera, however many feeds use it
+            'frame_buses': frame_buses.snapshot(),
+            # Encoded variants (quality, width) of each live feed box and how many parts each served
+            'stream_variants': {
+                box_id: [encoder.status() for encoder in mjpeg_encoders(frames)]
+                for box_id, frames in list(live_feed_frames.items())
+            },
             'timestamp': int(time.time() * 1000)
         })
         
@@ -187,9 +201,9 @@ def verify_face_embeddings_api(request):
                 'first_name': embedding_record.id_number.first_name,
                 'last_name': embedding_record.id_number.last_name,
                 'created_at': embedding_record.created_at.isoformat(),
-                'has_front': bool(embedding_record.front_embedding),
-                'has_left': bool(embedding_record.left_embedding),
-                'has_right': bool(embedding_record.right_embedding),
+                'has_front': embedding_record.front_embedding is not None,
+                'has_left': embedding_record.left_embedding is not None,
+                'has_right': embedding_record.right_embedding is not None,
                 'loaded_in_memory': embedding_record.id_number.id_number in matcher.embeddings if matcher.embeddings else False
             }
             embedding_details.append(user_info)
@@ -11,47 +11,44 @@ from django.http import HttpResponse, JsonResponse
 from django.template import loader
 from ..models import (
     AccountRegistration,
-    FacesEmbeddings,
     UnauthorizedFaceDetection,
     FaceLogs,
 )
 import cv2
 from threading import Thread, Lock
-from queue import Queue
 import time
 import numpy as np
-# Lazy import DeepFace to avoid TensorFlow loading at startup
-# from deepface import DeepFace
-_deepface_module = None
-
-def get_deepface():
-    """Lazy-load DeepFace only when needed"""
-    global _deepface_module
-    if _deepface_module is None:
-        from deepface import DeepFace
-        _deepface_module = DeepFace
-    return _deepface_module
-
 import json
+import logging
 import os
+import re
 from datetime import datetime
 from django.conf import settings
 from ..utils.philsms import send_sms_async, PHILSMS_DEFAULT_RECIPIENT
+from ..computer_vision.camera_roi import camera_rois, shift_detections
+from ..computer_vision.cv_logging import cv_stats, log_limited
+from ..computer_vision.face_tracker import FaceTracker
+from ..computer_vision.frame_bus import FrameBuffer, frame_buses
+from ..computer_vision.mjpeg import CONTENT_TYPE, encode_part, is_async_request, stream_async
+from ..computer_vision.inference_pool import forget_camera, get_inference_pool
+from ..computer_vision.motion_gate import motion_gates
+from ..computer_vision.stream_control import StreamControl
+# DeepFace is imported lazily (inside the inference workers) to avoid loading TensorFlow at startup
+from ..computer_vision.inference_worker import detect_and_embed
+from ..computer_vision.face_gallery import face_gallery, follow_published_gallery, warm_start_face_gallery
+from ..computer_vision.gallery_matcher import GalleryMatcher
 import platform
+from functools import lru_cache
 
 # DeepFace library with TensorFlow backend - reliable and well-maintained
 print(f"✅ Face Recognition using DeepFace library (TensorFlow backend)")
 
 # Store active cameras for live feed
-live_feed_cameras = {}  # {box_id: camera_object}
-live_feed_queues = {}   # {box_id: Queue for processed frames}
-live_feed_threads = {}  # {box_id: capture thread}
+live_feed_cameras = {}  # {box_id: FrameBus of the box's camera (shared between boxes on the same device)}
+live_feed_frames = {}   # {box_id: FrameBuffer of annotated frames}
 face_recognition_threads = {}  # {box_id: recognition thread}
-raw_frame_queues = {}  # {box_id: Queue for raw frames before processing}
 
-# Face embeddings cache (loaded from database)
-face_embeddings_cache = {}  # {id_number: {'embeddings': [...], 'name': str}}
-face_embeddings_lock = Lock()
+# Face embeddings live in the shared per-pose gallery (see computer_vision/face_gallery.py)
 
 # Unauthorized face tracking (per camera box)
 unauthorized_last_save = {}  # {box_id: timestamp of last save}
@@ -95,6 +92,17 @@ FRAME_SKIP = 2  # Process every Nth frame for speed (1 = all frames, 2 = every o
 UNAUTHORIZED_SAVE_INTERVAL = 2.0  # Save unauthorized face every 2 seconds
 SAVE_UNAUTHORIZED_FACES = True  # Save unmatched faces when a valid face is detected
 
+# Face tracking - a face is embedded when its track is new, its last decision was
+# within TRACK_MIN_CONFIDENCE of the threshold, or TRACK_REFRESH_INTERVAL has passed
+TRACK_IOU_THRESHOLD = getattr(settings, 'FACE_TRACK_IOU_THRESHOLD', 0.3)
+TRACK_MAX_MISSED = getattr(settings, 'FACE_TRACK_MAX_MISSED', 5)  # processed frames
+TRACK_REFRESH_INTERVAL = getattr(settings, 'FACE_TRACK_REFRESH_INTERVAL', 3.0)  # seconds
+TRACK_MIN_CONFIDENCE = getattr(settings, 'FACE_TRACK_MIN_CONFIDENCE', 0.05)  # cosine distance margin
+MIN_FACE_SIZE = 60  # Smaller detections are not embedded (see is_valid_face_detection)
+
+# Allowed users only, decided by cosine distance < RECOGNITION_THRESHOLD
+face_matcher = GalleryMatcher('cosine_distance', RECOGNITION_THRESHOLD)
+
 
 def normalize_embedding(embedding):
     """Return L2-normalized embedding vector."""
@@ -112,154 +120,62 @@ def normalize_embedding(embedding):
 
 
 def load_face_embeddings():
-    """Load all face embeddings from database into memory for fast lookup"""
-    global face_embeddings_cache
-    
-    with face_embeddings_lock:
-        try:
-            print("=" * 80)
-            print("📚 LOADING FACE EMBEDDINGS FROM DATABASE")
-            print("=" * 80)
-            
-            embeddings = FacesEmbeddings.objects.all()
-            face_embeddings_cache = {}
-            
-            loaded_count = 0
-            error_count = 0
-            
-            print(f"Found {embeddings.count()} face embedding record(s) in database")
-            print("-" * 80)
-            
-            for emb in embeddings:
-                try:
-                    # Get account info
-                    id_num = emb.id_number.id_number if hasattr(emb.id_number, 'id_number') else str(emb.id_number)
-                    account = AccountRegistration.objects.filter(id_number=id_num).first()
-                    name = f"{account.first_name} {account.last_name}" if account else "Unknown"
-                    
-                    print(f"\n📋 Processing embedding for: {id_num} ({name})")
-                    
-                    # Load all three embeddings (front, left, right) as 128-dim numpy arrays
-                    embeddings_to_try = [
-                        ('front_embedding', emb.front_embedding),
-                        ('left_embedding', emb.left_embedding),
-                        ('right_embedding', emb.right_embedding)
-                    ]
-                    
-                    loaded_embeddings = []
-                    
-                    for emb_name, emb_data in embeddings_to_try:
-                        try:
-                            # Handle different data formats
-                            if isinstance(emb_data, str):
-                                embedding_list = json.loads(emb_data)
-                            elif isinstance(emb_data, list):
-                                embedding_list = emb_data
-                            elif isinstance(emb_data, dict):
-                                print(f"   ⚠️ {emb_name}: Empty (not captured)")
-                                continue
-                            else:
-                                print(f"   ⚠️ {emb_name}: Unknown format {type(emb_data)}")
-                                continue
-                            
-                            if embedding_list and len(embedding_list) > 0:
-                                embedding_array = normalize_embedding(embedding_list)
-                                if embedding_array is not None:
-                                    loaded_embeddings.append(embedding_array)
-                                    print(f"   ✅ {emb_name}: Loaded successfully (shape: {embedding_array.shape})")
-                                else:
-                                    print(f"   ⚠️ {emb_name}: Normalization failed")
-                            else:
-                                print(f"   ⚠️ {emb_name}: Empty list")
-                        
-                        except Exception as e:
-                            print(f"   ❌ {emb_name}: Error - {e}")
-                    
-                    # Store ALL embeddings (front, left, right) for better matching
-                    if loaded_embeddings:
-                        face_embeddings_cache[id_num] = {
-                            'embeddings': loaded_embeddings,
-                            'name': name
-                        }
-                        loaded_count += 1
-                        print(f"   🎯 CACHED {len(loaded_embeddings)} embedding(s) for {id_num}")
-                    else:
-                        error_count += 1
-                        print(f"   ❌ NO VALID EMBEDDINGS found for {id_num}")
-                
-                except Exception as e:
-                    error_count += 1
-                    print(f"   ❌ CRITICAL ERROR processing {id_num}: {e}")
-                    import traceback
-                    traceback.print_exc()
-            
-            print("=" * 80)
-            print(f"✅ FACE EMBEDDINGS LOADING COMPLETE")
-            print(f"   Total records processed: {embeddings.count()}")
-            print(f"   Successfully loaded: {loaded_count}")
-            print(f"   Errors: {error_count}")
-            print(f"   Cache size: {len(face_embeddings_cache)} person(s)")
-            print("=" * 80)
+    """
+    Make sure the shared gallery is loaded for fast lookup
+
+    The first call maps the published snapshot and applies database deltas (a
+    full load only without a snapshot). After that the enrollment signals keep
+    the gallery current, so later calls only follow galleries published by
+    other worker processes.
+    """
+    try:
+        if face_gallery.last_update:
+            follow_published_gallery()
             return True
-            
-        except Exception as e:
-            print("=" * 80)
-            print(f"❌ CRITICAL ERROR LOADING FACE EMBEDDINGS: {e}")
-            import traceback
-            traceback.print_exc()
-            print("=" * 80)
-            return False
+        print("📚 Loading face embeddings into shared gallery...")
+        loaded_count = warm_start_face_gallery()
+        print(f"✅ Face gallery ready: {loaded_count} person(s), {face_gallery.row_count} pose embedding(s)")
+        return True
+        
+    except Exception as e:
+        print(f"❌ CRITICAL ERROR LOADING FACE EMBEDDINGS: {e}")
+        import traceback
+        traceback.print_exc()
+        return False
 
 
 def recognize_face(face_embedding, log_details=False):
     """
     Match face embedding against database using ALL stored embeddings (front, left, right)
-    Uses face_recognition library distance calculation (Euclidean)
+    Every pose is its own gallery row; a person's distance is the minimum over their poses
     Returns: (id_number, name, distance) or (None, None, None)
     """
-    face_embedding = normalize_embedding(face_embedding)
-    if face_embedding is None:
-        return None, None, None
-
-    if len(face_embeddings_cache) == 0:
+    # Pick up enrollments published by other worker processes
+    follow_published_gallery()
+    
+    if len(face_gallery) == 0:
         if log_details:
             print("⚠️ No embeddings in cache to compare against")
         return None, None, None
     
-    min_distance = float('inf')
-    matched_id = None
-    matched_name = None
-    
-    # Compare with all cached embeddings
-    for id_number, data in face_embeddings_cache.items():
-        # Compare against ALL stored embeddings (front, left, right)
-        # Use the MINIMUM distance across all angles for better matching
-        embeddings_list = data['embeddings']  # List of numpy arrays
-        
-        distances_for_person = []
-        for stored_embedding in embeddings_list:
-            if stored_embedding is None:
-                continue
-            cosine_similarity = np.dot(face_embedding, stored_embedding)
-            cosine_similarity = np.clip(cosine_similarity, -1.0, 1.0)
-            cosine_distance = 1.0 - cosine_similarity
-            distances_for_person.append(cosine_distance)
-
-        if not distances_for_person:
-            continue
-
-        best_distance = min(distances_for_person)
-        
-        if best_distance < min_distance:
-            min_distance = best_distance
-            matched_id = id_number
-            matched_name = data['name']
+    result = face_matcher.match(face_embedding, RECOGNITION_THRESHOLD)
+    if result.id_number is None:
+        return None, None, None
     
     # Check if match is within threshold
-    if min_distance is not None and min_distance < RECOGNITION_THRESHOLD:
-        return matched_id, matched_name, min_distance
+    if result.matched:
+        info = face_gallery.get_info(result.id_number)
+        matched_name = f"{info.get('first_name', '')} {info.get('last_name', '')}".strip() or "Unknown"
+        return result.id_number, matched_name, result.score
     else:
-        return None, None, min_distance
+        return None, None, result.score
+
+
+def recognition_confidence(matched_id, distance):
+    """How far a recognize_face() decision is from RECOGNITION_THRESHOLD (0 = on the boundary)"""
+    if distance is None or distance == float('inf'):
+        return 0.0 if matched_id else float('inf')
+    return abs(RECOGNITION_THRESHOLD - distance)
 
 
 def is_valid_face_detection(facial_area, frame_shape):
@@ -273,7 +189,7 @@ def is_valid_face_detection(facial_area, frame_shape):
         return False
 
     # Reject very small detections (noise) and extremely large detections (likely false)
-    if w < 60 or h < 60:
+    if w < MIN_FACE_SIZE or h < MIN_FACE_SIZE:
         return False
 
     frame_h, frame_w = frame_shape[:2]
@@ -413,21 +329,24 @@ def stop_live_feed_for_box(box_id):
     """Release resources associated with a specific live feed box."""
     box_key = str(box_id)
 
-    if box_key not in live_feed_cameras and box_key not in raw_frame_queues:
+    if box_key not in live_feed_cameras and box_key not in live_feed_frames:
         return False
 
     print(f"🛑 Releasing live feed resources for Box {box_key}")
 
-    cap = live_feed_cameras.pop(box_key, None)
-    if cap is not None:
+    bus = live_feed_cameras.pop(box_key, None)
+    if bus is not None:
         try:
-            cap.release()
+            # The camera itself is released when its last subscriber leaves
+            frame_buses.release(bus)
         except Exception as e:
             print(f"⚠️ Error releasing camera for Box {box_key}: {e}")
 
-    live_feed_queues.pop(box_key, None)
-    raw_frame_queues.pop(box_key, None)
-    live_feed_threads.pop(box_key, None)
+    frames = live_feed_frames.pop(box_key, None)
+    if frames is not None:
+        # Wake the box's viewers so they notice it stopped
+        frames.close()
+    forget_camera(box_key)
     face_recognition_threads.pop(box_key, None)
 
     return True
@@ -437,7 +356,7 @@ def stop_all_live_feed_cameras():
     """Release all active live feed cameras and associated resources."""
     active_boxes = list(set(
         list(live_feed_cameras.keys()) +
-        list(raw_frame_queues.keys())
+        list(live_feed_frames.keys())
     ))
 
     stopped = []
@@ -451,15 +370,161 @@ def stop_all_live_feed_cameras():
     return stopped
 
 
+class BoxRecognition:
+    """
+    Face tracks and identities of one live feed box
+    
+    Inference results (from the shared inference pool, or inline when the pool
+    is disabled) update the tracks; the box's recognition thread draws the
+    latest identities onto every outgoing frame.
+    """
+    
+    def __init__(self, box_id, camera_id):
+        self.box_id = box_id
+        self.camera_id = camera_id
+        self.tracker = FaceTracker(
+            iou_threshold=TRACK_IOU_THRESHOLD,
+            max_missed=TRACK_MAX_MISSED,
+            refresh_interval=TRACK_REFRESH_INTERVAL,
+            min_confidence=TRACK_MIN_CONFIDENCE,
+        )
+        self.lock = Lock()
+        self.visible = []  # [(matched_id, distance, facial_area)] from the latest result
+    
+    def known_boxes(self, now):
+        """(x, y, w, h) of tracked faces whose identity does not need re-checking"""
+        with self.lock:
+            boxes = []
+            for track in self.tracker.tracks:
+                if track.missed == 0 and not self.tracker.needs_embedding(track, now):
+                    x1, y1, x2, y2 = track.predicted_box
+                    boxes.append((x1, y1, x2 - x1, y2 - y1))
+            return boxes
+    
+    def apply(self, frame, detections):
+        """
+        Associate detect_and_embed() results with tracks and decide identities
+        
+        Only detections that came back with an embedding are matched against the
+        gallery; the others reuse the identity of their track.
+        """
+        now = time.monotonic()
+        detections = [d for d in detections if is_valid_face_detection(d['facial_area'], frame.shape)]
+        
+        embeddings_run = 0
+        visible = []
+        with self.lock:
+            tracks = self.tracker.update([
+                (d['facial_area']['x'], d['facial_area']['y'], d['facial_area']['w'], d['facial_area']['h'])
+                for d in detections
+            ])
+            for detection, track in zip(detections, tracks):
+                if detection['embedding'] is not None:
+                    embeddings_run += 1
+                    matched_id, _, distance = recognize_face(detection['embedding'], log_details=False)
+                    track.assign(matched_id, distance, recognition_confidence(matched_id, distance), now)
+                elif detection['error']:
+                    log_limited(logging.WARNING, ('embedding', self.box_id),
+                                "Box %s: error extracting embedding: %s", self.box_id, detection['error'])
+                
+                # A new face whose embedding failed has no identity yet
+                if track.last_embedded is None:
+                    continue
+                visible.append((track.label, track.score, detection['facial_area']))
+            self.visible = visible
+        
+        matches_seen = 0
+        for matched_id, _, facial_area in visible:
+            if matched_id:
+                matches_seen += 1
+                # Log authorized detection with throttling
+                log_authorized_face(self.box_id, matched_id)
+            else:
+                # Save unauthorized face image (throttled)
+                save_unauthorized_face(frame, self.box_id, facial_area)
+        
+        # Per box: several boxes can show the same physical camera
+        cv_stats.record(live_feed_camera_key(self.box_id), faces=len(visible), matches=matches_seen,
+                        unknown=len(visible) - matches_seen, embeddings=embeddings_run)
+    
+    def on_result(self, context, detections, error):
+        """
+        InferencePool handler
+        
+        context is (frame, origin): the unannotated frame that was submitted and
+        the offset of the region that was detected on
+        """
+        if error is not None:
+            log_limited(logging.WARNING, ('detection', self.box_id),
+                        "Box %s: face detection failed: %s", self.box_id, error)
+            return
+        frame, origin = context
+        self.apply(frame, shift_detections(detections, origin))
+    
+    def draw(self, frame):
+        """Draw the latest identities onto a frame"""
+        with self.lock:
+            faces = list(self.visible)
+        
+        for matched_id, distance, facial_area in faces:
+            x, y, w, h = facial_area['x'], facial_area['y'], facial_area['w'], facial_area['h']
+            
+            if matched_id:
+                # AUTHORIZED - Green box
+                color = (0, 255, 0)  # Green in BGR
+                label = f"ID: {matched_id}"
+            else:
+                # UNAUTHORIZED - Red box
+                color = (0, 0, 255)  # Red in BGR
+                label = "UNAUTHORIZED"
+            thickness = 3
+            
+            # Draw rectangle
+            cv2.rectangle(frame, (x, y), (x+w, y+h), color, thickness)
+            
+            # Draw label background
+            label_size, _ = cv2.getTextSize(label, cv2.FONT_HERSHEY_SIMPLEX, 0.7, 2)
+            cv2.rectangle(frame, (x, y - label_size[1] - 10), 
+                         (x + label_size[0], y), color, -1)
+            
+            # Draw label text
+            cv2.putText(frame, label, (x, y - 5), 
+                       cv2.FONT_HERSHEY_SIMPLEX, 0.7, (255, 255, 255), 2)
+            
+            # Draw confidence/distance
+            if distance is None or distance == float('inf'):
+                conf_text = "N/A"
+            else:
+                similarity = 1.0 - min(max(distance, 0.0), 1.0)
+                conf_text = f"{similarity:.2f}"
+            cv2.putText(frame, conf_text, (x, y+h+20), 
+                       cv2.FONT_HERSHEY_SIMPLEX, 0.5, color, 1)
+        return frame
+
+
+ROI_CAMERA_KEY = re.compile(r'^(box|enhanced)-\d+$')
+
+
+def live_feed_camera_key(box_id):
+    """motion_gates / camera_rois / cv_stats key of a live feed box"""
+    return f'box-{box_id}'
+
+
 def face_recognition_worker(box_id, camera_id):
     """
-    Dedicated face recognition thread using face_recognition library
-    Processes frames from raw_frame_queues and outputs annotated frames to live_feed_queues
+    Per-box recognition thread
+    Subscribes to the box camera's frame bus, feeds every FRAME_SKIP-th new
+    frame that passes the box's motion gate to the shared inference pool (or
+    runs detection inline when the pool is disabled) and publishes frames
+    annotated with the box's latest identities to live_feed_frames
     """
     print(f"🧠 Face recognition thread started for Box {box_id}, Camera {camera_id}")
     
     frame_count = 0
-    recognition_count = 0
+    last_seq = 0
+    recognition = BoxRecognition(box_id, camera_id)
+    pool = get_inference_pool()
+    camera_key = live_feed_camera_key(box_id)
     
     # Loop until the box_id is removed from the global maps. Use
     # defensive `.get()` lookups inside the loop to avoid KeyError
@@ -467,134 +532,59 @@ def face_recognition_worker(box_id, camera_id):
     while True:
         try:
             # Re-check presence of resources each iteration
-            raw_q = raw_frame_queues.get(box_id)
-            out_q = live_feed_queues.get(box_id)
-            cap = live_feed_cameras.get(box_id)
+            bus = live_feed_cameras.get(box_id)
+            output = live_feed_frames.get(box_id)
 
             # If any core resource is gone, exit loop cleanly
-            if raw_q is None or out_q is None or cap is None:
+            if bus is None or output is None:
                 break
 
-            # Get raw frame from queue (non-blocking)
-            if raw_q.empty():
-                time.sleep(0.01)
+            # Block until the camera delivers a frame we have not handled yet
+            # (shared, read-only); the timeout re-checks that the box still runs
+            latest = bus.frames.wait(last_seq, timeout=0.5)
+            if latest is None:
                 continue
 
-            frame = raw_q.get(timeout=0.1)
+            last_seq = latest.seq
+            frame = latest.image
             frame_count += 1
             
-            # Skip frames for speed (process every FRAME_SKIP frames)
-            if frame_count % FRAME_SKIP != 0:
-                # Pass through without processing
-                if not live_feed_queues[box_id].full():
-                    live_feed_queues[box_id].put(frame)
-                continue
-            
-            # Convert to RGB for DeepFace
-            rgb_frame = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
-            
-            try:
-                # Detect faces using DeepFace
-                DeepFace = get_deepface()
-                face_objs = DeepFace.extract_faces(
-                    img_path=rgb_frame,
-                    detector_backend='mtcnn',
-                    enforce_detection=False,
-                    align=True
-                )
+            # Detect and embed every FRAME_SKIP frames unless the scene (or the
+            # box's region of interest) is still; faces whose track already has
+            # a confident, fresh identity are detected but not embedded
+            if frame_count % FRAME_SKIP == 0:
+                region, origin = frame, (0, 0)
+                roi = camera_rois.get(camera_key)
+                if roi is not None:
+                    # Detect on the region only, at a higher effective resolution
+                    region, origin = roi.crop(frame)
                 
-                # Process each detected face
-                for face_obj in face_objs:
-                    recognition_count += 1
+                if motion_gates.check(camera_key, region):
+                    # Convert to RGB for DeepFace
+                    rgb_region = cv2.cvtColor(region, cv2.COLOR_BGR2RGB)
+                    known_boxes = [(x - origin[0], y - origin[1], w, h)
+                                   for x, y, w, h in recognition.known_boxes(time.monotonic())]
+                    args = (rgb_region, known_boxes, TRACK_IOU_THRESHOLD, MIN_FACE_SIZE)
                     
-                    # Get facial area coordinates and validate
-                    facial_area = face_obj.get('facial_area', {})
-                    if not is_valid_face_detection(facial_area, frame.shape):
-                        continue
-
-                    x, y, w, h = facial_area['x'], facial_area['y'], facial_area['w'], facial_area['h']
-                    
-                    # Get face image for embedding extraction
-                    face = face_obj['face']
-                    
-                    # DeepFace returns normalized float array [0,1], convert to uint8 [0,255]
-                    if face.dtype == np.float32 or face.dtype == np.float64:
-                        face = (face * 255).astype(np.uint8)
-                    
-                    # Extract embedding from detected face
-                    try:
-                        DeepFace = get_deepface()
-                        result = DeepFace.represent(
-                            img_path=face,
-                            model_name='Facenet',
-                            detector_backend='skip',  # Skip detection, already detected
-                            enforce_detection=False,
-                            align=False  # Already aligned
-                        )
-                        
-                        if result and len(result) > 0:
-                            face_embedding = normalize_embedding(result[0]['embedding'])
-                            if face_embedding is None:
-                                continue
-
-                            # Recognize face
-                            matched_id, matched_name, distance = recognize_face(face_embedding, log_details=False)
-                            
-                            # Draw bounding box and label
-                            if matched_id:
-                                # AUTHORIZED - Green box
-                                color = (0, 255, 0)  # Green in BGR
-                                label = f"ID: {matched_id}"
-                                thickness = 3
-
-                                # Log authorized detection with throttling
-                                log_authorized_face(box_id, matched_id)
-                            else:
-                                # UNAUTHORIZED - Red box (no saving per user request)
-                                color = (0, 0, 255)  # Red in BGR
-                                label = "UNAUTHORIZED"
-                                thickness = 3
-
-                                # Save unauthorized face image (throttled)
-                                save_unauthorized_face(frame, box_id, facial_area)
-                            
-                            # Draw rectangle
-                            cv2.rectangle(frame, (x, y), (x+w, y+h), color, thickness)
-                            
-                            # Draw label background
-                            label_size, _ = cv2.getTextSize(label, cv2.FONT_HERSHEY_SIMPLEX, 0.7, 2)
-                            cv2.rectangle(frame, (x, y - label_size[1] - 10), 
-                                         (x + label_size[0], y), color, -1)
-                            
-                            # Draw label text
-                            cv2.putText(frame, label, (x, y - 5), 
-                                       cv2.FONT_HERSHEY_SIMPLEX, 0.7, (255, 255, 255), 2)
-                            
-                            # Draw confidence/distance
-                            if distance is None or distance == float('inf'):
-                                conf_text = "N/A"
-                            else:
-                                similarity = 1.0 - min(max(distance, 0.0), 1.0)
-                                conf_text = f"{similarity:.2f}"
-                            cv2.putText(frame, conf_text, (x, y+h+20), 
-                                       cv2.FONT_HERSHEY_SIMPLEX, 0.5, color, 1)
-                    
-                    except Exception as embed_error:
-                        print(f"⚠️ Error extracting embedding: {embed_error}")
-                        continue
-                        
-            except Exception as detect_error:
-                # If detection fails, just pass through the frame
-                pass
+                    if pool is not None:
+                        # Results arrive asynchronously; the bus frame stays unannotated
+                        pool.submit(box_id, detect_and_embed, args, recognition.on_result, context=(frame, origin))
+                    else:
+                        try:
+                            recognition.apply(frame, shift_detections(detect_and_embed(*args), origin))
+                        except Exception as detect_error:
+                            # If detection fails, just pass through the frame
+                            recognition.on_result((frame, origin), None, detect_error)
             
-            # Put processed frame in output queue if still available
-            if out_q is not None and not out_q.full():
-                out_q.put(frame)
+            # Annotate a copy; the bus frame is shared with other subscribers
+            output.publish(recognition.draw(frame.copy()))
         
         except Exception as e:
             print(f"⚠️ Error in face recognition for Box {box_id}: {e}")
             time.sleep(0.1)
     
+    cv_stats.forget(camera_key)
+    motion_gates.forget(camera_key)
     print(f"🛑 Face recognition thread stopped for Box {box_id}")
 
 
@@ -603,8 +593,7 @@ def live_feed_simple(request):
     """
     Live feed view with face recognition - PROTECH-style camera selection
     """
-    # ALWAYS load face embeddings when page loads (this ensures new enrollments are picked up)
-    print("📚 Loading face embeddings from database...")
+    # Load the gallery on first use; afterwards this only follows other workers' snapshots
     load_face_embeddings()
     
     user = AccountRegistration.objects.filter(username=request.user).values()
@@ -690,59 +679,85 @@ def get_available_cameras_simple(request):
         })
 
 
+@lru_cache(maxsize=16)
+def no_signal_part(camera_id):
+    """Encoded NO SIGNAL placeholder, shared by every viewer of the camera"""
+    frame = np.zeros((480, 640, 3), dtype=np.uint8)
+    cv2.putText(frame, "NO SIGNAL", (180, 240), 
+               cv2.FONT_HERSHEY_SIMPLEX, 1.5, (255, 255, 255), 3)
+    cv2.putText(frame, f"Camera {camera_id}", (230, 280), 
+               cv2.FONT_HERSHEY_SIMPLEX, 0.8, (200, 200, 200), 2)
+    return encode_part(frame, 95)
+
+
 def video_feed_simple(request, camera_id):
     """
     Video feed endpoint - streams from initialized camera
+    
+    Optional query parameters cap this viewer's stream: fps (max frame rate),
+    width (max frame width) and quality (JPEG quality); the stream also steps
+    down on its own while the viewer's connection cannot keep up (adaptive=0
+    turns that off). Viewers with the same limits share each frame's encode.
     """
     from django.http import StreamingHttpResponse
-    import numpy as np
     
     box_id = request.GET.get('box_id', None)
+    control = StreamControl.from_query(request.GET, quality=85)
     
     def generate_frames(box_id):
         """Generate frames from camera or placeholder
 
         Re-check camera initialization on each iteration to avoid race
-        where the camera is stopped concurrently and the queue/key
+        where the camera is stopped concurrently and the buffer/key
         is removed, which previously caused a KeyError.
+        Every viewer reads the box's annotated frames by sequence number,
+        so viewers never take frames away from each other, and each frame is
+        JPEG-encoded once for all of them.
         """
+        last_seq = 0
         while True:
             # Re-evaluate initialization state each loop to avoid stale value
-            is_camera_initialized = box_id and box_id in live_feed_cameras and box_id in live_feed_queues
+            is_camera_initialized = box_id and box_id in live_feed_cameras and box_id in live_feed_frames
 
             if is_camera_initialized:
-                # Camera is active - only show frames from queue, no placeholder
-                q = live_feed_queues.get(box_id)
-                if q is not None and not q.empty():
-                    try:
-                        frame = q.get(timeout=0.1)
-                        _, buffer = cv2.imencode('.jpg', frame, [cv2.IMWRITE_JPEG_QUALITY, 85])
-                        yield (b'--frame\r\n'
-                               b'Content-Type: image/jpeg\r\n\r\n' + buffer.tobytes() + b'\r\n')
-                    except Exception:
-                        # On any error just continue the loop and re-check state
-                        pass
-                # If queue is empty but camera is active, just wait - don't show NO SIGNAL
-                time.sleep(0.01)  # Short sleep to avoid busy waiting
+                # Camera is active - only show camera frames, no placeholder
+                frames = live_feed_frames.get(box_id)
+                try:
+                    # Stay within this viewer's frame rate, then wake as soon as the
+                    # next frame is published; the timeout re-checks that the box is
+                    # still running
+                    time.sleep(control.delay())
+                    encoded = control.encoder(frames).wait_part(last_seq, timeout=0.5) if frames is not None else None
+                except Exception:
+                    # On any error just continue the loop and re-check state
+                    encoded = None
+                    time.sleep(0.01)
+                # If no new frame arrived but camera is active, just wait again - don't show NO SIGNAL
+                if encoded is not None:
+                    last_seq, part = encoded
+                    started = time.monotonic()
+                    yield part
+                    # The server wrote the part to the socket before resuming us:
+                    # slow writes mean the viewer cannot keep up with this variant
+                    control.sent(time.monotonic() - started)
             else:
                 # Camera not initialized yet - show NO SIGNAL placeholder
-                frame = np.zeros((480, 640, 3), dtype=np.uint8)
-                cv2.putText(frame, "NO SIGNAL", (180, 240), 
-                           cv2.FONT_HERSHEY_SIMPLEX, 1.5, (255, 255, 255), 3)
-                cv2.putText(frame, f"Camera {camera_id}", (230, 280), 
-                           cv2.FONT_HERSHEY_SIMPLEX, 0.8, (200, 200, 200), 2)
-                cv2.putText(frame, "", (150, 320), 
-                           cv2.FONT_HERSHEY_SIMPLEX, 0.6, (150, 150, 150), 1)
-                
-                _, buffer = cv2.imencode('.jpg', frame)
-                yield (b'--frame\r\n'
-                       b'Content-Type: image/jpeg\r\n\r\n' + buffer.tobytes() + b'\r\n')
+                yield no_signal_part(camera_id)
                 
                 time.sleep(0.1)  # Slower refresh when showing placeholder
     
+    if is_async_request(request):
+        # ASGI: the viewer is a coroutine on the event loop, not a worker thread
+        def box_frames():
+            return live_feed_frames.get(box_id) if box_id and box_id in live_feed_cameras else None
+        return StreamingHttpResponse(
+            stream_async(box_frames, 85, placeholder=lambda: no_signal_part(camera_id), timeout=0.5, control=control),
+            content_type=CONTENT_TYPE
+        )
+    
     return StreamingHttpResponse(
         generate_frames(box_id),
-        content_type='multipart/x-mixed-replace; boundary=frame'
+        content_type=CONTENT_TYPE
     )
 
 
@@ -773,7 +788,7 @@ def initialize_live_feed_camera(request):
         # Stop existing camera for this box if any
         if box_id in live_feed_cameras and live_feed_cameras[box_id] is not None:
             print(f"🛑 Stopping existing camera for Box {box_id}")
-            live_feed_cameras[box_id].release()
+            frame_buses.release(live_feed_cameras[box_id])
             live_feed_cameras[box_id] = None
         
         # Try to map by label first (Windows DirectShow)
@@ -785,6 +800,15 @@ def initialize_live_feed_camera(request):
             max_cameras_to_test = 10
 
             for test_id in range(max_cameras_to_test):
+                # A device another box is streaming works; never open it a second time
+                if frame_buses.get(test_id) is not None:
+                    print(f"   ✓ Camera at index {test_id} is already streaming")
+                    if test_id == camera_id:
+                        actual_camera_id = test_id
+                        print(f"   ✅ Using requested camera index {actual_camera_id}")
+                        break
+                    continue
+
                 test_cap = cv2.VideoCapture(test_id, cv2.CAP_DSHOW)
                 if test_cap.isOpened():
                     ret, frame = test_cap.read()
@@ -802,75 +826,47 @@ def initialize_live_feed_camera(request):
             actual_camera_id = camera_id
             print(f"   ⚠️ Using fallback camera index {actual_camera_id}")
         
-        # Open the selected camera
-        cap = cv2.VideoCapture(actual_camera_id, cv2.CAP_DSHOW)
-        
-        # Set camera properties for optimal performance
-        cap.set(cv2.CAP_PROP_FRAME_WIDTH, 640)
-        cap.set(cv2.CAP_PROP_FRAME_HEIGHT, 480)
-        cap.set(cv2.CAP_PROP_FPS, 30)
-        cap.set(cv2.CAP_PROP_BUFFERSIZE, 1)  # Minimize latency
+        cap = None
+        if frame_buses.get(actual_camera_id) is None:
+            # Open the selected camera
+            cap = cv2.VideoCapture(actual_camera_id, cv2.CAP_DSHOW)
+            
+            # Set camera properties for optimal performance
+            cap.set(cv2.CAP_PROP_FRAME_WIDTH, 640)
+            cap.set(cv2.CAP_PROP_FRAME_HEIGHT, 480)
+            cap.set(cv2.CAP_PROP_FPS, 30)
+            cap.set(cv2.CAP_PROP_BUFFERSIZE, 1)  # Minimize latency
+            
+            if not cap.isOpened():
+                print(f"❌ Failed to open Camera {actual_camera_id}")
+                return JsonResponse({
+                    'success': False,
+                    'error': f'Failed to open camera {actual_camera_id}'
+                })
+            
+            # Test read a frame
+            ret, frame = cap.read()
+            if not ret or frame is None:
+                print(f"❌ Camera {actual_camera_id} opened but cannot read frames")
+                cap.release()
+                return JsonResponse({
+                    'success': False,
+                    'error': f'Camera {actual_camera_id} cannot read frames'
+                })
+        else:
+            print(f"🔗 Camera {actual_camera_id} is already streaming, sharing its frame bus with Box {box_id}")
         
-        if not cap.isOpened():
-            print(f"❌ Failed to open Camera {actual_camera_id}")
+        # The frame bus reads the camera once for every box and viewer using it
+        bus = frame_buses.acquire(actual_camera_id, capture=cap)
+        if bus is None:
             return JsonResponse({
                 'success': False,
                 'error': f'Failed to open camera {actual_camera_id}'
             })
-        
-        # Test read a frame
-        ret, frame = cap.read()
-        if not ret or frame is None:
-            print(f"❌ Camera {actual_camera_id} opened but cannot read frames")
-            cap.release()
-            return JsonResponse({
-                'success': False,
-                'error': f'Camera {actual_camera_id} cannot read frames'
-            })
-        
-        # Store camera
-        live_feed_cameras[box_id] = cap
-        live_feed_queues[box_id] = Queue(maxsize=2)  # Processed frames
-        raw_frame_queues[box_id] = Queue(maxsize=3)  # Raw frames before processing
-        
-        # Start frame capture thread (reads from camera, outputs to raw_frame_queue)
-        def capture_frames(box_id, camera_id):
-            print(f"📹 Frame capture thread started for Box {box_id}, Camera {camera_id} ({camera_label})")
-            while True:
-                try:
-                    # Defensive lookups to avoid KeyError if the box is stopped
-                    cap = live_feed_cameras.get(box_id)
-                    raw_q = raw_frame_queues.get(box_id)
+        live_feed_cameras[box_id] = bus
+        live_feed_frames[box_id] = FrameBuffer()  # Annotated frames for the box's viewers
 
-                    # If resources removed, exit loop gracefully
-                    if cap is None or raw_q is None:
-                        break
-
-                    ret, frame = cap.read()
-                    if ret and frame is not None:
-                        # Put raw frame in queue for face recognition thread
-                        try:
-                            if raw_q.full():
-                                try:
-                                    raw_q.get_nowait()
-                                except Exception:
-                                    pass
-                            raw_q.put(frame)
-                        except Exception:
-                            # If put fails, skip this frame
-                            pass
-                    else:
-                        time.sleep(0.01)
-                except Exception as e:
-                    print(f"Error capturing frame for Box {box_id}: {e}")
-                    time.sleep(0.1)
-            print(f"🛑 Frame capture thread stopped for Box {box_id}")
-        
-        capture_thread = Thread(target=capture_frames, args=(box_id, actual_camera_id), daemon=True)
-        capture_thread.start()
-        live_feed_threads[box_id] = capture_thread
-
-        # Start face recognition thread (reads from raw_frame_queue, processes, outputs to live_feed_queue)
+        # Start face recognition thread (reads from the frame bus, publishes annotated frames to live_feed_frames)
         recognition_thread = Thread(target=face_recognition_worker, args=(box_id, actual_camera_id), daemon=True)
         recognition_thread.start()
         face_recognition_threads[box_id] = recognition_thread
@@ -892,6 +888,43 @@ def initialize_live_feed_camera(request):
         })
 
 
+@login_required(login_url='/login/')
+def live_feed_roi(request):
+    """
+    Get (GET ?camera=box-0) or set (POST {"camera": "box-0", "polygon": [[x, y], ...]})
+    a camera's face detection region; an empty polygon removes it. Setting it
+    requires an admin account
+    """
+    if request.method == 'POST':
+        # Allow admin accounts by privilege even if is_staff was not synced yet.
+        is_admin_priv = getattr(request.user, 'privilege', '') == 'admin'
+        if not request.user.is_staff and not request.user.is_superuser and not is_admin_priv:
+            return JsonResponse({'success': False, 'error': 'Admin privileges required'}, status=403)
+        try:
+            data = json.loads(request.body or '{}')
+        except ValueError:
+            return JsonResponse({'success': False, 'error': 'Invalid JSON'}, status=400)
+        camera_key = str(data.get('camera', ''))
+    else:
+        data = {}
+        camera_key = request.GET.get('camera', '')
+    
+    if not ROI_CAMERA_KEY.match(camera_key):
+        return JsonResponse({'success': False, 'error': 'camera must look like box-<n> or enhanced-<n>'}, status=400)
+    
+    if request.method != 'POST':
+        roi = camera_rois.get(camera_key)
+        polygon = roi.polygon.tolist() if roi is not None else None
+        return JsonResponse({'success': True, 'camera': camera_key, 'polygon': polygon})
+    
+    try:
+        polygon = camera_rois.set(camera_key, data.get('polygon'), request.user)
+    except ValueError as e:
+        return JsonResponse({'success': False, 'error': str(e)}, status=400)
+    print(f"🎯 Detection region for {camera_key} {'set' if polygon else 'cleared'}")
+    return JsonResponse({'success': True, 'camera': camera_key, 'polygon': polygon})
+
+
 @login_required(login_url='/login/')
 def stop_live_feed(request):
     """API endpoint to stop live feed cameras when user leaves the page."""
@@ -7,19 +7,22 @@ import cv2
 import numpy as np
 import time
 import threading
-from queue import Queue, Empty
 from django.http import StreamingHttpResponse, HttpResponse
 from django.contrib.auth.decorators import login_required
 from django.template import loader
 from threading import Thread, Lock
 import json
 
+from ..computer_vision.frame_bus import FrameBuffer, frame_buses
+from ..computer_vision.mjpeg import CONTENT_TYPE, encode_part, is_async_request, mjpeg_encoder, stream_async
+
 class UltraFastCameraManager:
     """Ultra-fast camera manager optimized for SUB-2 second loading"""
     
     def __init__(self):
         self.cameras = {}
-        self.frame_queues = {}
+        self.frame_buffers = {}  # Processed frames per camera, read by every viewer
+        self.no_input_parts = {}  # Encoded NO INPUT frame per camera
         self.running = False
         self.lock = Lock()
         self.initialized = False
@@ -165,11 +168,11 @@ class UltraFastCameraManager:
         return assigned
     
     def _instant_queue_setup(self):
-        """Instant frame queue setup"""
-        print("⚡ Setting up ultra-fast frame queues...")
-        self.frame_queues = {}
+        """Instant frame buffer setup"""
+        print("⚡ Setting up ultra-fast frame buffers...")
+        self.frame_buffers = {}
         for camera_id in range(4):
-            self.frame_queues[camera_id] = Queue(maxsize=2)  # Minimal queue size for speed
+            self.frame_buffers[camera_id] = FrameBuffer()
     
     def _instant_thread_startup(self):
         """Instant thread startup for all cameras"""
@@ -188,55 +191,53 @@ class UltraFastCameraManager:
                 print(f"⚫ No-input thread started for Camera {camera_id}")
     
     def _ultra_fast_capture_loop(self, camera_id):
-        """Ultra-fast capture loop with optimized face detection"""
-        cap = self.cameras[camera_id]
+        """Ultra-fast processing of the camera's frame bus frames with optimized face detection"""
+        output = self.frame_buffers[camera_id]
+        # Camera 0 and 1 are physical indices 0 and 1 (see _lightning_detect_cameras)
+        bus = frame_buses.acquire(camera_id, capture=self.cameras[camera_id])
+        if bus is None:
+            self._no_input_loop(camera_id)
+            return
+        self.cameras[camera_id] = bus.capture
         print(f"🎬 Starting capture loop for Camera {camera_id}")
         
         frame_count = 0
-        while self.running:
-            try:
-                ret, frame = cap.read()
-                
-                if ret and frame is not None:
-                    frame_count += 1
-                    if frame_count % 30 == 0:  # Log every 30 frames
-                        print(f"📸 Camera {camera_id}: {frame_count} frames captured")
+        last_seq = 0
+        try:
+            while self.running:
+                try:
+                    # Wake as soon as the camera delivers a new frame
+                    latest = bus.frames.wait(last_seq, timeout=1.0)
                     
-                    # OPTIMIZED face detection - only every Nth frame
-                    self.frame_counters[camera_id] += 1
-                    if self.frame_counters[camera_id] % self.DETECTION_SKIP == 0:
-                        frame = self._ultra_fast_face_detection(frame, camera_id)
+                    if latest is not None:
+                        last_seq = latest.seq
+                        frame = latest.image
+                        frame_count += 1
+                        if frame_count % 30 == 0:  # Log every 30 frames
+                            print(f"📸 Camera {camera_id}: {frame_count} frames captured")
+                        
+                        # OPTIMIZED face detection - only every Nth frame (on a copy,
+                        # the bus frame is shared and read-only)
+                        self.frame_counters[camera_id] += 1
+                        if self.frame_counters[camera_id] % self.DETECTION_SKIP == 0:
+                            frame = self._ultra_fast_face_detection(frame.copy(), camera_id)
+                        
+                        output.publish(frame)
+                    else:
+                        print(f"⚠️ Camera {camera_id}: No frames from camera")
+                        # Camera disconnected - show NO INPUT
+                        output.publish(self._generate_no_input_frame(camera_id))
                     
-                    # ULTRA-FAST queue management
-                    try:
-                        if self.frame_queues[camera_id].full():
-                            self.frame_queues[camera_id].get_nowait()  # Drop old frame
-                        self.frame_queues[camera_id].put_nowait(frame)
-                    except Exception as queue_error:
-                        print(f"Queue error camera {camera_id}: {queue_error}")
-                else:
-                    print(f"⚠️ Camera {camera_id}: Failed to read frame (ret={ret})")
-                    # Camera disconnected - show NO INPUT
-                    no_input_frame = self._generate_no_input_frame(camera_id)
+                except Exception as e:
+                    print(f"❌ Capture error camera {camera_id}: {e}")
+                    # Put a NO INPUT frame on error
                     try:
-                        if not self.frame_queues[camera_id].full():
-                            self.frame_queues[camera_id].put_nowait(no_input_frame)
+                        output.publish(self._generate_no_input_frame(camera_id))
                     except:
                         pass
-                    time.sleep(0.5)  # Wait longer on failed reads
-                
-                time.sleep(1/self.FPS)  # Maintain frame rate
-                
-            except Exception as e:
-                print(f"❌ Capture error camera {camera_id}: {e}")
-                # Put a NO INPUT frame on error
-                try:
-                    no_input_frame = self._generate_no_input_frame(camera_id)
-                    if not self.frame_queues[camera_id].full():
-                        self.frame_queues[camera_id].put_nowait(no_input_frame)
-                except:
-                    pass
-                time.sleep(0.5)
+                    time.sleep(0.5)
+        finally:
+            frame_buses.release(bus)
     
     def _ultra_fast_face_detection(self, frame, camera_id):
         """Ultra-fast face detection with green/red boxes"""
@@ -303,8 +304,7 @@ class UltraFastCameraManager:
         
         while self.running:
             try:
-                if not self.frame_queues[camera_id].full():
-                    self.frame_queues[camera_id].put_nowait(no_input_frame.copy())
+                self.frame_buffers[camera_id].publish(no_input_frame)
                 time.sleep(1.0)  # Slower refresh for static content
             except:
                 time.sleep(0.1)
@@ -320,26 +320,37 @@ class UltraFastCameraManager:
         
         return frame
     
-    def get_ultra_fast_frame(self, camera_id):
-        """Get frame with ultra-fast retrieval"""
+    def _no_input_part(self, camera_id):
+        """Encoded NO INPUT frame (encoded once per camera)"""
+        part = self.no_input_parts.get(camera_id)
+        if part is None:
+            part = self.no_input_parts[camera_id] = encode_part(self._generate_no_input_frame(camera_id), 85)
+        return part
+    
+    def get_ultra_fast_part(self, camera_id, after_seq=0, timeout=1.0):
+        """
+        Get the newest encoded frame with ultra-fast retrieval; each frame is
+        JPEG-encoded once, for every viewer of the camera. Blocks until the
+        camera publishes a frame newer than after_seq, at most timeout seconds
+        
+        Returns:
+            tuple: (seq, part); seq is 0 for a NO INPUT placeholder, and part is
+            None when the camera had nothing newer than after_seq in time
+        """
         try:
-            if camera_id in self.frame_queues:
-                if not self.frame_queues[camera_id].empty():
-                    frame = self.frame_queues[camera_id].get_nowait()
-                    # print(f"🎞️ Camera {camera_id}: Got frame from queue")
-                    return frame
-                else:
-                    print(f"📭 Camera {camera_id}: Queue empty, returning NO INPUT")
-                    return self._generate_no_input_frame(camera_id)
-            else:
-                print(f"❌ Camera {camera_id}: Queue not found")
-                return self._generate_no_input_frame(camera_id)
-        except Empty:
-            print(f"📭 Camera {camera_id}: Queue empty (Empty exception)")
-            return self._generate_no_input_frame(camera_id)
+            frames = self.frame_buffers.get(camera_id)
+            if frames is None:
+                print(f"❌ Camera {camera_id}: Frame buffer not found")
+                return 0, self._no_input_part(camera_id)
+            if not frames.seq:
+                return 0, self._no_input_part(camera_id)
+            encoded = mjpeg_encoder(frames, 85).wait_part(after_seq, timeout)
+            if encoded is None:
+                return after_seq, None
+            return encoded
         except Exception as e:
             print(f"❌ Camera {camera_id}: Frame retrieval error - {e}")
-            return self._generate_no_input_frame(camera_id)
+            return 0, self._no_input_part(camera_id)
 
 # Global ultra-fast camera manager
 ultra_fast_manager = UltraFastCameraManager()
@@ -383,24 +394,35 @@ def ultra_fast_video_feed(request, camera_id):
             ultra_fast_manager.ultra_fast_camera_init()
         
         def generate_ultra_fast_frames():
+            last_seq = 0
             while True:
                 try:
-                    frame = ultra_fast_manager.get_ultra_fast_frame(camera_id)
+                    last_seq, part = ultra_fast_manager.get_ultra_fast_part(camera_id, last_seq)
+                    if part is None:
+                        # Nothing new within the timeout; every viewer reads the same buffer
+                        continue
                     
-                    # FAST JPEG encoding
-                    _, buffer = cv2.imencode('.jpg', frame, [cv2.IMWRITE_JPEG_QUALITY, 85])
+                    yield part
                     
-                    yield (b'--frame\r\n'
-                          b'Content-Type: image/jpeg\r\n\r\n' + buffer.tobytes() + b'\r\n')
-                    
-                    time.sleep(1/30)  # 30 FPS
+                    if not last_seq:
+                        time.sleep(1.0)  # Slower refresh for the static NO INPUT frame
                 except Exception as e:
                     print(f"Frame generation error: {e}")
                     time.sleep(0.1)
         
+        if is_async_request(request):
+            # ASGI: the viewer is a coroutine on the event loop, not a worker thread
+            def streaming_buffer():
+                frames = ultra_fast_manager.frame_buffers.get(camera_id)
+                return frames if frames is not None and frames.seq else None
+            return StreamingHttpResponse(
+                stream_async(streaming_buffer, 85, placeholder=lambda: ultra_fast_manager._no_input_part(camera_id), delay=1.0),
+                content_type=CONTENT_TYPE
+            )
+        
         return StreamingHttpResponse(
             generate_ultra_fast_frames(),
-            content_type='multipart/x-mixed-replace; boundary=frame'
+            content_type=CONTENT_TYPE
         )
         
     except Exception as e:
@@ -34,6 +34,7 @@ from dotenv import load_dotenv
 load_dotenv()
 
 from ..models import AccountRegistration, IncidentReport, VehicleRegistration, FaceLogs
+from ..computer_vision.torch_support import empty_cuda_cache, get_torch
 import subprocess
 from django.conf import settings
 import re
@@ -67,19 +68,16 @@ if tf is not None and hasattr(tf, "config"):
 else:
     print("TensorFlow not installed or missing GPU APIs; skipping")
 
-# Check PyTorch GPU
-try:
-    import torch
-    if torch.cuda.is_available():
-        print(f"PyTorch using GPU: {torch.cuda.get_device_name(0)}")
-        gpu_status['pytorch'] = True
-        
-        # Clean up CUDA memory at start
-        torch.cuda.empty_cache()
-    else:
-        print("PyTorch GPU not available")
-except ImportError:
-    print("PyTorch not installed")
+# Check PyTorch GPU (torch is only imported when a CUDA driver is present)
+torch = get_torch()
+if torch is not None:
+    print(f"PyTorch using GPU: {torch.cuda.get_device_name(0)}")
+    gpu_status['pytorch'] = True
+    
+    # Clean up CUDA memory at start
+    empty_cuda_cache()
+else:
+    print("PyTorch GPU not available - matching runs on NumPy")
 
 # Configure OpenCV for CUDA
 print("Configuring OpenCV with CUDA:")
@@ -100,6 +98,9 @@ print(f"GPU initialization complete: {gpu_status}")
 
 from ..computer_vision.face_matching import FaceMatcher
 from ..computer_vision.face_enrollment import FaceEnrollment
+from ..computer_vision.frame_bus import FrameBuffer, frame_buses
+from ..computer_vision.mjpeg import CONTENT_TYPE, is_async_request, mjpeg_encoder, stream_async
+from ..computer_vision.motion_gate import motion_gates
 
 # Initialize face detector - use GPU via PyTorch for best performance
 face_detector = FaceEnrollment(device='cuda')
@@ -429,7 +430,7 @@ def get_available_cameras_info():
 
 # Page-specific camera initialization - cameras only open when needed
 cameras = {}  # Empty by default - cameras initialized on-demand
-frame_queues = {}
+frame_buffers = {}  # Processed frames per camera, read by every viewer
 video_writers = {}
 face_cameras = {}  # Separate cameras for face enrollment
 face_frame_queues = {}
@@ -437,9 +438,9 @@ face_frame_queues = {}
 # Initialize dummy cameras by default
 def initialize_dummy_cameras():
     """Initialize dummy cameras for when no page is accessing cameras"""
-    global cameras, frame_queues
+    global cameras, frame_buffers
     cameras = {0: None}
-    frame_queues = {0: Queue(maxsize=2)}
+    frame_buffers = {0: FrameBuffer()}
 
 # Initialize dummy state
 initialize_dummy_cameras()
@@ -496,11 +497,16 @@ def generate_no_signal_frame():
     # Return the EXACT SAME frame reference - no copying to prevent any changes
     return _stable_no_signal_frame
 
+def physical_camera_index(camera_id):
+    """Camera 0 = Physical 1 (Acer HD), Camera 1 = Physical 2 (Rapoo)"""
+    return 1 if camera_id == 0 else 2 if camera_id == 1 else camera_id
+
 def capture_frames(camera_id):
-    """Captures frames with robust error handling and stable no-signal display"""
+    """Processes the camera's frame bus frames with stable no-signal display and publishes them to frame_buffers"""
     global cameras, recording, display_states
     
     camera_name = "Acer HD user-facing camera" if camera_id == 0 else "Rapoo camera" if camera_id == 1 else f"Camera {camera_id}"
+    output = frame_buffers[camera_id]
     
     # If camera is None, this is a dummy camera
     if cameras[camera_id] is None:
@@ -508,122 +514,96 @@ def capture_frames(camera_id):
         # Get the single stable frame instance once
         stable_frame = generate_no_signal_frame()
         while running:
-            if not frame_queues[camera_id].full():
-                # Use the EXACT SAME frame reference - no copying, no modifications
-                frame_queues[camera_id].put(stable_frame)
-            time.sleep(1/FPS)
+            # Use the EXACT SAME frame reference - no copying, no modifications
+            output.publish(stable_frame)
+            time.sleep(1.0)  # Static content; viewers are woken by each publish
         return
-        
-    cap = cameras[camera_id]
+    
+    # The bus reads the device (and reopens it after read failures); this thread
+    # is one of its subscribers, next to any other manager using the same camera
+    bus = frame_buses.acquire(physical_camera_index(camera_id), capture=cameras[camera_id])
+    if bus is None:
+        print(f"Failed to open camera {camera_id}")
+        cameras[camera_id] = None
+        return
+    cameras[camera_id] = bus.capture
+    last_seq = 0
     consecutive_failures = 0
-    max_failures = 10
     
-    while running:
-        try:
-            success, frame = cap.read()
-            
-            if not success or frame is None:
-                consecutive_failures += 1
-                frame = generate_no_signal_frame()
+    try:
+        while running:
+            try:
+                # Wake as soon as the camera delivers a new frame
+                latest = bus.frames.wait(last_seq, timeout=1.0)
+                if latest is None:
+                    # Show NO SIGNAL once the camera stops delivering frames
+                    output.publish(generate_no_signal_frame())
+                    continue
+                last_seq = latest.seq
+                frame = latest.image
                 
-                # If too many failures, try to reinitialize camera
-                if consecutive_failures > max_failures:
-                    print(f"🔄 Reinitializing camera {camera_id} after {consecutive_failures} failures")
-                    
-                    cap.release()
-                    time.sleep(1)  # Wait a bit before attempting to reconnect
-                    
-                    # Reinitialize with correct physical index
-                    # Camera 0 = Physical 1 (Acer HD), Camera 1 = Physical 2 (Rapoo)
-                    physical_cam_index = 1 if camera_id == 0 else 2 if camera_id == 1 else camera_id
-                    cap = cv2.VideoCapture(physical_cam_index, cv2.CAP_DSHOW)
-                    
-                    if not cap.isOpened():
-                        if camera_id == 1:
-                            print(f"❌ Failed to reinitialize RAPOO camera {camera_id} (physical {physical_cam_index})")
+                # Only process every FRAME_SKIP frames to reduce CPU/GPU load
+                frame_counts[camera_id] += 1
+                
+                # Periodically clean up CUDA memory to prevent fragmentation
+                if frame_counts[camera_id] % 100 == 0 and gpu_status['pytorch']:
+                    empty_cuda_cache()
+                
+                # Process face detection for all cameras
+                if frame_counts[camera_id] % FRAME_SKIP == 0:
+                    processed_frame = process_with_model(frame, camera_id)
+                    # Update display state with processed frame data
+                    if 'face_count' in display_states[camera_id]:
+                        # Only update if there was a significant change, prevents flickering
+                        new_count = display_states[camera_id].get('new_face_count', 0)
+                        current_count = display_states[camera_id]['face_count']
+                        
+                        # Anti-flickering: Only update after consistent detections
+                        if new_count != current_count:
+                            if display_states[camera_id].get('pending_count', -1) != new_count:
+                                # First time seeing this count, start tracking it
+                                display_states[camera_id]['pending_count'] = new_count
+                                display_states[camera_id]['pending_since'] = time.time()
+                            elif time.time() - display_states[camera_id]['pending_since'] > 0.5:
+                                # Count has been stable for 0.5 seconds, accept the change
+                                display_states[camera_id]['face_count'] = new_count
+                                display_states[camera_id]['previous_face_count'] = current_count
+                                display_states[camera_id]['update_needed'] = True
                         else:
-                            print(f"Failed to reinitialize camera {camera_id}")
-                        cameras[camera_id] = None
-                        return
-                    
-                    cap.set(cv2.CAP_PROP_FRAME_WIDTH, FRAME_WIDTH)
-                    cap.set(cv2.CAP_PROP_FRAME_HEIGHT, FRAME_HEIGHT)
-                    cap.set(cv2.CAP_PROP_FPS, FPS)
-                    cameras[camera_id] = cap
-                    consecutive_failures = 0
-                    
-                    if camera_id == 1:
-                        print(f"✅ RAPOO camera {camera_id} reinitialized successfully")
-            else:
-                consecutive_failures = 0  # Reset counter on success
-            
-            # Only process every FRAME_SKIP frames to reduce CPU/GPU load
-            frame_counts[camera_id] += 1
-            
-            # Periodically clean up CUDA memory to prevent fragmentation
-            if frame_counts[camera_id] % 100 == 0 and torch.cuda.is_available():
-                torch.cuda.empty_cache()
-            
-            # Process face detection for all cameras
-            if frame_counts[camera_id] % FRAME_SKIP == 0:
-                processed_frame = process_with_model(frame, camera_id)
-                # Update display state with processed frame data
-                if 'face_count' in display_states[camera_id]:
-                    # Only update if there was a significant change, prevents flickering
-                    new_count = display_states[camera_id].get('new_face_count', 0)
-                    current_count = display_states[camera_id]['face_count']
-                    
-                    # Anti-flickering: Only update after consistent detections
-                    if new_count != current_count:
-                        if display_states[camera_id].get('pending_count', -1) != new_count:
-                            # First time seeing this count, start tracking it
-                            display_states[camera_id]['pending_count'] = new_count
-                            display_states[camera_id]['pending_since'] = time.time()
-                        elif time.time() - display_states[camera_id]['pending_since'] > 0.5:
-                            # Count has been stable for 0.5 seconds, accept the change
-                            display_states[camera_id]['face_count'] = new_count
-                            display_states[camera_id]['previous_face_count'] = current_count
-                            display_states[camera_id]['update_needed'] = True
-                    else:
-                        # Count matches, clear pending count
-                        display_states[camera_id]['pending_count'] = -1
-                frame = processed_frame
-            else:
-                # For frames we're not processing, still draw face boxes and overlay text
-                frame = add_overlay_text(frame, camera_id)
-                frame = draw_face_boxes(frame, camera_id)
-            
-            if not frame_queues[camera_id].full():
-                frame_queues[camera_id].put(frame)
-
-            # Make sure recording happens if enabled
-            if recording and camera_id in video_writers:
-                if video_writers[camera_id] and video_writers[camera_id].isOpened():
-                    video_writers[camera_id].write(frame)
-                elif recording:
-                    # If writer isn't working but recording is on, try to reinitialize
-                    initialize_video_writers()
-
-        except Exception as e:
-            consecutive_failures += 1
-            
-            # Only print error every 30 failures to avoid spam
-            if consecutive_failures % 30 == 1:
-                print(f"Error in camera {camera_id}: {e} (failed {consecutive_failures} times)")
-            
-            if not frame_queues[camera_id].full():
-                frame_queues[camera_id].put(generate_no_signal_frame())
+                            # Count matches, clear pending count
+                            display_states[camera_id]['pending_count'] = -1
+                    frame = processed_frame
+                else:
+                    # For frames we're not processing, still draw face boxes and overlay text
+                    # (both work on copies; the bus frame is shared and read-only)
+                    frame = add_overlay_text(frame, camera_id)
+                    frame = draw_face_boxes(frame, camera_id)
+                
+                output.publish(frame)
+                consecutive_failures = 0
+                
+                # Make sure recording happens if enabled
+                if recording and camera_id in video_writers:
+                    if video_writers[camera_id] and video_writers[camera_id].isOpened():
+                        if (frame.shape[1], frame.shape[0]) != (FRAME_WIDTH, FRAME_HEIGHT):
+                            # Another manager may have opened the shared camera at its own resolution
+                            frame = cv2.resize(frame, (FRAME_WIDTH, FRAME_HEIGHT))
+                        video_writers[camera_id].write(frame)
+                    elif recording:
+                        # If writer isn't working but recording is on, try to reinitialize
+                        initialize_video_writers()
             
-            # If camera has failed too many times, disable it
-            if consecutive_failures > max_failures * 3:
-                print(f"Camera {camera_id} has failed {consecutive_failures} times. Disabling.")
-                cameras[camera_id] = None
-                return
+            except Exception as e:
+                consecutive_failures += 1
                 
-            time.sleep(0.5)  # Add delay to avoid rapid error loops
-        
-        # Proper frame rate control
-        time.sleep(max(1/FPS - 0.01, 0.01))
+                # Only print error every 30 failures to avoid spam
+                if consecutive_failures % 30 == 1:
+                    print(f"Error in camera {camera_id}: {e} (failed {consecutive_failures} times)")
+                
+                output.publish(generate_no_signal_frame())
+                time.sleep(0.5)  # Add delay to avoid rapid error loops
+    finally:
+        frame_buses.release(bus)
 
 def add_overlay_text(frame, camera_id):
     """Adds consistent overlay text to every frame"""
@@ -656,6 +636,11 @@ def process_with_model(frame, camera_id=None):
         # Make a copy to avoid reference issues
         display_frame = frame.copy()
         
+        # Skip detection on a still scene; keep showing the last results
+        if camera_id is not None and not motion_gates.check(camera_id, frame):
+            display_frame = add_overlay_text(display_frame, camera_id)
+            return draw_face_boxes(display_frame, camera_id)
+        
         # Resize for faster processing
         small_frame = cv2.resize(frame, (320, 240))
         
@@ -888,19 +873,17 @@ def initialize_video_writers():
     video_writers = new_video_writers
 
 def generate(camera_id):
-    """Fetches frames from the queue and yields them as an HTTP stream."""
+    """Yields the camera's newest processed frames as an HTTP stream.
+    Viewers never take frames from each other, and each frame is JPEG-encoded once for all of them."""
+    last_seq = 0
     while running:
         try:
-            if not frame_queues[camera_id].empty():
-                frame = frame_queues[camera_id].get()
-                
-                # Use better quality settings for visibility
-                _, buffer = cv2.imencode('.jpg', frame, [cv2.IMWRITE_JPEG_QUALITY, 90])
-                yield (b'--frame\r\n'
-                      b'Content-Type: image/jpeg\r\n\r\n' + buffer.tobytes() + b'\r\n')
-            else:
-                # Small sleep to prevent CPU spinning
-                time.sleep(0.01)
+            # Use better quality settings for visibility; blocks until the next
+            # frame is published (the timeout re-checks `running`)
+            encoded = mjpeg_encoder(frame_buffers[camera_id], 90).wait_part(last_seq, timeout=1.0)
+            if encoded is not None:
+                last_seq, part = encoded
+                yield part
         except Exception as e:
             print(f"Error in generate for camera {camera_id}: {e}")
             time.sleep(0.1)  # Pause on error
@@ -908,14 +891,17 @@ def generate(camera_id):
 def video_feed(request, camera_id):
     """Original video feed using the generate function"""
     camera_id = int(camera_id)
-    return StreamingHttpResponse(generate(camera_id), content_type='multipart/x-mixed-replace; boundary=frame')
+    if is_async_request(request):
+        stream = stream_async(lambda: frame_buffers.get(camera_id), 90, running=lambda: running)
+        return StreamingHttpResponse(stream, content_type=CONTENT_TYPE)
+    return StreamingHttpResponse(generate(camera_id), content_type=CONTENT_TYPE)
 
 def initialize_live_feed_cameras():
     """Initialize cameras specifically for live-feed page
     Frontend Camera 0 = Acer HD (physical index 1)
     Frontend Camera 1 = Rapoo (physical index 2)
     """
-    global cameras, frame_queues, display_states
+    global cameras, frame_buffers, display_states
     
     # First, cleanup any face enrollment cameras to avoid conflicts
     cleanup_face_enrollment_cameras()
@@ -951,8 +937,8 @@ def initialize_live_feed_cameras():
         cameras[1] = None
         print("❌ Camera 1: Rapoo camera NOT DETECTED at physical index 2")
     
-    # Set up frame queues and display states for both cameras
-    frame_queues = {0: Queue(maxsize=10), 1: Queue(maxsize=10)}
+    # Set up frame buffers and display states for both cameras
+    frame_buffers = {0: FrameBuffer(), 1: FrameBuffer()}
     display_states = {i: {
         "face_count": 0, 
         "previous_face_count": 0,
@@ -1060,20 +1046,12 @@ def cleanup_live_feed_cameras():
         # Stop capture threads
         running = False
         
-        # Wait for threads to finish
+        # Wait for threads to finish; each releases its frame bus subscription,
+        # and the bus releases the camera once no other manager is using it
         for thread in capture_threads:
             if thread.is_alive():
                 thread.join(timeout=1)
         
-        # Release all cameras
-        for cam_id, cap in cameras.items():
-            if cap is not None:
-                try:
-                    cap.release()
-                    print(f"Released live feed camera {cam_id}")
-                except Exception as e:
-                    print(f"Error releasing live feed camera {cam_id}: {e}")
-        
         # Close video writers
         for cam_id, writer in video_writers.items():
             if writer is not None:
@@ -1252,9 +1230,8 @@ def handle_exit(signum, frame):
     running = False
     print("\nShutting down... Closing video files.")
 
+    frame_buses.stop_all()
     for cam_id in cameras:
-        if cameras[cam_id] is not None and cameras[cam_id].isOpened():
-            cameras[cam_id].release()
         if cam_id in video_writers and video_writers[cam_id] and video_writers[cam_id].isOpened():
             video_writers[cam_id].release()
     
@@ -1741,7 +1718,7 @@ def debug_embeddings(request):
         stats = {
             'embedding_count': len(matcher.embeddings),
             'embedding_ids': list(matcher.embeddings.keys()),
-            'has_cuda': torch.cuda.is_available(),
+            'has_cuda': gpu_status['pytorch'],
             'gpu_status': gpu_status
         }
         